@@ -0,0 +1,101 @@
+import numpy as np
+
+# รวมความผิดปกติที่ตรวจพบซ้ำกันต่อเนื่องเป็นเหตุการณ์ (event) เดียวต่อ Abnormality_Type
+# เหตุการณ์ที่เปิดอยู่จะถูกขยาย (เวลาสิ้นสุด, จำนวนครั้ง, ค่าต่ำสุด/สูงสุด) ทุกครั้งที่ตรวจพบอีก
+# และปิดเมื่อไม่พบประเภทนั้นติดต่อกัน clear_after ค่า (hysteresis: ค่าปกติค่าเดียวระหว่างที่ยังผิดปกติไม่ทำให้เกิดเหตุการณ์ใหม่)
+# ประวัติจึงมีขนาดตามจำนวนครั้งที่เกิดความผิดปกติ ไม่ใช่ตามจำนวนรอบที่อ่านค่า
+
+# ค่าเซ็นเซอร์ที่เก็บช่วงต่ำสุด/สูงสุดของแต่ละเหตุการณ์
+EVENT_VALUE_COLUMNS = ["Temperature", "Vibration", "RPM", "Humidity"]
+
+# คอลัมน์ของประวัติเหตุการณ์ที่แสดงในตาราง (Start/End เป็นข้อความเวลาเหมือน Timestamp เดิม)
+ABNORMALITY_EVENT_COLUMNS = {
+    "Event_ID": np.int64, "Abnormality_Type": object, "Start": object, "End": object, "Count": np.int64,
+    **{f"{col}_{stat}": np.float64 for col in EVENT_VALUE_COLUMNS for stat in ("Min", "Max")},
+    "Open": bool,
+}
+
+# จำนวนค่าที่ไม่พบความผิดปกติประเภทนั้นติดต่อกันก่อนปิดเหตุการณ์
+DEFAULT_CLEAR_AFTER = 3
+
+
+def new_event(row):
+    event = {"Event_ID": None, "Abnormality_Type": row["Abnormality_Type"],
+             "Start": row["Timestamp"], "End": row["Timestamp"], "Count": 1, "Open": True, "Misses": 0}
+    for col in EVENT_VALUE_COLUMNS:
+        event[f"{col}_Min"] = event[f"{col}_Max"] = float(row[col])
+    return event
+
+
+def extend_event(event, row):
+    event["End"] = row["Timestamp"]
+    event["Count"] += 1
+    event["Misses"] = 0
+    for col in EVENT_VALUE_COLUMNS:
+        value = float(row[col])
+        event[f"{col}_Min"] = min(event[f"{col}_Min"], value)
+        event[f"{col}_Max"] = max(event[f"{col}_Max"], value)
+
+
+# ใช้ผลของค่าเซ็นเซอร์หนึ่งค่ากับเหตุการณ์ที่เปิดอยู่ (dict: Abnormality_Type -> event, ถูกแก้ไขในที่)
+# rows คือรายการความผิดปกติของค่านี้ (ว่าง = ปกติ) ในรูปแบบแถวเดิมของ abnormality_history
+# คืนค่า (เหตุการณ์ที่ต้องบันทึก, มีการเปลี่ยนแปลงที่ต้องแสดงผลหรือไม่)
+# เหตุการณ์ใหม่มี Event_ID เป็น None ให้ผู้เรียกกำหนดเอง
+def apply_detections(open_events, rows, clear_after=DEFAULT_CLEAR_AFTER):
+    touched = []
+    visible = False
+    detected = set()
+    for row in rows:
+        abnormality_type = row["Abnormality_Type"]
+        detected.add(abnormality_type)
+        event = open_events.get(abnormality_type)
+        if event is None:
+            event = open_events[abnormality_type] = new_event(row)
+        else:
+            extend_event(event, row)
+        touched.append(event)
+        visible = True
+
+    for abnormality_type, event in list(open_events.items()):
+        if abnormality_type in detected:
+            continue
+        event["Misses"] += 1
+        if event["Misses"] >= clear_after:
+            event["Open"] = False
+            del open_events[abnormality_type]
+            visible = True
+        touched.append(event)
+    return touched, visible
+
+
+# ประวัติเหตุการณ์ในหน่วยความจำ เก็บเหตุการณ์ล่าสุดไม่เกิน window รายการ (เหตุการณ์ที่เปิดอยู่ไม่ถูกตัดทิ้ง)
+class AbnormalityEventLog:
+    def __init__(self, window, clear_after=DEFAULT_CLEAR_AFTER):
+        self.window = window
+        self.clear_after = clear_after
+        # เพิ่มขึ้นทุกครั้งที่ประวัติที่แสดงเปลี่ยน (ใช้ตัดสินว่า client ต้องสร้างตารางใหม่หรือไม่)
+        self.version = 0
+        self._events = []
+        self._open = {}
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self._events)
+
+    def record(self, rows):
+        touched, visible = apply_detections(self._open, rows, self.clear_after)
+        for event in touched:
+            if event["Event_ID"] is None:
+                event["Event_ID"] = self._next_id
+                self._next_id += 1
+                self._events.append(event)
+        if visible:
+            self.version += 1
+            if len(self._events) > self.window:
+                keep = {event["Event_ID"] for event in self._events[-self.window:]}
+                self._events = [event for event in self._events if event["Event_ID"] in keep or event["Open"]]
+
+    # dict ของคอลัมน์ (NumPy) เรียงจากเหตุการณ์เก่าไปใหม่
+    def columns(self):
+        return {name: np.array([event[name] for event in self._events], dtype=dtype)
+                for name, dtype in ABNORMALITY_EVENT_COLUMNS.items()}
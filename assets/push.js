@@ -0,0 +1,59 @@
+// โหมด push ของแดชบอร์ด (UPDATE_MODE = "push" ใน dashboard.py)
+// รับข้อความจาก /stream ด้วย EventSource แล้วเขียนลง dcc.Store และกราฟด้วย dash_clientside.set_props
+// callback เดิมของแต่ละ store (การ์ดเซ็นเซอร์, แถบสถานะ, ตารางประวัติ, Model Information) ทำงานเหมือนโหมด poll
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    push: {
+        connect: function(url) {
+            if (!url || window.dashboardPushSource) {
+                return window.dash_clientside.no_update;
+            }
+            var setProps = window.dash_clientside.set_props;
+            // cursor ของกราฟหลังข้อความล่าสุดที่ใช้ได้ (null = ยังไม่แน่ใจว่าข้อมูลครบ)
+            var lastCursor = null;
+            var resyncs = 0;
+
+            // ขอข้อมูลที่ขาดผ่าน callback ปกติ: update_dashboard ส่งเฉพาะส่วนที่ client นี้ยังไม่มี
+            function resync() {
+                resyncs += 1;
+                setProps("interval-update", {n_intervals: resyncs});
+            }
+
+            var source = new EventSource(url);
+            window.dashboardPushSource = source;
+
+            source.addEventListener("tick", function(event) {
+                var message = JSON.parse(event.data);
+                setProps("tick-store", {data: message.tick});
+                if ("status" in message) {
+                    setProps("status-store", {data: message.status});
+                }
+                if ("history" in message) {
+                    setProps("history-store", {data: message.history});
+                }
+                if ("model_info" in message) {
+                    setProps("model-info-store", {data: message.model_info});
+                }
+                if (lastCursor !== null && message.from === lastCursor) {
+                    if (message.extend) {
+                        setProps("sensor-graph", {extendData: message.extend});
+                    } else if (message.figure) {
+                        setProps("sensor-graph", {figure: message.figure});
+                    }
+                    setProps("graph-cursor", {data: message.cursor});
+                } else {
+                    resync();
+                }
+                lastCursor = message.cursor;
+            });
+            source.onopen = function() {
+                setProps("push-status", {children: "connected"});
+            };
+            // EventSource เชื่อมต่อใหม่เอง ข้อความแรกหลังเชื่อมต่อใหม่จะขอข้อมูลที่ขาดไป
+            source.onerror = function() {
+                lastCursor = null;
+                setProps("push-status", {children: "reconnecting"});
+            };
+            return "connecting";
+        }
+    }
+});
@@ -0,0 +1,101 @@
+# เปรียบเทียบความเร็วการทำนายของ predict_with_ml_model แบบเดิม (predict + predict_proba + inverse_transform
+# ทีละคลาส ทีละค่า) กับ predict_batch บน sklearn และบน FlatForest
+# รันจากโฟลเดอร์หลักของโปรเจกต์: python -m benchmarks.bench_inference
+import time
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from fast_forest import FlatForest
+from inference import FEATURE_COLUMNS, predict_batch, class_names_for, to_feature_frame
+
+# ช่วงค่าเดียวกับ generate_sensor_data ใน dashboard.py
+SENSOR_LOW = np.array([50, 0.1, 1, 30, 1000, 1000])
+SENSOR_HIGH = np.array([120, 2.0, 10, 70, 5000, 8000])
+
+
+def random_readings(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(SENSOR_LOW, SENSOR_HIGH, size=(n_rows, len(FEATURE_COLUMNS))).round(2)
+
+
+# predict_with_ml_model ก่อนเปลี่ยนมาใช้ predict_batch (คัดลอกมาเพื่อใช้เป็นค่าอ้างอิง) ทำนายทีละค่า
+def baseline_predict(model, le, sensor_data, threshold=0.15):
+    input_df = pd.DataFrame([sensor_data])
+    prediction_idx = model.predict(input_df)[0]
+    prediction = le.inverse_transform([prediction_idx])[0]
+    probabilities = model.predict_proba(input_df)[0]
+    abnormalities = []
+    for idx in np.argsort(probabilities)[::-1]:
+        if probabilities[idx] >= threshold:
+            abnormalities.append(le.inverse_transform([idx])[0])
+    if "Normal" in abnormalities and len(abnormalities) > 1:
+        abnormalities.remove("Normal")
+    if not abnormalities:
+        abnormalities = ["Normal"]
+    return prediction, abnormalities, probabilities
+
+
+# เส้นทางเดิมกับทั้ง batch: เรียก baseline_predict ทีละแถว
+def baseline_batch(model, le, rows):
+    return [baseline_predict(model, le, row) for row in rows]
+
+
+# จับเวลาฟังก์ชันหลายรอบ คืนค่ามัธยฐาน (วินาทีต่อการเรียกหนึ่งครั้ง)
+def time_call(func, repeat, warmup=3):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เปรียบเทียบ sklearn predict_proba กับ FlatForest")
+    parser.add_argument("--model", default="machine_failure_model.pkl")
+    parser.add_argument("--encoder", default="label_encoder.pkl")
+    parser.add_argument("--batch-sizes", default="1,8,64,512,4096")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--baseline-max-batch", type=int, default=512,
+                        help="วัดเส้นทางเดิมเฉพาะ batch ที่ไม่ใหญ่กว่านี้ (ทำนายทีละแถว ช้ามาก)")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    le = joblib.load(args.encoder)
+    flat = FlatForest.from_sklearn(model)
+    class_names = class_names_for(model, le)
+
+    # ตรวจว่าความน่าจะเป็นตรงกันทุกบิตก่อนจับเวลา
+    check = random_readings(5000, seed=1)
+    identical = np.array_equal(model.predict_proba(to_feature_frame(check)), flat.predict_proba(check))
+    print(f"FlatForest: {flat.n_estimators} ต้น, {flat.feature.size} โหนด, ลึกสุด {flat.max_depth}")
+    print(f"predict_proba ตรงกันทุกบิต: {identical}")
+    # รายการความผิดปกติของเส้นทางเดิมกับ FlatForest ต้องตรงกัน
+    rows = [dict(zip(FEATURE_COLUMNS, row)) for row in check[:500].tolist()]
+    _, flat_abnormalities, _ = predict_batch(flat, le, rows, class_names=class_names)
+    same = all(old[1] == new for old, new in zip(baseline_batch(model, le, rows), flat_abnormalities))
+    print(f"รายการความผิดปกติตรงกับเส้นทางเดิม: {same}")
+
+    print(f"{'batch':>6} {'เดิม (ms)':>12} {'sklearn (ms)':>14} {'flat (ms)':>12} {'us/แถว (flat)':>15} "
+          f"{'เทียบเดิม':>10} {'เทียบ sklearn':>13}")
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        readings = random_readings(batch_size)
+        rows = [dict(zip(FEATURE_COLUMNS, row)) for row in readings.tolist()]
+        sk_time = time_call(lambda: predict_batch(model, le, readings, class_names=class_names), args.repeat)
+        flat_time = time_call(lambda: predict_batch(flat, le, readings, class_names=class_names), args.repeat)
+        if batch_size <= args.baseline_max_batch:
+            base_time = time_call(lambda: baseline_batch(model, le, rows), max(3, args.repeat // batch_size), warmup=1)
+            base_ms, base_speedup = f"{base_time * 1e3:.3f}", f"{base_time / flat_time:.1f}x"
+        else:
+            base_ms = base_speedup = "-"
+        print(f"{batch_size:>6} {base_ms:>12} {sk_time * 1e3:>14.3f} {flat_time * 1e3:>12.3f} "
+              f"{flat_time / batch_size * 1e6:>15.2f} {base_speedup:>10} {sk_time / flat_time:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
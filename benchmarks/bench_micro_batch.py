@@ -0,0 +1,91 @@
+# เปรียบเทียบการทำนายทีละค่าจากหลาย thread พร้อมกัน (เส้นทางเดิมของ predict_uncached)
+# กับการรวมคำขอเป็น micro-batch ด้วย MicroBatcher
+# รันจากโฟลเดอร์หลักของโปรเจกต์: python -m benchmarks.bench_micro_batch
+import argparse
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.bench_inference import random_readings
+from fast_forest import FlatForest
+from inference import FEATURE_COLUMNS, predict_batch, class_names_for
+from micro_batch import MicroBatcher
+
+
+# ให้ n_callers thread ทำนายคนละ per_caller ค่าพร้อมกัน คืนค่า (ค่าต่อวินาที, เวลารอของทุกคำขอ)
+def run_callers(predict, readings, n_callers, per_caller):
+    latencies = [[] for _ in range(n_callers)]
+    barrier = threading.Barrier(n_callers + 1)
+
+    def caller(index):
+        rows = readings[index * per_caller:(index + 1) * per_caller]
+        barrier.wait()
+        for row in rows:
+            start = time.perf_counter()
+            predict(row)
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(n_callers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return n_callers * per_caller / elapsed, np.concatenate(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เปรียบเทียบการทำนายทีละค่ากับ micro-batch เมื่อมีผู้เรียกหลายราย")
+    parser.add_argument("--model", default="machine_failure_model.pkl")
+    parser.add_argument("--encoder", default="label_encoder.pkl")
+    parser.add_argument("--flat", action="store_true", help="ใช้ FlatForest แทน sklearn")
+    parser.add_argument("--callers", default="1,4,16,64")
+    parser.add_argument("--per-caller", type=int, default=200)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.002)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    le = joblib.load(args.encoder)
+    class_names = class_names_for(model, le)
+    if args.flat:
+        model = FlatForest.from_sklearn(model)
+
+    def predict_readings(readings, features=None):
+        _, abnormalities, probabilities = predict_batch(model, le, readings, class_names=class_names)
+        return abnormalities, probabilities
+
+    def predict_direct(reading):
+        abnormalities, probabilities = predict_readings([reading])
+        return abnormalities[0], probabilities[0]
+
+    # ผลของทั้งสองทางต้องตรงกันก่อนจับเวลา
+    check = [dict(zip(FEATURE_COLUMNS, row)) for row in random_readings(50, seed=1).tolist()]
+    batcher = MicroBatcher(predict_readings, args.max_batch, args.max_wait)
+    identical = all(batcher.predict(row)[0] == predict_direct(row)[0] for row in check)
+    batcher.close()
+    print(f"โมเดล: {'FlatForest' if args.flat else 'sklearn'}, max_batch {args.max_batch}, "
+          f"max_wait {args.max_wait * 1e3:g} ms, ผลตรงกัน: {identical}")
+
+    print(f"{'callers':>7} {'ทีละค่า (/s)':>13} {'batch (/s)':>11} {'speedup':>8} "
+          f"{'p50 เดิม (ms)':>14} {'p50 batch (ms)':>15} {'p95 batch (ms)':>15} {'batch เฉลี่ย':>12}")
+    for n_callers in [int(n) for n in args.callers.split(",")]:
+        rows = random_readings(n_callers * args.per_caller).tolist()
+        readings = [dict(zip(FEATURE_COLUMNS, row)) for row in rows]
+        direct_rate, direct_latency = run_callers(predict_direct, readings, n_callers, args.per_caller)
+
+        batcher = MicroBatcher(predict_readings, args.max_batch, args.max_wait)
+        batch_rate, batch_latency = run_callers(batcher.predict, readings, n_callers, args.per_caller)
+        batcher.close()
+
+        print(f"{n_callers:>7} {direct_rate:>13.0f} {batch_rate:>11.0f} {batch_rate / direct_rate:>7.1f}x "
+              f"{np.median(direct_latency) * 1e3:>14.2f} {np.median(batch_latency) * 1e3:>15.2f} "
+              f"{np.percentile(batch_latency, 95) * 1e3:>15.2f} {batcher.requests / batcher.batches:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
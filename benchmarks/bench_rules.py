@@ -0,0 +1,58 @@
+# เปรียบเทียบการสร้างป้ายกำกับด้วย df.apply(..., axis=1) แบบเดิมใน gendata.ipynb กับ rules.label_abnormality
+# รันจากโฟลเดอร์หลักของโปรเจกต์: python -m benchmarks.bench_rules --rows 10000000
+import argparse
+import time
+
+import numpy as np
+
+from rules import SENSOR_CARD_RULES, label_abnormality
+from synthetic_data import create_synthetic_data
+
+
+# label_abnormality เดิมของ gendata.ipynb (ทีละแถว)
+def label_row(row):
+    labels = []
+    if row["Temperature"] > 100:
+        labels.append("High Temperature")
+    if row["Vibration"] > 1.0:
+        labels.append("High Vibration")
+    if row["Machine_Age"] > 7 or row["Operating_Hours"] > 5000:
+        labels.append("Aging/High Usage")
+    if len(labels) == 0:
+        return "Normal"
+    elif len(labels) == 1:
+        return labels[0]
+    return "Multiple Abnormalities"
+
+
+def elapsed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดความเร็วของกฎเกณฑ์ค่าเซ็นเซอร์")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--apply-rows", type=int, default=100_000, help="จำนวนแถวของเส้นฐานแบบ apply")
+    args = parser.parse_args()
+
+    data = create_synthetic_data(args.rows, seed=42).drop(columns="Failure_Type")
+    sample = data.iloc[:args.apply_rows]
+
+    apply_time, expected = elapsed(lambda: sample.apply(label_row, axis=1).to_numpy())
+    if not np.array_equal(expected, label_abnormality(sample)):
+        raise SystemExit("ผลของ label_abnormality ไม่ตรงกับ apply")
+    vector_time, _ = elapsed(lambda: label_abnormality(data))
+
+    reading = data.iloc[0].to_dict()
+    single_time, _ = elapsed(lambda: [SENSOR_CARD_RULES.flags(reading) for _ in range(10_000)])
+
+    print(f"apply ({args.apply_rows:,} แถว): {apply_time:.2f} วินาที "
+          f"(ประมาณ {apply_time * args.rows / args.apply_rows:.0f} วินาทีสำหรับ {args.rows:,} แถว)")
+    print(f"label_abnormality ({args.rows:,} แถว): {vector_time:.3f} วินาที")
+    print(f"SENSOR_CARD_RULES.flags (ค่าเดียว): {single_time / 10_000 * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# วัดเวลาเริ่มระบบของ dashboard.py ใน process ใหม่ทุกครั้ง (เหมือน worker ที่เพิ่งเริ่ม)
+# รันจากโฟลเดอร์หลักของโปรเจกต์: python -m benchmarks.bench_startup
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# import dashboard แล้วรอ warm-up เสร็จ จากนั้นพิมพ์ STARTUP_TIMINGS เป็น JSON บรรทัดสุดท้าย
+CHILD_SCRIPT = (
+    "import json, dashboard; dashboard.startup_ready.wait(); "
+    "print(json.dumps(dashboard.STARTUP_TIMINGS))"
+)
+
+
+def measure_once():
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD_SCRIPT], check=True,
+                            capture_output=True, text=True).stdout
+    wall = time.perf_counter() - started
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["wall"] = wall
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดเวลาเริ่มระบบของ dashboard.py")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # รอบแรกอาจต้องแปลงโมเดลเป็น FlatForest และ cache ของระบบไฟล์ยังไม่อุ่น จึงไม่นับ
+    measure_once()
+    runs = [measure_once() for _ in range(args.runs)]
+
+    print(f"{'ขั้นตอน':<12} {'มัธยฐาน (ms)':>14} {'ต่ำสุด (ms)':>12} {'สูงสุด (ms)':>12}")
+    for stage in ["imports", "model_load", "warmup", "total", "wall"]:
+        values = np.array([run[stage] for run in runs]) * 1000
+        print(f"{stage:<12} {np.median(values):>14.1f} {values.min():>12.1f} {values.max():>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# วัดความเร็วการสร้างข้อมูลจำลอง (แถว/วินาที) เทียบกับ create_synthetic_data แบบวนลูปเดิม
+# รันจากโฟลเดอร์หลักของโปรเจกต์: python -m benchmarks.bench_synthetic_data --rows 5000000
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from synthetic_data import FAILURE_TYPES, iter_synthetic_chunks, write_synthetic_data
+
+
+# create_synthetic_data เดิม (วนลูปทีละแถวด้วย random) ใช้เป็นเส้นฐาน
+def loop_synthetic_rows(n_samples):
+    data = []
+    for _ in range(n_samples):
+        temperature = random.uniform(50, 130)
+        vibration = random.uniform(0.1, 2.5)
+        machine_age = random.randint(1, 10)
+        humidity = random.randint(25, 75)
+        rpm = random.randint(1000, 5500)
+        operating_hours = random.randint(1000, 8500)
+        if temperature > 105 and vibration > 1.2:
+            failure = "Motor Overheating"
+        elif vibration > 1.8 and rpm > 4000:
+            failure = "Misalignment"
+        elif humidity < 30 and vibration > 1.0:
+            failure = "Bearing Failure"
+        elif machine_age > 8 and operating_hours > 7000:
+            failure = "Loose Components"
+        elif rpm > 4800 or (rpm > 4200 and temperature > 95):
+            failure = "Excessive Load"
+        else:
+            failure = "Normal"
+        if random.random() < 0.15:
+            failure = random.choice(FAILURE_TYPES)
+        data.append({"Temperature": temperature, "Vibration": vibration, "Machine_Age": machine_age,
+                     "Humidity": humidity, "RPM": rpm, "Operating_Hours": operating_hours,
+                     "Failure_Type": failure})
+    return data
+
+
+def rows_per_second(func, n_rows):
+    started = time.perf_counter()
+    func()
+    return n_rows / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="วัดความเร็วการสร้างข้อมูลจำลอง")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--loop-rows", type=int, default=200_000, help="จำนวนแถวของเส้นฐานแบบวนลูป")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = [("วนลูปเดิม (หน่วยความจำ)", rows_per_second(lambda: loop_synthetic_rows(args.loop_rows), args.loop_rows))]
+    results.append(("vectorized (หน่วยความจำ)", rows_per_second(
+        lambda: sum(len(chunk) for chunk in iter_synthetic_chunks(args.rows, seed=args.seed)), args.rows)))
+
+    with tempfile.TemporaryDirectory() as folder:
+        for suffix in ["csv", "parquet"]:
+            path = os.path.join(folder, f"synthetic.{suffix}")
+            try:
+                rate = rows_per_second(lambda: write_synthetic_data(path, args.rows, seed=args.seed), args.rows)
+            except ImportError as exc:
+                print(f"ข้าม {suffix}: {exc}")
+                continue
+            results.append((f"vectorized -> {suffix} ({os.path.getsize(path) / 1e6:.0f} MB)", rate))
+
+    print(f"{'วิธี':<36} {'แถว/วินาที':>14}")
+    for name, rate in results:
+        print(f"{name:<36} {rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+# ทดสอบโหลดของแดชบอร์ดด้วย browser จำลองหลาย session ที่ส่ง request แบบเดียวกับ browser จริง
+# แต่ละ session โหลด /_dash-layout แล้วส่ง interval-update ทุก --interval วินาที (เหมือน dcc.Interval)
+# พร้อมเรียก callback ฝั่งเซิร์ฟเวอร์ที่ตามมา (ตารางประวัติ, Model Information, ...) เมื่อ store ที่เป็น input เปลี่ยน
+# โดยส่ง State (graph-cursor, status-store, ...) ที่ได้จากคำตอบก่อนหน้ากลับไปเหมือน browser
+# รันจากโฟลเดอร์หลักของโปรเจกต์:
+#   python -m benchmarks.load_test --sessions 50 --duration 60
+#   python -m benchmarks.load_test --sessions 200 --interval 0 --output load.json --compare load_baseline.json
+#   python -m benchmarks.load_test --url http://127.0.0.1:8050 --server-pid 12345   (เซิร์ฟเวอร์ที่รันอยู่แล้ว เช่น gunicorn)
+# CPU/RSS ของเซิร์ฟเวอร์อ่านจาก /proc (Linux) ถ้าไม่มีจะไม่รายงาน
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# รันแดชบอร์ดด้วยเซิร์ฟเวอร์ของ Flask (หลาย thread) โดยเก็บข้อมูลถาวรไว้ในโฟลเดอร์ชั่วคราว
+# (DASHBOARD_HISTORY_DB ตั้งโดย start_server ก่อน import dashboard)
+SERVER_SCRIPT = (
+    "import logging, sys, dashboard; "
+    "logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+    "dashboard.app.run(host=sys.argv[1], port=int(sys.argv[2]), debug=False, threaded=True)"
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+def free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+# ===== การเชื่อมต่อและ callback ของ Dash =====
+
+# การเชื่อมต่อ HTTP ของหนึ่ง session (ใช้ keep-alive ถ้าเซิร์ฟเวอร์รองรับ)
+class DashClient:
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/") + "/"
+        self.timeout = timeout
+        self._connection = None
+
+    def request(self, method, path, body=None):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        try:
+            self._connection.request(method, self.prefix + path, payload, headers)
+            response = self._connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        return response.status, (json.loads(data) if data and response.status == 200 else None)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# แยก output ของ callback ("..a.data...b.data.." หรือ "a.children") เป็น [(id, property), ...]
+def parse_outputs(output):
+    parts = output[2:-2].split("...") if output.startswith("..") else [output]
+    return [tuple(part.rsplit(".", 1)) for part in parts]
+
+
+# callback ฝั่งเซิร์ฟเวอร์จาก /_dash-dependencies (callback ฝั่ง browser ไม่ส่ง request จึงข้ามไป)
+def server_callbacks(dependencies):
+    callbacks = []
+    for dependency in dependencies:
+        if dependency.get("clientside_function"):
+            continue
+        outputs = parse_outputs(dependency["output"])
+        callbacks.append({
+            "output": dependency["output"],
+            "outputs": outputs,
+            "multi": dependency["output"].startswith(".."),
+            "inputs": [f"{item['id']}.{item['property']}" for item in dependency["inputs"]],
+            "state": [f"{item['id']}.{item['property']}" for item in dependency["state"]],
+            # ชื่อที่ใช้รายงาน (output แรก เหมือน dashboard_callback_seconds ใน /metrics)
+            "label": f"{outputs[0][0]}.{outputs[0][1]}",
+        })
+    return callbacks
+
+
+# ค่าเริ่มต้นของทุก property ของ component ที่มี id ในหน้า (จาก /_dash-layout)
+def layout_values(node, values):
+    if isinstance(node, list):
+        for child in node:
+            layout_values(child, values)
+    elif isinstance(node, dict):
+        props = node.get("props", {})
+        if isinstance(props.get("id"), str):
+            for key, value in props.items():
+                values[f"{props['id']}.{key}"] = value
+        for value in props.values():
+            if isinstance(value, (dict, list)):
+                layout_values(value, values)
+    return values
+
+
+def callback_body(callback, values, changed):
+    def prop(key):
+        component_id, name = key.rsplit(".", 1)
+        return {"id": component_id, "property": name, "value": values.get(key)}
+
+    outputs = [{"id": component_id, "property": name} for component_id, name in callback["outputs"]]
+    return {
+        "output": callback["output"],
+        "outputs": outputs if callback["multi"] else outputs[0],
+        "inputs": [prop(key) for key in callback["inputs"]],
+        "state": [prop(key) for key in callback["state"]],
+        "changedPropIds": [key for key in callback["inputs"] if key in changed],
+    }
+
+
+# ===== session จำลอง =====
+
+class Session(threading.Thread):
+    def __init__(self, base_url, callbacks, interval, start_at, record_from, stop_at, timeout):
+        super().__init__(daemon=True)
+        self.client = DashClient(base_url, timeout)
+        self.callbacks = callbacks
+        self.interval = interval
+        self.start_at = start_at
+        self.record_from = record_from
+        self.stop_at = stop_at
+        # เวลาต่อรอบ (interval-update และ callback ที่ตามมาทั้งหมด) และเวลาต่อ request แยกตาม callback
+        self.tick_seconds = []
+        self.request_seconds = {}
+        self.requests = 0
+        self.errors = 0
+        self.late = 0
+
+    def run(self):
+        try:
+            status, layout = self.client.request("GET", "_dash-layout")
+            if status != 200:
+                raise http.client.HTTPException(f"_dash-layout ตอบ {status}")
+        except (OSError, http.client.HTTPException):
+            self.errors += 1
+            return
+        values = layout_values(layout, {})
+        n_intervals = values.get("interval-update.n_intervals") or 0
+
+        next_at = self.start_at
+        while True:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            started = time.perf_counter()
+            if started >= self.stop_at:
+                break
+            n_intervals += 1
+            values["interval-update.n_intervals"] = n_intervals
+            self.fire(values, {"interval-update.n_intervals"}, started >= self.record_from)
+            if started >= self.record_from:
+                self.tick_seconds.append(time.perf_counter() - started)
+
+            next_at += self.interval
+            if next_at < time.perf_counter():
+                # รอบนี้ใช้เวลานานกว่า interval (dcc.Interval จะส่งรอบถัดไปทันทีที่ทำได้)
+                if self.interval > 0 and started >= self.record_from:
+                    self.late += 1
+                next_at = time.perf_counter()
+        self.client.close()
+
+    # เรียกทุก callback ที่ input เปลี่ยน แล้วเรียกต่อสำหรับ output ที่เปลี่ยนจากคำตอบ (เหมือน dash-renderer)
+    def fire(self, values, changed, record):
+        pending = set(changed)
+        for _ in range(len(self.callbacks)):
+            triggered = [callback for callback in self.callbacks if pending.intersection(callback["inputs"])]
+            if not triggered:
+                return
+            changed, pending = pending, set()
+            for callback in triggered:
+                body = callback_body(callback, values, changed)
+                started = time.perf_counter()
+                try:
+                    status, data = self.client.request("POST", "_dash-update-component", body)
+                except (OSError, http.client.HTTPException):
+                    status, data = None, None
+                elapsed = time.perf_counter() - started
+                self.requests += 1
+                if status not in (200, 204):
+                    self.errors += 1
+                    continue
+                if record:
+                    self.request_seconds.setdefault(callback["label"], []).append(elapsed)
+                for component_id, props in ((data or {}).get("response") or {}).items():
+                    for name, value in props.items():
+                        values[f"{component_id}.{name}"] = value
+                        pending.add(f"{component_id}.{name}")
+
+
+# ===== CPU/RSS ของเซิร์ฟเวอร์ =====
+
+# อ่าน CPU (วินาที) และ RSS (bytes) ของ process จาก /proc คืนค่า None ถ้าอ่านไม่ได้
+def process_usage(pid):
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu = (int(fields[11]) + int(fields[12])) / ticks
+    return cpu, int(status["VmRSS"].split()[0]) * 1024
+
+
+# สุ่มอ่าน RSS ระหว่างทดสอบเพื่อหาค่าสูงสุด
+class ProcessMonitor(threading.Thread):
+    def __init__(self, pid, period=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.period = period
+        self.peak_rss = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            usage = process_usage(self.pid)
+            if usage is not None:
+                self.peak_rss = max(self.peak_rss, usage[1])
+            self._stop_event.wait(self.period)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# ===== รายงาน =====
+
+def summarize(samples):
+    samples = np.asarray(samples)
+    if not len(samples):
+        return {"count": 0}
+    summary = {"count": int(len(samples))}
+    for q in PERCENTILES:
+        summary[f"p{q}_ms"] = float(np.percentile(samples, q) * 1000)
+    summary["max_ms"] = float(samples.max() * 1000)
+    return summary
+
+
+def print_latency(name, summary):
+    if not summary["count"]:
+        print(f"{name:<32} {0:>7}")
+        return
+    values = "".join(f"{summary[f'p{q}_ms']:>9.1f}" for q in PERCENTILES)
+    print(f"{name:<32} {summary['count']:>7}{values}{summary['max_ms']:>9.1f}")
+
+
+def print_report(result):
+    config, server = result["config"], result["server"]
+    interval = f"{config['interval']:g} วินาที" if config["interval"] > 0 else "ส่งต่อเนื่อง"
+    print(f"\n{config['sessions']} session, interval {interval}, วัด {result['measured_seconds']:.1f} วินาที "
+          f"(ไม่นับ warm-up {config['warmup']:g} วินาที)")
+    print(f"รอบ {result['ticks']} ({result['ticks_per_second']:.1f} รอบ/วินาที, ช้ากว่า interval {result['late']}), "
+          f"request {result['requests']} ({result['requests_per_second']:.1f} request/วินาที), ผิดพลาด {result['errors']}")
+    print(f"\n{'เวลาตอบ (ms)':<32} {'จำนวน':>7}" + "".join(f"{f'p{q}':>9}" for q in PERCENTILES) + f"{'max':>9}")
+    print_latency("tick (รวม callback ที่ตามมา)", result["latency"]["tick"])
+    for label, summary in result["latency"]["callbacks"].items():
+        print_latency(label, summary)
+    if server["cpu_percent"] is not None:
+        print(f"\nเซิร์ฟเวอร์: CPU {server['cpu_percent']:.0f}% ของหนึ่ง core, "
+              f"RSS {server['rss_mb']:.0f} MB (สูงสุด {server['peak_rss_mb']:.0f} MB)")
+    else:
+        print("\nเซิร์ฟเวอร์: อ่าน CPU/RSS ไม่ได้ (ต้องใช้ /proc และ --server-pid เมื่อใช้ --url)")
+    print(f"ตัวทดสอบเอง: CPU {result['client_cpu_percent']:.0f}% ของหนึ่ง core "
+          f"(ถ้าใกล้ 100% ตัวทดสอบเป็นคอขวดเอง)")
+
+
+# เทียบ p95 ของรอบและ request/วินาที กับผลครั้งก่อน
+def compare(result, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nเทียบกับ {baseline_path} (แย่ลงเกิน {threshold:.2f} เท่าถือว่าถดถอย)")
+    if (baseline["config"]["sessions"], baseline["config"]["interval"]) != (
+            result["config"]["sessions"], result["config"]["interval"]):
+        print("คำเตือน: จำนวน session หรือ interval ไม่ตรงกับผลครั้งก่อน ผลเทียบอาจไม่มีความหมาย")
+    regressions = []
+    checks = [
+        ("tick p95", result["latency"]["tick"].get("p95_ms"), baseline["latency"]["tick"].get("p95_ms"), False),
+        ("request/วินาที", result["requests_per_second"], baseline["requests_per_second"], True),
+    ]
+    for name, new, old, higher_is_better in checks:
+        if not new or not old:
+            continue
+        ratio = old / new if higher_is_better else new / old
+        mark = "ถดถอย" if ratio > threshold else ("ดีขึ้น" if ratio < 1 / threshold else "")
+        print(f"{name:<16} {old:>10.1f} -> {new:>10.1f}  {ratio:>5.2f}x {mark}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+# ===== main =====
+
+# log และฐานข้อมูลประวัติของเซิร์ฟเวอร์อยู่ใน workdir
+def start_server(host, port, workdir):
+    log = open(os.path.join(workdir, "server.log"), "w", encoding="utf-8")
+    env = dict(os.environ, DASHBOARD_HISTORY_DB=os.path.join(workdir, "history.db"))
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, host, str(port)],
+                               stdout=log, stderr=subprocess.STDOUT, env=env)
+    return process, log
+
+
+def wait_ready(base_url, process=None, timeout=120.0):
+    client = DashClient(base_url, timeout=5.0)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"เซิร์ฟเวอร์หยุดทำงาน (exit code {process.returncode})")
+        try:
+            if client.request("GET", "ready")[0] == 200:
+                client.close()
+                return
+        except (OSError, http.client.HTTPException, json.JSONDecodeError):
+            pass
+        client.close()
+        time.sleep(0.25)
+    raise TimeoutError(f"เซิร์ฟเวอร์ไม่พร้อมภายใน {timeout:g} วินาที")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ทดสอบโหลดของแดชบอร์ดด้วย browser จำลองหลาย session")
+    parser.add_argument("--sessions", type=int, default=20, help="จำนวน browser/จอที่เปิดพร้อมกัน")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="วินาทีระหว่าง interval-update ของแต่ละ session (0 = ส่งต่อเนื่องเพื่อหาอัตราสูงสุด)")
+    parser.add_argument("--duration", type=float, default=30.0, help="เวลาที่วัดผล (วินาที)")
+    parser.add_argument("--warmup", type=float, default=5.0, help="ช่วงแรกที่ไม่นับผล (วินาที)")
+    parser.add_argument("--url", help="เซิร์ฟเวอร์ที่รันอยู่แล้ว (ถ้าไม่ระบุจะเริ่ม dashboard.py ให้)")
+    parser.add_argument("--server-pid", type=int, help="pid ของเซิร์ฟเวอร์ที่ระบุด้วย --url (สำหรับ CPU/RSS)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout ต่อ request (วินาที)")
+    parser.add_argument("--seed", type=int, default=0, help="seed ของจังหวะเริ่มของแต่ละ session")
+    parser.add_argument("--output", help="บันทึกผลเป็น JSON")
+    parser.add_argument("--compare", help="ไฟล์ผลครั้งก่อนสำหรับตรวจหาการถดถอย")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    process = log = None
+    server_pid = args.server_pid
+    base_url = args.url
+    if base_url is None:
+        port = free_port(args.host)
+        workdir = tempfile.mkdtemp(prefix="dashboard-load-")
+        process, log = start_server(args.host, port, workdir)
+        server_pid = process.pid
+        base_url = f"http://{args.host}:{port}/"
+        print(f"เริ่มเซิร์ฟเวอร์ที่ {base_url} (log: {log.name})")
+
+    completed = False
+    try:
+        wait_ready(base_url, process)
+        client = DashClient(base_url, args.timeout)
+        status, dependencies = client.request("GET", "_dash-dependencies")
+        client.close()
+        if status != 200:
+            raise RuntimeError(f"_dash-dependencies ตอบ {status}")
+        callbacks = server_callbacks(dependencies)
+        if not any("interval-update.n_intervals" in callback["inputs"] for callback in callbacks):
+            raise RuntimeError("ไม่พบ callback ของ interval-update (UPDATE_MODE เป็น push?)")
+
+        # เริ่มแต่ละ session ที่จังหวะต่างกันภายใน interval แรก เหมือนจอที่เปิดคนละเวลา
+        rng = random.Random(args.seed)
+        now = time.perf_counter() + 0.5
+        record_from = now + args.warmup
+        stop_at = record_from + args.duration
+        sessions = [Session(base_url, callbacks, args.interval, now + rng.uniform(0, args.interval),
+                            record_from, stop_at, args.timeout)
+                    for _ in range(args.sessions)]
+        monitor = ProcessMonitor(server_pid) if server_pid else None
+        for session in sessions:
+            session.start()
+
+        time.sleep(max(record_from - time.perf_counter(), 0))
+        server_before = process_usage(server_pid) if server_pid else None
+        client_before = resource.getrusage(resource.RUSAGE_SELF)
+        if monitor is not None:
+            monitor.start()
+        time.sleep(max(stop_at - time.perf_counter(), 0))
+        server_after = process_usage(server_pid) if server_pid else None
+        client_after = resource.getrusage(resource.RUSAGE_SELF)
+        measured = time.perf_counter() - record_from
+        if monitor is not None:
+            monitor.stop()
+        for session in sessions:
+            session.join(args.timeout)
+        completed = True
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+            log.close()
+            # เก็บ log ไว้ดูเมื่อทดสอบไม่จบ ไม่เช่นนั้นลบโฟลเดอร์ชั่วคราวทั้งหมด
+            if completed:
+                shutil.rmtree(workdir, ignore_errors=True)
+            else:
+                print(f"log ของเซิร์ฟเวอร์: {log.name}")
+
+
+    tick_seconds = [value for session in sessions for value in session.tick_seconds]
+    request_seconds = {}
+    for session in sessions:
+        for label, values in session.request_seconds.items():
+            request_seconds.setdefault(label, []).extend(values)
+    recorded_requests = sum(len(values) for values in request_seconds.values())
+    client_cpu = (client_after.ru_utime + client_after.ru_stime
+                  - client_before.ru_utime - client_before.ru_stime)
+    server = {"cpu_percent": None, "rss_mb": None, "peak_rss_mb": None}
+    if server_before is not None and server_after is not None:
+        server = {"cpu_percent": (server_after[0] - server_before[0]) / measured * 100,
+                  "rss_mb": server_after[1] / 2 ** 20,
+                  "peak_rss_mb": max(monitor.peak_rss, server_after[1]) / 2 ** 20}
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {"sessions": args.sessions, "interval": args.interval, "duration": args.duration,
+                   "warmup": args.warmup, "url": args.url},
+        "measured_seconds": measured,
+        "ticks": len(tick_seconds),
+        "ticks_per_second": len(tick_seconds) / measured,
+        "requests": recorded_requests,
+        "requests_per_second": recorded_requests / measured,
+        "errors": sum(session.errors for session in sessions),
+        "late": sum(session.late for session in sessions),
+        "latency": {"tick": summarize(tick_seconds),
+                    "callbacks": {label: summarize(values) for label, values in sorted(request_seconds.items())}},
+        "server": server,
+        "client_cpu_percent": client_cpu / measured * 100,
+    }
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+        print(f"บันทึกผลที่ {args.output}")
+
+    if args.compare and compare(result, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
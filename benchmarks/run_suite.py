@@ -0,0 +1,282 @@
+# ชุด benchmark ของเส้นทางที่ทำงานบ่อยของแดชบอร์ด บันทึกผลเป็น JSON เพื่อเทียบระหว่างรุ่น
+# รันจากโฟลเดอร์หลักของโปรเจกต์ (ไม่ต้องใช้เครือข่าย):
+#   python -m benchmarks.run_suite --output bench_results.json
+#   python -m benchmarks.run_suite --output new.json --compare bench_results.json
+# --compare จะรายงานกรณีที่ช้าลงเกิน --threshold เท่าและจบด้วย exit code 1 (ใช้ใน CI ได้)
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import plotly
+
+# ขนาดที่ใช้วัด (--quick ใช้ชุดเล็กลงสำหรับตรวจเร็วๆ)
+SIZES = {
+    "history": [15, 100, 1000],
+    "figure_history": [15, 100, 1000, 10_000],
+    "table_history": [10, 100, 1000],
+    "batch": [1, 8, 64, 512, 4096],
+    "synthetic_rows": [1_000, 100_000, 1_000_000],
+    "downsample_rows": [100_000, 1_000_000],
+}
+QUICK_SIZES = {
+    "history": [15, 100],
+    "figure_history": [15, 1000],
+    "table_history": [10, 100],
+    "batch": [1, 64, 512],
+    "synthetic_rows": [1_000, 100_000],
+    "downsample_rows": [100_000],
+}
+
+
+# เรียก func ซ้ำจนครบ min_time วินาที (อย่างน้อย min_runs ครั้ง) คืนค่าสถิติเป็นวินาทีต่อครั้ง
+def measure(func, min_time=0.3, min_runs=5, max_runs=10_000):
+    func()
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples = np.array(samples)
+    return {"median_s": float(np.median(samples)), "p90_s": float(np.percentile(samples, 90)),
+            "min_s": float(samples.min()), "runs": int(len(samples))}
+
+
+# JSON ที่ Dash ส่งกลับไปยัง browser (รวมเวลาการ serialize ด้วย เหมือนที่เกิดจริงใน callback)
+def to_response_json(value):
+    return json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Suite:
+    def __init__(self, min_time):
+        self.min_time = min_time
+        self.results = []
+
+    def run(self, name, func, min_time=None, **params):
+        result = {"name": name, "params": params, **measure(func, min_time or self.min_time)}
+        self.results.append(result)
+        label = ", ".join(f"{key}={value}" for key, value in params.items())
+        print(f"{name:<28} {label:<32} {result['median_s'] * 1000:>10.3f} ms  ({result['runs']} รอบ)")
+        return result
+
+
+# ===== กรณีทดสอบ =====
+
+def bench_model_load(suite):
+    from fast_forest import FlatForest
+    from model_loader import load_compiled_model, load_sklearn_model
+
+    suite.run("model_load", load_compiled_model, kind="flat_cached")
+    suite.run("model_load", lambda: load_sklearn_model(mmap_mode=None), kind="sklearn")
+    model, _ = load_sklearn_model(mmap_mode=None)
+    suite.run("model_load", lambda: FlatForest.from_sklearn(model), kind="flat_compile")
+
+
+def bench_predict(suite, dashboard, sizes):
+    rng = np.random.default_rng(0)
+    reading = dashboard.WARMUP_READING
+    suite.run("predict_with_ml_model", lambda: dashboard.predict_uncached(reading), cache="off")
+    if dashboard.prediction_cache is not None:
+        suite.run("predict_with_ml_model", lambda: dashboard.predict_with_ml_model(reading), cache="hit")
+
+    low = np.array([50, 0.1, 1, 30, 1000, 1000])
+    high = np.array([120, 2.0, 10, 70, 5000, 8000])
+    for batch_size in sizes["batch"]:
+        readings = rng.uniform(low, high, size=(batch_size, len(low))).round(2)
+        suite.run("predict_batch", lambda: dashboard.predict_batch_with_ml_model(readings), batch=batch_size)
+
+
+# ตั้งค่าสถานะของแดชบอร์ดใหม่ให้มีประวัติ window แถวเต็มบัฟเฟอร์
+def reset_state(dashboard, sensor_window, abnormality_window):
+    from state_backend import InMemoryStateBackend
+
+    dashboard.SENSOR_HISTORY_WINDOW = sensor_window
+    dashboard.ABNORMALITY_HISTORY_WINDOW = abnormality_window
+    # clear_after=1 และค่าปกติคั่นทุกรอบ ทำให้แต่ละรอบเป็นเหตุการณ์แยกกัน (ตารางประวัติมีครบ window แถว)
+    dashboard.state = InMemoryStateBackend(sensor_window, abnormality_window, clear_after=1)
+    now = time.time()
+    for i in range(max(sensor_window, abnormality_window)):
+        reading = dashboard.generate_sensor_data()
+        abnormalities, probabilities = dashboard.predict_uncached(reading)
+        if not abnormalities or abnormalities == ["Normal"]:
+            abnormalities = ["High Temperature"]
+        dashboard.record_scored_reading(now - i, reading, abnormalities, probabilities, persist=False)
+        dashboard.record_scored_reading(now - i, reading, ["Normal"], probabilities, persist=False)
+
+
+def bench_update_dashboard(suite, dashboard, sizes):
+    dashboard.MIN_SAMPLE_INTERVAL = 0.0
+    for window in sizes["history"]:
+        for mode in ["incremental", "full"]:
+            reset_state(dashboard, window, dashboard.ABNORMALITY_HISTORY_WINDOW)
+            dashboard.GRAPH_UPDATE_MODE = mode
+            # client ที่ได้รับข้อมูลครบแล้ว รอเพียงจุดใหม่หนึ่งจุดต่อรอบ
+            client = {"cursor": dashboard.state.sensor_history()[0]}
+
+            def tick():
+                outputs = dashboard.update_dashboard(1, client["cursor"])
+                client["cursor"] = outputs[6]
+                to_response_json(outputs)
+
+            suite.run("update_dashboard", tick, history=window, graph=mode)
+    dashboard.GRAPH_UPDATE_MODE = "incremental"
+
+
+def bench_figure(suite, dashboard, sizes):
+    for window in sizes["figure_history"]:
+        reset_state(dashboard, window, 10)
+        suite.run("build_sensor_figure", lambda: to_response_json(dashboard.build_sensor_figure()), history=window)
+
+
+def bench_history_table(suite, dashboard, sizes):
+    for window in sizes["table_history"]:
+        reset_state(dashboard, 15, window)
+        version = dashboard.state.abnormality_history()[0]
+        suite.run("history_table", lambda: to_response_json(dashboard.update_abnormality_history(version)),
+                  rows=window)
+
+
+def bench_synthetic_data(suite, sizes):
+    from synthetic_data import create_synthetic_data
+
+    for n_rows in sizes["synthetic_rows"]:
+        suite.run("create_synthetic_data", lambda: create_synthetic_data(n_rows, seed=0), rows=n_rows)
+
+
+def bench_downsample(suite, dashboard, sizes):
+    from downsample import downsample
+
+    rng = np.random.default_rng(0)
+    for n_rows in sizes["downsample_rows"]:
+        x = np.arange(n_rows, dtype=np.float64)
+        y = np.cumsum(rng.normal(size=n_rows))
+        for method in ["lttb", "minmax"]:
+            suite.run("downsample", lambda: downsample(x, y, dashboard.TREND_MAX_POINTS, method),
+                      rows=n_rows, method=method)
+
+
+# นับค่าลง histogram ของ drift_monitor (ค่าเดียวแบบโหมด poll และทั้ง batch ของ 100 เครื่องแบบ IngestionService)
+# และการคำนวณ PSI/KS ของทุกเครื่องหนึ่งรอบ
+def bench_drift(suite, dashboard, sizes):
+    from drift_monitor import DriftMonitor
+
+    rng = np.random.default_rng(0)
+    low = np.array([50, 0.1, 1, 30, 1000, 1000])
+    high = np.array([120, 2.0, 10, 70, 5000, 8000])
+    monitor = DriftMonitor(dashboard.load_training_profile(), interval=float("inf"))
+    reading = rng.uniform(low, high).round(2)
+    suite.run("drift_observe", lambda: monitor.observe(dashboard.MACHINE_ID, reading), mode="poll", batch=1)
+    for batch_size in sizes["batch"]:
+        readings = rng.uniform(low, high, size=(batch_size, len(low))).round(2)
+        machine_ids = [f"M-{i % 100}" for i in range(batch_size)]
+        suite.run("drift_observe", lambda: monitor.observe(machine_ids, readings), mode="service",
+                  batch=batch_size)
+    suite.run("drift_evaluate", monitor.evaluate, machines=len(set(machine_ids)) + 1)
+
+
+# ===== เปรียบเทียบกับผลครั้งก่อน =====
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(item["name"], json.dumps(item["params"], sort_keys=True)): item
+                    for item in json.load(f)["results"]}
+    regressions = []
+    print(f"\nเทียบกับ {baseline_path} (ช้าลงเกิน {threshold:.2f} เท่าถือว่าถดถอย)")
+    for item in results:
+        old = baseline.get((item["name"], json.dumps(item["params"], sort_keys=True)))
+        if old is None:
+            continue
+        ratio = item["median_s"] / old["median_s"]
+        mark = "ถดถอย" if ratio > threshold else ("เร็วขึ้น" if ratio < 1 / threshold else "")
+        label = ", ".join(f"{key}={value}" for key, value in item["params"].items())
+        print(f"{item['name']:<28} {label:<32} {ratio:>6.2f}x {mark}")
+        if ratio > threshold:
+            regressions.append(item)
+    return regressions
+
+
+# รันทุกกรณี (หรือเฉพาะ --only) กับ dashboard ที่ import แล้ว
+def run_cases(args, sizes, dashboard):
+    suite = Suite(args.min_time)
+    cases = {
+        "model_load": lambda: bench_model_load(suite),
+        "predict": lambda: bench_predict(suite, dashboard, sizes),
+        "update_dashboard": lambda: bench_update_dashboard(suite, dashboard, sizes),
+        "build_sensor_figure": lambda: bench_figure(suite, dashboard, sizes),
+        "history_table": lambda: bench_history_table(suite, dashboard, sizes),
+        "create_synthetic_data": lambda: bench_synthetic_data(suite, sizes),
+        "downsample": lambda: bench_downsample(suite, dashboard, sizes),
+        "drift": lambda: bench_drift(suite, dashboard, sizes),
+    }
+    only = args.only.split(",") if args.only else None
+    for name, run_case in cases.items():
+        if only is None or any(name.startswith(prefix) for prefix in only):
+            run_case()
+    return suite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ชุด benchmark ของแดชบอร์ด")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="ไฟล์ผลครั้งก่อนสำหรับตรวจหาการถดถอย")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--min-time", type=float, default=0.3, help="เวลาขั้นต่ำที่วัดแต่ละกรณี (วินาที)")
+    parser.add_argument("--quick", action="store_true", help="ใช้ขนาดชุดเล็กลง")
+    parser.add_argument("--only", help="รันเฉพาะกรณีที่ชื่อขึ้นต้นด้วยค่านี้ (คั่นด้วย ,)")
+    args = parser.parse_args()
+    sizes = QUICK_SIZES if args.quick else SIZES
+
+    # เก็บข้อมูลถาวรของแดชบอร์ดไว้ในโฟลเดอร์ชั่วคราวตั้งแต่ import (ไม่ให้ปนกับ sensor_history.db จริง)
+    # และลบทิ้งเมื่อจบ
+    workdir = tempfile.mkdtemp(prefix="dashboard-bench-")
+    os.environ["DASHBOARD_HISTORY_DB"] = os.path.join(workdir, "history.db")
+    try:
+        import dashboard
+
+        dashboard.startup_ready.wait()
+        suite = run_cases(args, sizes, dashboard)
+        dashboard.history_store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import dash
+    import sklearn
+    output = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "dash": dash.__version__,
+            "quick": args.quick,
+        },
+        "results": suite.results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=1)
+    print(f"บันทึกผลที่ {args.output}")
+
+    if args.compare and compare(suite.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
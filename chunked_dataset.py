@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from inference import FEATURE_COLUMNS
+
+# อ่านไฟล์ข้อมูลเซ็นเซอร์ขนาดใหญ่ (.csv หรือ .parquet) ทีละ chunk โดยไม่ต้องโหลดทั้งไฟล์เข้าหน่วยความจำ
+# ค่าเซ็นเซอร์ถูกแปลงเป็น float32 ตั้งแต่ตอนอ่าน (RandomForest แปลงเป็น float32 อยู่แล้ว จึงไม่เสียความแม่นยำ)
+# และคอลัมน์ป้ายกำกับเป็น category
+
+DEFAULT_CHUNK_SIZE = 500_000
+
+# ชื่อคอลัมน์ป้ายกำกับที่ค้นหาอัตโนมัติ (gendata.ipynb ใช้ Abnormality_Type, synthetic_data.py ใช้ Failure_Type)
+LABEL_COLUMNS = ["Abnormality_Type", "Failure_Type"]
+
+# ชื่อคอลัมน์รหัสเครื่องที่ค้นหาอัตโนมัติ (ใช้แยกคุณลักษณะย้อนหลังตามเครื่อง)
+MACHINE_COLUMNS = ["Machine_ID", "machine_id"]
+
+
+def is_parquet(path):
+    return path.endswith(".parquet")
+
+
+# รายชื่อคอลัมน์ของไฟล์ (อ่านเฉพาะ header หรือ schema)
+def dataset_columns(path):
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return list(pq.ParquetFile(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+# คอลัมน์ป้ายกำกับตัวแรกใน LABEL_COLUMNS ที่มีในไฟล์ (None ถ้าไม่มี)
+def find_label_column(path):
+    columns = dataset_columns(path)
+    return next((col for col in LABEL_COLUMNS if col in columns), None)
+
+
+# คอลัมน์รหัสเครื่องตัวแรกใน MACHINE_COLUMNS ที่มีในไฟล์ (None ถ้าไม่มี)
+def find_machine_column(path):
+    columns = dataset_columns(path)
+    return next((col for col in MACHINE_COLUMNS if col in columns), None)
+
+
+# คืนค่า DataFrame ทีละ chunk ที่มีคอลัมน์ FEATURE_COLUMNS (feature_dtype ค่าเริ่มต้น float32) และ extra_columns (category)
+# raw_columns ถูกอ่านตามชนิดในไฟล์ (เช่น คอลัมน์เวลาที่ไม่ควรเป็น category)
+# feature_dtype=np.float64 ใช้เมื่อต้องการค่าตรงตามไฟล์ (เช่น เล่นค่าซ้ำไปแสดงบนแดชบอร์ด)
+def iter_chunks(path, extra_columns=(), chunk_size=DEFAULT_CHUNK_SIZE, raw_columns=(), feature_dtype=np.float32):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"ไม่พบไฟล์ข้อมูล {path}")
+    extra_columns = [col for col in extra_columns if col]
+    raw_columns = [col for col in raw_columns if col]
+    missing = set(FEATURE_COLUMNS + extra_columns + raw_columns) - set(dataset_columns(path))
+    if missing:
+        raise ValueError(f"ไฟล์ {path} ไม่มีคอลัมน์ {sorted(missing)}")
+
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path, pre_buffer=False, buffer_size=1 << 20)
+        for batch in parquet.iter_batches(batch_size=chunk_size,
+                                           columns=FEATURE_COLUMNS + extra_columns + raw_columns):
+            chunk = batch.to_pandas()
+            yield chunk.astype({col: feature_dtype for col in FEATURE_COLUMNS} | {col: "category" for col in extra_columns})
+        return
+
+    dtypes = {col: feature_dtype for col in FEATURE_COLUMNS} | {col: "category" for col in extra_columns}
+    yield from pd.read_csv(path, usecols=FEATURE_COLUMNS + extra_columns + raw_columns, dtype=dtypes,
+                           chunksize=chunk_size)
+
+
+# อ่านไฟล์รอบแรกแบบเบาๆ (เฉพาะคอลัมน์เดียว) เพื่อนับจำนวนแถวและจำนวนแถวต่อคลาส
+# คืนค่า (จำนวนแถว, pd.Series ของจำนวนแถวต่อคลาส หรือ None ถ้าไม่มีคอลัมน์ป้ายกำกับ)
+def scan_dataset(path, label_column=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path, pre_buffer=False, buffer_size=1 << 20)
+        if label_column is None:
+            return parquet.metadata.num_rows, None
+        batches = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_size * 4, columns=[label_column]))
+    else:
+        column = label_column or FEATURE_COLUMNS[0]
+        batches = pd.read_csv(path, usecols=[column], dtype={column: "category"}, chunksize=chunk_size * 4)
+
+    n_rows, counts = 0, None
+    for chunk in batches:
+        n_rows += len(chunk)
+        if label_column is not None:
+            chunk_counts = chunk[label_column].value_counts()
+            counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+    if counts is not None:
+        counts = counts[counts > 0].astype(np.int64)
+        counts.index = counts.index.astype(str)
+        counts = counts.sort_index()
+    return n_rows, counts
+
+
+# เลือกแถวแบบสุ่มไม่เกิน per_class แถวต่อคลาส (สุ่มเท่ากันทุกแถวภายในคลาส) คืนค่าดัชนีของแถวที่เลือก
+def balanced_indices(codes, per_class, rng):
+    keys = rng.random(len(codes))
+    order = np.lexsort((keys, codes))
+    sorted_codes = codes[order]
+    # ลำดับที่ของแต่ละแถวภายในคลาสของตัวเอง
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    rank = np.arange(len(codes)) - np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+    return np.sort(order[rank < per_class])
+
+
+# กลุ่มตัวอย่างแบบแบ่งชั้นตามคลาส ขนาดไม่เกิน per_class แถวต่อคลาส ไม่ว่าจะป้อนข้อมูลเข้ามากี่แถว
+# ทุกแถวที่ผ่านเข้ามามีโอกาสถูกเลือกเท่ากันภายในคลาส (เก็บแถวที่สุ่ม key ได้น้อยที่สุด per_class แถว)
+class ClassBalancedReservoir:
+    def __init__(self, per_class, n_classes, n_features=len(FEATURE_COLUMNS), seed=None):
+        self.per_class = per_class
+        self.rng = np.random.default_rng(seed)
+        self.seen = np.zeros(n_classes, dtype=np.int64)
+        self._keys = [np.empty(0) for _ in range(n_classes)]
+        self._values = [np.empty((0, n_features), dtype=np.float32) for _ in range(n_classes)]
+
+    def add(self, values, codes):
+        keys = self.rng.random(len(codes))
+        for code in np.unique(codes):
+            mask = codes == code
+            self.seen[code] += int(mask.sum())
+            merged_keys = np.concatenate([self._keys[code], keys[mask]])
+            merged_values = np.concatenate([self._values[code], values[mask]])
+            if len(merged_keys) > self.per_class:
+                keep = np.argpartition(merged_keys, self.per_class)[:self.per_class]
+                merged_keys, merged_values = merged_keys[keep], merged_values[keep]
+            self._keys[code], self._values[code] = merged_keys, merged_values
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys)
+
+    # คืนค่า (values, codes) ของกลุ่มตัวอย่างทั้งหมด
+    def sample(self):
+        codes = np.concatenate([np.full(len(keys), code) for code, keys in enumerate(self._keys)])
+        return np.concatenate(self._values), codes
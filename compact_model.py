@@ -0,0 +1,246 @@
+import argparse
+import copy
+import os
+import pickle
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from fast_forest import FlatForest
+from inference import FEATURE_COLUMNS, decode_probabilities
+from model_loader import MODEL_PATH, ENCODER_PATH
+from model_selection import load_file_sample, measure_latency, parse_values
+from rolling_features import engine_for_model
+from rules import label_abnormality
+from synthetic_data import create_synthetic_data
+
+# สร้างโมเดลรุ่นเล็กจาก machine_failure_model.pkl โดยไม่ต้องเทรนใหม่ แล้วเทียบกับโมเดลเต็ม
+# - ลดจำนวนต้นไม้: เรียงต้นไม้แบบ greedy ให้ค่าเฉลี่ยของต้นที่เลือกใกล้ความน่าจะเป็นของโมเดลเต็มที่สุด แล้วเก็บ k ต้นแรก
+# - จำกัดความลึก: ตัดกิ่งที่ลึกเกิน max_depth ให้โหนดนั้นเป็นใบ (ใช้สัดส่วนคลาสที่ sklearn เก็บไว้ทุกโหนด)
+# - ชนิดข้อมูลเล็กลง: FlatForest.compact() (เปิดในแดชบอร์ดด้วย COMPACT_FLAT_FOREST = True)
+# รายงานความตรงกันกับโมเดลเต็ม ความแม่นยำ หน่วยความจำ และ latency ของแต่ละรุ่น
+# ใช้งาน: python compact_model.py --min-agreement 0.99
+#         python compact_model.py --trees 25 --depths 10 --save machine_failure_model.pkl  (แทนที่โมเดลเดิม)
+
+TREE_COUNTS = [10, 25, 50]
+DEPTHS = [None, 8, 12]
+
+TREE_LEAF = -1
+TREE_UNDEFINED = -2
+
+
+# ===== สร้างโมเดลรุ่นเล็ก =====
+
+# ตัดต้นไม้ sklearn หนึ่งต้นที่ความลึก max_depth (แก้ tree_ ผ่าน __getstate__/__setstate__) และทิ้งโหนดที่ไม่ถูกใช้
+def truncate_tree(estimator, max_depth):
+    estimator = copy.deepcopy(estimator)
+    state = estimator.tree_.__getstate__()
+    nodes, values = state["nodes"], state["values"]
+
+    # ไล่จาก root ตามลำดับกว้าง เก็บเฉพาะโหนดที่ลึกไม่เกิน max_depth
+    keep, depths = [0], [0]
+    for node, depth in zip(keep, depths):
+        if nodes["left_child"][node] != TREE_LEAF and depth < max_depth:
+            keep.extend([nodes["left_child"][node], nodes["right_child"][node]])
+            depths.extend([depth + 1, depth + 1])
+    keep = np.array(keep)
+    new_index = np.full(len(nodes), TREE_LEAF, dtype=np.int64)
+    new_index[keep] = np.arange(len(keep))
+
+    new_nodes = nodes[keep].copy()
+    is_leaf = (new_nodes["left_child"] == TREE_LEAF) | (np.array(depths) >= max_depth)
+    new_nodes["left_child"] = np.where(is_leaf, TREE_LEAF, new_index[new_nodes["left_child"]])
+    new_nodes["right_child"] = np.where(is_leaf, TREE_LEAF, new_index[new_nodes["right_child"]])
+    new_nodes["feature"][is_leaf] = TREE_UNDEFINED
+    new_nodes["threshold"][is_leaf] = TREE_UNDEFINED
+
+    state.update(nodes=new_nodes, values=np.ascontiguousarray(values[keep]), node_count=len(keep),
+                 max_depth=min(state["max_depth"], max_depth))
+    estimator.tree_.__setstate__(state)
+    return estimator
+
+
+# RandomForestClassifier ชุดใหม่ที่มีเฉพาะต้นไม้ tree_ids (ตัดความลึกถ้าระบุ max_depth)
+def compact_forest(model, tree_ids, max_depth=None):
+    compact = copy.copy(model)
+    estimators = [model.estimators_[i] for i in tree_ids]
+    if max_depth is not None:
+        estimators = [truncate_tree(estimator, max_depth) for estimator in estimators]
+    compact.estimators_ = estimators
+    compact.n_estimators = len(estimators)
+    return compact
+
+
+# เรียงต้นไม้แบบ greedy: แต่ละรอบเลือกต้นที่ทำให้ค่าเฉลี่ยของต้นที่เลือกแล้วใกล้ full_proba ที่สุด (squared error)
+# per_tree คือความน่าจะเป็นของแต่ละต้น (n_trees, N, n_classes)
+def order_trees(per_tree, full_proba, n_keep):
+    remaining = list(range(len(per_tree)))
+    order, total = [], np.zeros_like(full_proba)
+    for k in range(1, min(n_keep, len(per_tree)) + 1):
+        candidates = (total + per_tree[remaining]) / k
+        errors = ((candidates - full_proba) ** 2).sum(axis=(1, 2))
+        best = remaining.pop(int(np.argmin(errors)))
+        order.append(best)
+        total += per_tree[best]
+    return order
+
+
+def per_tree_proba(forest, X):
+    return forest.leaf_values[forest.apply(X).T]
+
+
+# ===== ข้อมูลที่ใช้ประเมิน =====
+
+# คืนค่า (X float32 ที่มีคอลัมน์ตามโมเดล, รหัสคลาสตาม le หรือ -1 ถ้าโมเดลไม่รู้จักคลาสนั้น)
+def load_evaluation_data(model, le, args):
+    if args.data:
+        X, codes, class_names = load_file_sample(args.data, args.per_class, args.label_column, seed=args.seed)
+        labels = np.asarray(class_names, dtype=object)[codes]
+    else:
+        data = create_synthetic_data(args.samples, seed=args.seed)
+        X, labels = data[FEATURE_COLUMNS].to_numpy(dtype=np.float32), data["Failure_Type"].astype(str).to_numpy()
+        if not np.isin(labels, le.classes_).all():
+            # โมเดลที่เทรนจาก gendata.ipynb ใช้ป้ายกำกับตามกฎ (Abnormality_Type) แทน Failure_Type
+            labels = np.asarray(label_abnormality(data), dtype=object)
+    y = pd.Series(labels).map({name: code for code, name in enumerate(le.classes_)}).fillna(-1).to_numpy(np.int64)
+
+    # โมเดลที่เทรนด้วยคุณลักษณะย้อนหลัง: คำนวณตามลำดับแถว (ใช้เทียบรุ่นเล็กกับโมเดลเต็มได้ตามปกติ)
+    engine = engine_for_model(model)
+    if engine is not None:
+        X = np.hstack([X, engine.transform(None, X).astype(np.float32)])
+    return X, y
+
+
+# ===== รายงาน =====
+
+def evaluate_variant(forest, X_eval, y_eval, full, class_names):
+    proba = forest.predict_proba(X_eval)
+    labels, abnormalities = decode_probabilities(proba, class_names)
+    known = y_eval >= 0
+    latency_row, latency_batch_row = measure_latency(forest, X_eval, repeat=1000)
+    return {
+        "nodes": int(forest.feature.size),
+        "flat_kb": forest.nbytes / 1024,
+        "agreement": float(np.mean(labels == full["labels"])),
+        "abnormality_agreement": float(np.mean([a == b for a, b in zip(abnormalities, full["abnormalities"])])),
+        "max_proba_diff": float(np.abs(proba - full["proba"]).max()),
+        "accuracy": float(np.mean(forest.predict(X_eval[known]) == y_eval[known])) if known.any() else None,
+        "latency_row_us": latency_row * 1e6,
+        "latency_batch_row_us": latency_batch_row * 1e6,
+    }
+
+
+def print_report(report):
+    print(f"{'ต้นไม้':>6} {'ความลึก':>7} {'ชนิดข้อมูล':>10} {'nodes':>8} {'flat KB':>8} {'pickle KB':>9} "
+          f"{'ตรงกัน':>7} {'ผิดปกติตรง':>10} {'Δproba':>7} {'accuracy':>8} {'µs/แถว':>7} {'µs/แถว(batch)':>13}")
+    for row in report.itertuples():
+        depth = "None" if pd.isna(row.max_depth) else int(row.max_depth)
+        accuracy = "-" if pd.isna(row.accuracy) else f"{row.accuracy:.4f}"
+        print(f"{row.trees:>6} {depth:>7} {row.dtypes:>10} {row.nodes:>8,} {row.flat_kb:>8.0f} {row.pickle_kb:>9.0f} "
+              f"{row.agreement:>7.4f} {row.abnormality_agreement:>10.4f} {row.max_proba_diff:>7.4f} {accuracy:>8} "
+              f"{row.latency_row_us:>7.0f} {row.latency_batch_row_us:>13.2f}")
+
+
+# รุ่นที่ใช้หน่วยความจำน้อยที่สุดในบรรดารุ่นที่ผลตรงกับโมเดลเต็มถึงเกณฑ์ (None ถ้าไม่มี)
+# metric: "abnormality_agreement" (รายการความผิดปกติที่แดชบอร์ดแสดง) หรือ "agreement" (ป้ายกำกับหลักเท่านั้น)
+def smallest_meeting(report, min_agreement, metric="abnormality_agreement"):
+    passing = report[report[metric] >= min_agreement]
+    if passing.empty:
+        return None
+    return passing.sort_values(["flat_kb", "latency_row_us"]).iloc[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="สร้างและเปรียบเทียบโมเดลรุ่นเล็กจากโมเดล RandomForest ที่เทรนแล้ว")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--encoder", default=ENCODER_PATH)
+    parser.add_argument("--data", help="ไฟล์ .csv/.parquet สำหรับประเมิน (ไม่ระบุ = ใช้ข้อมูลจำลอง)")
+    parser.add_argument("--label-column")
+    parser.add_argument("--per-class", type=int, default=5_000, help="จำนวนแถวสูงสุดต่อคลาสที่โหลดจากไฟล์")
+    parser.add_argument("--samples", type=int, default=20_000, help="จำนวนแถวของข้อมูลจำลอง")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--trees", default=",".join(map(str, TREE_COUNTS)), help="จำนวนต้นไม้ที่ทดลอง")
+    parser.add_argument("--depths", default=",".join(map(str, DEPTHS)), help="ความลึกสูงสุดที่ทดลอง (None = ไม่จำกัด)")
+    parser.add_argument("--min-agreement", type=float, default=0.99,
+                        help="สัดส่วนขั้นต่ำที่ผลตรงกับโมเดลเต็ม สำหรับเลือกรุ่นที่เล็กที่สุด")
+    parser.add_argument("--metric", choices=["abnormality_agreement", "agreement"], default="abnormality_agreement",
+                        help="เทียบรายการความผิดปกติทั้งหมดที่แดชบอร์ดแสดง (เกณฑ์ความน่าจะเป็น 0.15) "
+                             "หรือเฉพาะป้ายกำกับหลัก")
+    parser.add_argument("--report", default="compact_model.csv", help="ไฟล์รายงาน (.csv หรือ .json)")
+    parser.add_argument("--save", help="บันทึกรุ่นที่เลือกเป็นไฟล์โมเดล sklearn (ถ้าเป็นไฟล์เดิม จะสำรองเป็น .full.pkl ก่อน)")
+    args = parser.parse_args()
+
+    model, le = joblib.load(args.model), joblib.load(args.encoder)
+    full_forest = FlatForest.from_sklearn(model)
+    class_names = np.asarray(le.inverse_transform(model.classes_), dtype=object)
+    X, y = load_evaluation_data(model, le, args)
+
+    # ครึ่งแรกใช้เรียงต้นไม้ ครึ่งหลังใช้ประเมิน (ไม่วัดบนแถวที่ใช้เลือก)
+    shuffled = np.random.default_rng(args.seed).permutation(len(X))
+    select_rows, eval_rows = shuffled[:len(X) // 2], shuffled[len(X) // 2:]
+    X_select, X_eval, y_eval = X[select_rows], X[eval_rows], y[eval_rows]
+
+    full_proba = full_forest.predict_proba(X_eval)
+    full_labels, full_abnormalities = decode_probabilities(full_proba, class_names)
+    full = {"proba": full_proba, "labels": full_labels, "abnormalities": full_abnormalities}
+
+    tree_counts = sorted({min(int(n), model.n_estimators) for n in args.trees.split(",") if n.strip().lower() != "all"}
+                         | {model.n_estimators})
+    order = order_trees(per_tree_proba(full_forest, X_select), full_forest.predict_proba(X_select), max(tree_counts))
+    print(f"โมเดลเต็ม {model.n_estimators} ต้น ความลึกสูงสุด {full_forest.max_depth}, "
+          f"ประเมินบน {len(X_eval):,} แถว ({'ไฟล์ ' + args.data if args.data else 'ข้อมูลจำลอง'})")
+
+    rows, variants = [], {}
+    for n_trees in tree_counts:
+        for max_depth in parse_values(args.depths):
+            if max_depth is not None and max_depth >= full_forest.max_depth:
+                continue
+            candidate = compact_forest(model, order[:n_trees], max_depth)
+            pickle_kb = len(pickle.dumps(candidate, protocol=pickle.HIGHEST_PROTOCOL)) / 1024
+            forest = FlatForest.from_sklearn(candidate)
+            for dtypes, variant in [("float64", forest), ("compact", forest.compact())]:
+                key = (n_trees, max_depth, dtypes)
+                variants[key] = candidate
+                rows.append({"trees": n_trees, "max_depth": max_depth, "dtypes": dtypes, "pickle_kb": pickle_kb,
+                             **evaluate_variant(variant, X_eval, y_eval, full, class_names)})
+
+    report = pd.DataFrame(rows)
+    report["max_depth"] = report["max_depth"].astype("Int64")
+    print_report(report)
+    if args.report.endswith(".json"):
+        report.to_json(args.report, orient="records", indent=1)
+    else:
+        report.to_csv(args.report, index=False)
+    print(f"บันทึกรายงานที่ {args.report}")
+
+    best = smallest_meeting(report, args.min_agreement, args.metric)
+    if best is None:
+        print(f"ไม่มีรุ่นที่ {args.metric} ถึง {args.min_agreement}")
+        return
+    depth = None if pd.isna(best["max_depth"]) else int(best["max_depth"])
+    print(f"เล็กที่สุดที่ {args.metric} >= {args.min_agreement}: {int(best['trees'])} ต้น, max_depth={depth}, "
+          f"{best['dtypes']} ({best[args.metric]:.4f}, {best['flat_kb']:.0f} KB, {best['latency_row_us']:.0f} µs/แถว)")
+
+    if args.save:
+        if os.path.abspath(args.save) == os.path.abspath(args.model):
+            # สำรองเฉพาะครั้งแรก รันซ้ำแล้วไฟล์โมเดลเป็นรุ่นเล็กไปแล้ว จะไม่เขียนทับโมเดลเต็มที่สำรองไว้
+            backup = os.path.splitext(args.model)[0] + ".full.pkl"
+            if os.path.exists(backup):
+                print(f"มีโมเดลเต็มสำรองไว้แล้วที่ {backup} (ไม่เขียนทับ)")
+            else:
+                shutil.copy2(args.model, backup)
+                print(f"สำรองโมเดลเต็มไว้ที่ {backup}")
+
+        # เขียนไฟล์ชั่วคราวแล้วแทนที่ แดชบอร์ดที่ตรวจไฟล์โมเดลอยู่จะไม่เห็นไฟล์ที่เขียนไม่เสร็จ
+        temporary = args.save + ".tmp"
+        joblib.dump(variants[(int(best["trees"]), depth, best["dtypes"])], temporary)
+        os.replace(temporary, args.save)
+        print(f"บันทึกโมเดลรุ่นเล็กที่ {args.save} (ใช้ LabelEncoder เดิม {args.encoder})")
+        if best["dtypes"] == "compact":
+            print("ตั้ง COMPACT_FLAT_FOREST = True ใน dashboard.py เพื่อใช้ชนิดข้อมูลแบบ compact")
+
+
+if __name__ == "__main__":
+    main()
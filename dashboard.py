@@ -1,103 +1,210 @@
+import time
+_startup_started = time.perf_counter()  # จับเวลาการเริ่มระบบตั้งแต่ import
+
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import plotly.graph_objs as go
 import pandas as pd
 import numpy as np
+import os
 import random
-import joblib
-import time
 import base64
+import functools
+import json
+import math
+import atexit
+import threading
 from datetime import datetime
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-
-# โหลดโมเดล Machine Learning และ Label Encoder
-# ถ้าไม่มีโมเดลอยู่แล้ว เราจะสร้างโมเดลและเทรนง่ายๆ ขึ้นมาใช้
-try:
-    loaded_model = joblib.load("machine_failure_model.pkl")
-    loaded_le = joblib.load("label_encoder.pkl")
-    print("โหลดโมเดลที่มีอยู่แล้วสำเร็จ")
-except:
-    print("ไม่พบโมเดลที่มีอยู่แล้ว จะสร้างโมเดลใหม่...")
-    # สร้างข้อมูลจำลองสำหรับเทรนโมเดล
-    def create_synthetic_data(n_samples=1000):
-        data = []
-        failure_types = ["Normal", "Bearing Failure", "Motor Overheating", 
-                         "Misalignment", "Loose Components", "Excessive Load"]
-        
-        for _ in range(n_samples):
-            temperature = random.uniform(50, 130)
-            vibration = random.uniform(0.1, 2.5)
-            machine_age = random.randint(1, 10)
-            humidity = random.randint(25, 75)
-            rpm = random.randint(1000, 5500)
-            operating_hours = random.randint(1000, 8500)
-            
-            # กำหนดเงื่อนไขความผิดปกติ (คล้ายกับ rule-based แต่เพิ่มความซับซ้อน)
-            if temperature > 105 and vibration > 1.2:
-                failure = "Motor Overheating"
-            elif vibration > 1.8 and rpm > 4000:
-                failure = "Misalignment"
-            elif humidity < 30 and vibration > 1.0:
-                failure = "Bearing Failure"
-            elif machine_age > 8 and operating_hours > 7000:
-                failure = "Loose Components"
-            elif rpm > 4800 or (rpm > 4200 and temperature > 95):
-                failure = "Excessive Load"
-            else:
-                failure = "Normal"
-                
-            # เพิ่มความหลากหลายและ noise ให้ข้อมูล
-            if random.random() < 0.15:  # สุ่ม 15% ของข้อมูลให้แตกต่างจากกฎ
-                failure = random.choice(failure_types)
-                
-            data.append({
-                "Temperature": temperature,
-                "Vibration": vibration,
-                "Machine_Age": machine_age,
-                "Humidity": humidity,
-                "RPM": rpm,
-                "Operating_Hours": operating_hours,
-                "Failure_Type": failure
-            })
-        
-        return pd.DataFrame(data)
-    
-    # สร้างข้อมูลสำหรับเทรนโมเดล
-    train_data = create_synthetic_data(2000)
-    
-    # แปลงคลาสให้เป็นตัวเลขด้วย LabelEncoder
-    le = LabelEncoder()
-    y = le.fit_transform(train_data["Failure_Type"])
-    X = train_data.drop("Failure_Type", axis=1)
-    
-    # สร้างและเทรนโมเดล RandomForest
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model.fit(X, y)
-    
-    # บันทึกโมเดลและ LabelEncoder
-    joblib.dump(model, "machine_failure_model.pkl")
-    joblib.dump(le, "label_encoder.pkl")
-    
-    # กำหนดตัวแปรให้กับโค้ดที่เหลือ
-    loaded_model = model
-    loaded_le = le
-    print("สร้างและบันทึกโมเดลใหม่เรียบร้อย")
+import flask
+from downsample import downsample, envelope
+from drift_monitor import DriftMonitor, build_profile, load_profile
+from inference import FEATURE_COLUMNS, predict_batch, class_names_for
+from metrics import CONTENT_TYPE, MetricsRegistry
+from model_loader import PROFILE_PATH, load_compiled_model, load_sklearn_model
+from micro_batch import BATCH_SIZE_BUCKETS, QUEUE_DEPTH_BUCKETS, MicroBatcher
+from prediction_cache import PredictionCache
+from push import Broadcaster
+from rolling_features import engine_for_model
+from rules import SENSOR_CARD_RULES
+from synthetic_data import create_synthetic_data
+from state_backend import InMemoryStateBackend, SQLiteStateBackend
+from timeseries_store import SensorHistoryStore
+from ingestion import IngestionService, UDPSensorReader, SensorSimulator
+from replay import ReplaySource
+
+# ใช้ตัวประเมิน FlatForest แทน predict_proba ของ sklearn (ผลลัพธ์เท่ากันทุกบิต แต่เร็วกว่ามากสำหรับแถวเดียว)
+USE_FLAT_FOREST = True
+
+# FlatForest แบบชนิดข้อมูลเล็กลง (feature เป็น uint8/uint16, threshold และค่าในใบเป็น float32, left/right ยังเป็น intp)
+# ลดหน่วยความจำราว 40% ดูผลกระทบได้จาก python compact_model.py
+COMPACT_FLAT_FOREST = False
+
+# เวลาที่ใช้ในแต่ละขั้นตอนตอนเริ่มระบบ (วินาที) ดูได้ที่ /ready
+STARTUP_TIMINGS = {}
+
+# โหลดโมเดล Machine Learning (ไม่เทรนตอนเริ่มเว็บ ถ้ายังไม่มีไฟล์โมเดลให้รัน python train_model.py ก่อน)
+# โหมด FlatForest โหลดไฟล์ที่แปลงไว้แล้วแบบ memory-map โดยไม่ต้องโหลด sklearn
+# ถ้ารันด้วย gunicorn --preload ทุก worker จะใช้หน่วยความจำของโมเดลร่วมกัน
+# คืนค่า (scoring_model, loaded_model, loaded_le, loaded_class_names)
+def load_model():
+    if USE_FLAT_FOREST:
+        forest, class_names = load_compiled_model(compact=COMPACT_FLAT_FOREST)
+        return forest, forest, None, class_names
+    model, le = load_sklearn_model()
+    # ชื่อคลาสเรียงตามคอลัมน์ของ predict_proba (คำนวณครั้งเดียวตอนโหลดโมเดล)
+    return model, model, le, class_names_for(model, le)
+
+# โหลดโมเดลใหม่หลังจากไฟล์โมเดลถูกแทนที่ (เช่นรัน train_model.py ขณะที่แดชบอร์ดยังทำงานอยู่)
+def reload_model():
+    global scoring_model, loaded_model, loaded_le, loaded_class_names, rolling_engine
+    scoring_model, loaded_model, loaded_le, loaded_class_names = load_model()
+    rolling_engine = engine_for_model(loaded_model)
+    if drift_monitor is not None:
+        drift_monitor.set_profile(load_training_profile())
+    print("โหลดโมเดลใหม่หลังจากไฟล์โมเดลเปลี่ยน")
+
+_stage_started = time.perf_counter()
+scoring_model, loaded_model, loaded_le, loaded_class_names = load_model()
+# คุณลักษณะย้อนหลังต่อเครื่อง (None ถ้าโมเดลไม่ได้เทรนด้วย train_model.py --rolling)
+rolling_engine = engine_for_model(loaded_model)
+STARTUP_TIMINGS["imports"] = _stage_started - _startup_started
+STARTUP_TIMINGS["model_load"] = time.perf_counter() - _stage_started
+print("โหลดโมเดลที่มีอยู่แล้วสำเร็จ")
+
+# seed ของค่าจำลอง (None = สุ่มใหม่ทุกครั้งที่รัน, กำหนดค่าเพื่อให้ได้ลำดับค่าเดิมทุกครั้ง)
+SENSOR_SEED = None
+sensor_random = random.Random(SENSOR_SEED)
 
 # ฟังก์ชันจำลองค่าจากเซ็นเซอร์
 def generate_sensor_data():
     return {
-        "Temperature": round(random.uniform(50, 120), 2),  # °C
-        "Vibration": round(random.uniform(0.1, 2.0), 2),  # G-force
-        "Machine_Age": random.randint(1, 10),             # Years
-        "Humidity": random.randint(30, 70),               # %
-        "RPM": random.randint(1000, 5000),               # รอบต่อนาที
-        "Operating_Hours": random.randint(1000, 8000)    # ชั่วโมง
+        "Temperature": round(sensor_random.uniform(50, 120), 2),  # °C
+        "Vibration": round(sensor_random.uniform(0.1, 2.0), 2),  # G-force
+        "Machine_Age": sensor_random.randint(1, 10),             # Years
+        "Humidity": sensor_random.randint(30, 70),               # %
+        "RPM": sensor_random.randint(1000, 5000),               # รอบต่อนาที
+        "Operating_Hours": sensor_random.randint(1000, 8000)    # ชั่วโมง
     }
 
-# ตั้งค่าเริ่มต้นของกราฟ
-sensor_data_history = pd.DataFrame(columns=["Time", "Temperature", "Vibration", "RPM"])
+# cache ผลทำนายของค่าเซ็นเซอร์ที่ซ้ำหรือใกล้เคียงกัน (จำนวนรายการสูงสุด, 0 = ไม่ใช้ cache)
+# ความละเอียดของแต่ละค่าเซ็นเซอร์กำหนดได้ที่ PREDICTION_CACHE_RESOLUTIONS (None = DEFAULT_RESOLUTIONS)
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_RESOLUTIONS = None
+
+# รวมคำขอทำนายจาก callback ของหลาย session ที่เข้ามาพร้อมกันเป็น micro-batch (predict_proba ครั้งเดียวต่อ batch)
+# ขนาด batch สูงสุด (1 = ทำนายทีละค่าใน thread ของผู้เรียก) และเวลาที่รอคำขออื่นก่อนทำนาย (วินาที)
+# ค่าเริ่มต้นเป็น 1: ตอนนี้ผู้เรียกมีเพียง sample_tick ซึ่ง state.claim_sample จำกัดไว้ครั้งเดียวต่อ
+# MIN_SAMPLE_INTERVAL ต่อ process จึงไม่มีคำขอพร้อมกันให้รวม (โหมด service ทำนายเป็น batch เองอยู่แล้ว)
+# เปิดใช้เมื่อมีเส้นทางที่ทำนายทีละค่าจากหลาย thread พร้อมกัน
+INFERENCE_MAX_BATCH = 1
+
+INFERENCE_MAX_WAIT = 0.002
+
+# ตรวจว่าค่าเซ็นเซอร์ยังมีการกระจายเหมือนข้อมูลเทรนหรือไม่ (drift_monitor.py) ทุกกี่วินาที (0 = ไม่ตรวจ)
+# เทียบกับโปรไฟล์ที่ train_model.py บันทึกไว้ (PROFILE_PATH) ถ้ายังไม่มีไฟล์จะสร้างจาก create_synthetic_data
+# ขนาด DRIFT_FALLBACK_ROWS แถว (การกระจายเดียวกับที่ train_model.py ใช้เทรนโดยค่าเริ่มต้น)
+# ในโหมด poll ที่มีหลาย worker แต่ละ process ตรวจเฉพาะค่าที่ตัวเองรับ (ทุก process รับค่าจากแหล่งเดียวกัน)
+DRIFT_CHECK_INTERVAL = 60
+DRIFT_FALLBACK_ROWS = 20_000
+
+# รหัสเครื่องจักรที่แดชบอร์ดนี้แสดง
+MACHINE_ID = "M-7842"
+
+# ไฟล์ฐานข้อมูลสำหรับเก็บค่าเซ็นเซอร์และความผิดปกติทั้งหมดแบบถาวร (None = ไม่บันทึก)
+# ตัวแปรแวดล้อม DASHBOARD_HISTORY_DB ใช้แทนได้ (benchmark ใช้ไฟล์ชั่วคราว ไม่แตะไฟล์จริงตั้งแต่ import)
+HISTORY_DB_PATH = os.environ.get("DASHBOARD_HISTORY_DB", "sensor_history.db")
+
+history_store = SensorHistoryStore(HISTORY_DB_PATH) if HISTORY_DB_PATH else None
+if history_store is not None:
+    # เขียนข้อมูลที่ค้างอยู่ลงฐานข้อมูลก่อนปิดโปรแกรม
+    atexit.register(history_store.close)
+
+# จำนวนจุดที่เก็บไว้แสดงในกราฟ และจำนวนเหตุการณ์ความผิดปกติที่แสดงในประวัติ
+SENSOR_HISTORY_WINDOW = 15
+ABNORMALITY_HISTORY_WINDOW = 10
+
+# ความผิดปกติประเภทเดียวกันที่ตรวจพบต่อเนื่องถูกรวมเป็นเหตุการณ์เดียว
+# เหตุการณ์สิ้นสุดเมื่อไม่พบประเภทนั้นติดต่อกันตามจำนวนค่านี้ (1 = สิ้นสุดทันทีที่พบค่าปกติ)
+ABNORMALITY_CLEAR_AFTER = 3
+
+# โหมดอัปเดตกราฟ: "incremental" ส่งเฉพาะจุดใหม่ผ่าน extendData, "full" สร้าง figure ใหม่ทุกครั้ง
+GRAPH_UPDATE_MODE = "incremental"
+
+# คอลัมน์ของกราฟ และรูปแบบของเส้นแต่ละเส้น
+GRAPH_SERIES = [
+    ("Temperature", "Temperature (°C)", "#ff5722"),
+    ("Vibration", "Vibration (G-force)", "#00bcd4"),
+    ("RPM", "RPM", "#76ff03"),
+]
+
+# กราฟแนวโน้มระยะยาว (อ่านจาก HISTORY_DB_PATH): ช่วงเวลาที่เลือกได้ (ชื่อ, วินาที), จำนวนจุดสูงสุดต่อเส้น
+# (ราวหนึ่งจุดต่อ pixel ของความกว้างกราฟ), วิธีลดจำนวนจุด ("lttb" หรือ "minmax" ดู downsample.py),
+# จำนวนแถวดิบสูงสุดที่อ่านต่อครั้ง (มากกว่านี้อ่านจาก rollup รายนาที/รายชั่วโมงแทน),
+# จำนวนผลที่ cache ไว้ และความถี่รีเฟรชช่วงเวลาล่าสุด (วินาที)
+TREND_RANGES = [("1 ชั่วโมง", 3600), ("24 ชั่วโมง", 86400), ("7 วัน", 7 * 86400), ("30 วัน", 30 * 86400)]
+TREND_DEFAULT_RANGE = 86400
+TREND_MAX_POINTS = 1000
+TREND_METHOD = "lttb"
+TREND_RAW_LIMIT = 200_000
+TREND_CACHE_SIZE = 64
+TREND_REFRESH_INTERVAL = 60
+
+# การ์ดแสดงค่าเซ็นเซอร์: (คอลัมน์, ไอคอน, ชื่อที่แสดง, หน่วยต่อท้าย)
+SENSOR_CARDS = [
+    ("Temperature", "fas fa-thermometer-half", "อุณหภูมิ", " °C"),
+    ("Vibration", "fas fa-vibration", "แรงสั่นสะเทือน", " G"),
+    ("RPM", "fas fa-tachometer-alt", "RPM", ""),
+    ("Humidity", "fas fa-tint", "ความชื้น", "%"),
+    ("Machine_Age", "fas fa-calendar-alt", "อายุเครื่อง", " ปี"),
+    ("Operating_Hours", "fas fa-clock", "ชั่วโมงทำงาน", " ชม."),
+]
+
+# ที่เก็บสถานะที่ทุก callback ใช้ร่วมกัน (ประวัติกราฟ, ประวัติความผิดปกติ และผลของรอบล่าสุด)
+# "memory" ใช้ได้กับ process เดียว, "sqlite" ใช้เมื่อรันหลาย worker (เช่น gunicorn -w 4 dashboard:server)
+STATE_BACKEND = "memory"
+STATE_DB_PATH = "dashboard_state.db"
+
+# อ่านค่าเซ็นเซอร์รอบใหม่ได้อย่างมากหนึ่งครั้งต่อช่วงเวลานี้ (วินาที) ไม่ว่าจะมีกี่ browser หรือกี่ worker
+# request ที่มาระหว่างนั้นจะได้ผลของรอบล่าสุดไปแสดง
+MIN_SAMPLE_INTERVAL = 4.0
+
+# ที่มาของค่าเซ็นเซอร์
+# "poll"     อ่านค่า (จำลอง) ใน callback เมื่อ browser ขออัปเดต
+# "service"  รัน IngestionService ใน process นี้ (รับ UDP + เครื่องจำลอง) callback อ่านผลล่าสุดอย่างเดียว
+# "replay"   เหมือน service แต่ค่ามาจากไฟล์ที่บันทึกไว้ (REPLAY_PATH) แทน UDP และเครื่องจำลอง
+# "external" ค่ามาจาก `python ingestion.py` หรือ `python replay.py` ที่รันแยก (ต้องใช้ STATE_BACKEND = "sqlite")
+INGESTION_MODE = "poll"
+
+# ในโหมด service/replay/external จะบันทึกค่าของ MACHINE_ID ลงกราฟอย่างมากหนึ่งจุดต่อช่วงเวลานี้ (วินาที)
+# (เวลาของโหมด replay คือเวลาของค่าในไฟล์ ที่ความเร็ว 10x กราฟจึงเลื่อนเร็วขึ้น 10 เท่า)
+# นับแยกต่อ process ที่เผยแพร่ ไม่ใช้ state.claim_sample ซึ่งเทียบกับเวลาจริงของโหมด poll
+SERVICE_PUBLISH_INTERVAL = 1.0
+
+# อัตราส่งของเครื่องจำลองในโหมด service (Hz)
+SIMULATOR_RATE_HZ = 100.0
+
+# โหมด replay: ไฟล์ .csv/.parquet, ความเร็ว (1 = เวลาจริง, 0 = เร็วที่สุด), อัตราที่บันทึกไว้เมื่อไฟล์ไม่มีคอลัมน์เวลา (Hz)
+# และเล่นวนเมื่อจบไฟล์หรือไม่ (แถวที่ไม่มีคอลัมน์รหัสเครื่องเป็นของ MACHINE_ID)
+REPLAY_PATH = os.path.join("data", "sensor_data_1000.csv")
+REPLAY_SPEED = 1.0
+REPLAY_RATE_HZ = 1.0
+REPLAY_LOOP = True
+
+# วิธีส่งค่าใหม่ไปยัง browser
+# "poll" browser ขออัปเดตทุก 5 วินาทีผ่าน dcc.Interval ไม่ว่าจะมีค่าใหม่หรือไม่
+# "push" เซิร์ฟเวอร์ส่งค่าใหม่ผ่าน Server-Sent Events ที่ /stream เฉพาะเมื่อมีค่าใหม่ (assets/push.js)
+#        ต้องใช้เซิร์ฟเวอร์ที่ถือการเชื่อมต่อค้างไว้ได้หลายอัน เช่น app.run หรือ gunicorn -k gthread --threads N
+UPDATE_MODE = "poll"
+
+# ความถี่ที่ตรวจหาค่าใหม่ในโหมด push (วินาที) ทำครั้งเดียวต่อ process ไม่ขึ้นกับจำนวน browser
+PUSH_CHECK_INTERVAL = 0.25
+
+if STATE_BACKEND == "sqlite":
+    state = SQLiteStateBackend(STATE_DB_PATH, SENSOR_HISTORY_WINDOW, ABNORMALITY_HISTORY_WINDOW,
+                               clear_after=ABNORMALITY_CLEAR_AFTER)
+else:
+    state = InMemoryStateBackend(SENSOR_HISTORY_WINDOW, ABNORMALITY_HISTORY_WINDOW, ABNORMALITY_CLEAR_AFTER)
 
 # ค่าเริ่มต้นสำหรับการแสดงข้อมูลเซ็นเซอร์
 last_sensor_data = {
@@ -109,15 +216,53 @@ last_sensor_data = {
     "Operating_Hours": 0
 }
 
-# สร้าง DataFrame สำหรับเก็บประวัติการตรวจพบความผิดปกติ
-abnormality_history = pd.DataFrame(columns=["Timestamp", "Abnormality_Type", "Temperature", "Vibration", "RPM", "Humidity"])
-
 # กำหนด External Stylesheets และ custom CSS
 external_stylesheets = ['https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.1/css/all.min.css']
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
+# Flask server สำหรับรันด้วย WSGI server หลาย process
+server = app.server
+
+# ตั้งค่าเป็น ready หลังจาก warm-up โมเดลเสร็จ
+startup_ready = threading.Event()
+
+# health check สำหรับ load balancer/process manager: 503 จนกว่าจะ warm-up เสร็จ
+@server.route("/ready")
+def ready():
+    if not startup_ready.is_set():
+        return {"ready": False}, 503
+    return {"ready": True, "startup_seconds": STARTUP_TIMINGS}
+
+# เวลาของแต่ละขั้นและตัวนับของ process นี้ (เปิดไว้ใน production ได้ ใช้เวลาราว 1 µs ต่อการวัดหนึ่งครั้ง)
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    "dashboard_stage_seconds", "เวลาที่ใช้ในแต่ละขั้นของการอัปเดตแดชบอร์ด (วินาที)", ["stage"])
+CALLBACK_SECONDS = metrics.histogram(
+    "dashboard_callback_request_seconds", "เวลาตอบ request ของ Dash callback รวมการแปลงผลเป็น JSON (วินาที)", ["output"])
+TICKS = metrics.counter("dashboard_ticks_total", "จำนวนรอบที่บันทึกค่าใหม่ลงกราฟและสถานะ")
+READINGS_SCORED = metrics.counter("dashboard_readings_scored_total", "จำนวนค่าเซ็นเซอร์ที่ทำนายแล้ว")
+ABNORMALITIES = metrics.counter(
+    "dashboard_abnormalities_total", "จำนวนความผิดปกติที่ตรวจพบแยกตามประเภท", ["type"])
+
+# จับเวลา request ของ callback ทั้งหมดที่ผ่าน Flask (label คือ output แรกของ callback)
+@server.before_request
+def start_callback_timer():
+    if flask.request.path.endswith("/_dash-update-component"):
+        flask.g.callback_started = time.perf_counter()
+
+@server.after_request
+def observe_callback_time(response):
+    started = flask.g.pop("callback_started", None)
+    if started is not None:
+        body = flask.request.get_json(silent=True) or {}
+        output = str(body.get("output", "")).strip(".").split("...")[0]
+        CALLBACK_SECONDS.observe(time.perf_counter() - started, output)
+    return response
+
+@server.route("/metrics")
+def metrics_endpoint():
+    return metrics.render(), 200, {"Content-Type": CONTENT_TYPE}
 
 # สร้างโฟลเดอร์ assets ถ้ายังไม่มี
-import os
 if not os.path.exists("assets"):
     os.makedirs("assets")
 
@@ -363,6 +508,37 @@ app.index_string = '''
                 flex-wrap: wrap;
             }
             
+            .event-open {
+                display: inline-block;
+                padding: 2px 6px;
+                border-radius: 4px;
+                font-size: 12px;
+                border: 1px solid #ff9800;
+                color: #ff9800;
+            }
+            
+            .drift-badge {
+                display: inline-block;
+                padding: 2px 8px;
+                border-radius: 4px;
+                font-size: 13px;
+                font-weight: 600;
+                color: #fff;
+                background-color: #555;
+            }
+            
+            .drift-badge.ok {
+                background-color: rgba(46, 125, 50, 0.8);
+            }
+            
+            .drift-badge.warn {
+                background-color: rgba(255, 152, 0, 0.8);
+            }
+            
+            .drift-badge.drift {
+                background-color: rgba(183, 28, 28, 0.8);
+            }
+            
             .history-empty {
                 text-align: center;
                 padding: 20px;
@@ -417,6 +593,123 @@ background_notice = """
 </body>
 </html>
 """
+
+# สร้าง figure ของกราฟเซ็นเซอร์จากข้อมูลในบัฟเฟอร์ (layout คงที่ ส่งไปครั้งเดียวในโหมด incremental)
+def build_sensor_figure():
+    _, history = state.sensor_history()
+    fig = go.Figure()
+    for column, name, color in GRAPH_SERIES:
+        fig.add_trace(go.Scatter(x=history["Time"], y=history[column],
+                                 mode="lines+markers", name=name, line=dict(color=color, width=3)))
+    return style_graph(fig)
+
+# รูปแบบของกราฟทั้งหมดในแดชบอร์ด
+def style_graph(fig):
+    fig.update_layout(
+        title=None,
+        xaxis_title="Time",
+        yaxis_title="Value",
+        plot_bgcolor="rgba(30, 30, 30, 0.8)",
+        paper_bgcolor="rgba(30, 30, 30, 0)",
+        font=dict(family="Roboto, sans-serif", color="#e0e0e0"),
+        legend=dict(orientation="h", y=1.1, font=dict(color="#e0e0e0"), bgcolor="rgba(30, 30, 30, 0.7)"),
+        margin=dict(l=40, r=40, t=20, b=40),
+        xaxis=dict(showgrid=True, gridcolor="rgba(255, 255, 255, 0.1)", tickfont=dict(color="#e0e0e0")),
+        yaxis=dict(showgrid=True, gridcolor="rgba(255, 255, 255, 0.1)", tickfont=dict(color="#e0e0e0")),
+        hovermode="x unified"
+    )
+    return fig
+
+# ===== กราฟแนวโน้มระยะยาว =====
+# อ่านจากฐานข้อมูลถาวร: ช่วงที่มีแถวดิบไม่เกิน TREND_RAW_LIMIT อ่านข้อมูลดิบ ช่วงที่ยาวกว่าอ่านค่าต่ำสุด/สูงสุดจาก rollup
+# แล้วลดจำนวนจุดให้เหลือไม่เกิน TREND_MAX_POINTS ต่อเส้น ค่า spike จึงยังเห็นได้ไม่ว่าจะดูช่วงยาวแค่ไหน
+
+# แกน x เป็นเวลาท้องถิ่น (Plotly แสดงวันที่ตามที่ส่งไปโดยไม่แปลง timezone และส่งช่วงที่ซูมกลับมาในรูปแบบเดียวกัน)
+LOCAL_UTC_OFFSET = time.localtime().tm_gmtoff
+
+# (ปัดเป็นมิลลิวินาทีซึ่งเป็นความละเอียดของวันที่ใน JavaScript)
+def axis_time(ts):
+    millis = np.round((np.asarray(ts, dtype=np.float64) + LOCAL_UTC_OFFSET) * 1000).astype(np.int64)
+    return pd.to_datetime(millis, unit="ms")
+
+def epoch_from_axis(value):
+    return pd.Timestamp(value).value / 1e9 - LOCAL_UTC_OFFSET
+
+# ปัดช่วงเวลาออกด้านนอกตามขนาดช่วงต่อจุด (ปัดเป็นกำลังสองของวินาที) เพื่อให้ช่วงที่ใกล้เคียงกัน
+# (รีเฟรชช่วงล่าสุด, ซูมกลับมาที่เดิม, หลาย browser) ใช้ผลใน cache ร่วมกัน
+def quantize_range(start, end, max_points):
+    step = 2.0 ** math.ceil(math.log2(max((end - start) / max_points, 1.0)))
+    return math.floor(start / step) * step, math.ceil(end / step) * step
+
+# คืนค่า (ความละเอียดที่อ่าน "raw"/"minute"/"hour", จำนวนแถวดิบในช่วง, {คอลัมน์: (x เป็น epoch, y)})
+@functools.lru_cache(maxsize=TREND_CACHE_SIZE)
+def trend_series(start, end, max_points, method):
+    count = history_store.count_readings(start, end, MACHINE_ID)
+    resolution, frame = history_store.query_trend(start, end, MACHINE_ID, TREND_RAW_LIMIT,
+                                                  raw_rate_hz=count / max(end - start, 1.0))
+    series = {}
+    for column, _, _ in GRAPH_SERIES:
+        if resolution == "raw":
+            x, y = frame["ts"].to_numpy(), frame[column].to_numpy()
+        else:
+            x, y = envelope(frame["bucket"], frame[f"{column}_min"], frame[f"{column}_max"])
+        series[column] = downsample(x, y, max_points, method)
+    return resolution, count, series
+
+# figure และคำอธิบายของช่วง [start, end)
+def build_trend_figure(start, end):
+    fig = go.Figure()
+    if history_store is None:
+        return style_graph(fig), "ไม่ได้บันทึกประวัติค่าเซ็นเซอร์ (HISTORY_DB_PATH = None)"
+
+    resolution, count, series = trend_series(*quantize_range(start, end, TREND_MAX_POINTS),
+                                             TREND_MAX_POINTS, TREND_METHOD)
+    for column, name, color in GRAPH_SERIES:
+        x, y = series[column]
+        fig.add_trace(go.Scatter(x=axis_time(x), y=y, mode="lines", name=name, line=dict(color=color, width=1.5)))
+    style_graph(fig)
+    fig.update_xaxes(range=list(axis_time([start, end])))
+    source = "ข้อมูลดิบ" if resolution == "raw" else f"rollup ราย{'นาที' if resolution == 'minute' else 'ชั่วโมง'}"
+    shown = max((len(x) for x, _ in series.values()), default=0)
+    return fig, f"{count:,} ค่าในช่วงนี้ อ่านจาก {source} แสดง {shown:,} จุดต่อเส้น"
+
+# ช่วงที่ผู้ใช้ซูม (epoch วินาที) จาก relayoutData หรือ None ถ้าไม่ได้ซูมแกน x
+def zoom_range(relayout):
+    if not relayout:
+        return None
+    if "xaxis.range[0]" in relayout:
+        bounds = relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    elif "xaxis.range" in relayout:
+        bounds = relayout["xaxis.range"]
+    else:
+        return None
+    return [epoch_from_axis(bounds[0]), epoch_from_axis(bounds[1])]
+
+# คืนค่า (figure, extendData, cursor ใหม่) สำหรับ client ที่เห็นข้อมูลถึงลำดับที่ cursor แล้ว
+def update_sensor_graph(cursor):
+    total, history = state.sensor_history()
+    if GRAPH_UPDATE_MODE != "incremental":
+        return build_sensor_figure(), dash.no_update, total
+
+    # เซิร์ฟเวอร์เริ่มใหม่ (cursor ของ client มากกว่าข้อมูลที่มี) ให้ส่ง figure ใหม่ทั้งหมด
+    cursor = cursor or 0
+    if cursor > total:
+        return build_sensor_figure(), dash.no_update, total
+
+    # จำนวนจุดใหม่ที่ client ยังไม่ได้รับ (ไม่เกินขนาดหน้าต่างของบัฟเฟอร์)
+    missing = min(total - cursor, len(history["Time"]))
+    if missing <= 0:
+        return dash.no_update, dash.no_update, total
+
+    times = history["Time"][-missing:].tolist()
+    extend_data = (
+        {"x": [times] * len(GRAPH_SERIES),
+         "y": [history[column][-missing:].tolist() for column, _, _ in GRAPH_SERIES]},
+        list(range(len(GRAPH_SERIES))),
+        SENSOR_HISTORY_WINDOW,
+    )
+    return dash.no_update, extend_data, total
+
 # ส่วนประกอบ UI ของแอป (เหมือนเดิม)
 app.layout = html.Div([
     # Header
@@ -435,13 +728,34 @@ app.layout = html.Div([
             html.Div([
                 html.Div("Real-Time Sensor Readings", className="card-title")
             ]),
-            html.Div(id="sensor-readings", className="sensor-grid")
+            html.Div([
+                html.Div([
+                    html.Div([html.I(className=f"{icon} sensor-icon"), label], className="sensor-label"),
+                    html.Div(id=f"sensor-{column}-reading", className="sensor-reading")
+                ], id=f"sensor-{column}-card", className="sensor-value")
+                for column, icon, label, _ in SENSOR_CARDS
+            ], id="sensor-readings", className="sensor-grid")
         ], className="card"),
         
         # Graphs
         html.Div([
             html.Div("Sensor Data Trends", className="card-title"),
-            dcc.Graph(id="sensor-graph", className="plot-container")
+            dcc.Graph(id="sensor-graph", figure=build_sensor_figure(), className="plot-container"),
+            # ลำดับข้อมูลล่าสุดที่ client นี้ได้รับแล้ว (ใช้กับโหมด incremental)
+            dcc.Store(id="graph-cursor", data=0)
+        ], className="card"),
+        
+        # แนวโน้มระยะยาวจากฐานข้อมูลถาวร (ซูมเพื่อดูรายละเอียดของช่วงที่เลือก)
+        html.Div([
+            html.Div("Long-Term Sensor Trends", className="card-title"),
+            dcc.RadioItems(id="trend-range", value=TREND_DEFAULT_RANGE, inline=True,
+                           options=[{"label": label, "value": seconds} for label, seconds in TREND_RANGES],
+                           labelStyle={"marginRight": "16px"}),
+            dcc.Graph(id="trend-graph", className="plot-container"),
+            html.Div(id="trend-info", className="sensor-label"),
+            # ช่วงที่ซูมอยู่ [start, end] (None = ช่วงล่าสุดตาม trend-range)
+            dcc.Store(id="trend-view", data=None),
+            dcc.Interval(id="trend-refresh", interval=TREND_REFRESH_INTERVAL * 1000, n_intervals=0)
         ], className="card"),
         
         # ประวัติความผิดปกติ
@@ -457,7 +771,7 @@ app.layout = html.Div([
                 html.Div([
                     html.Div([
                         html.Div("Machine ID:", className="sensor-label"),
-                        html.Div("M-7842", className="glow-text", style={"fontWeight": "600", "color": "#ffffff"})
+                        html.Div(MACHINE_ID, className="glow-text", style={"fontWeight": "600", "color": "#ffffff"})
                     ]),
                     html.Div([
                         html.Div("Location:", className="sensor-label"),
@@ -478,7 +792,17 @@ app.layout = html.Div([
         ], className="card"),
         
         # อัปเดตข้อมูลทุก 1 วินาที
-        dcc.Interval(id="interval-update", interval=5000, n_intervals=0),
+        # โหมด push ปิดการ poll ไว้ (ยังใช้ตอนโหลดหน้าและตอน client ขอข้อมูลที่ขาดหลังเชื่อมต่อใหม่)
+        dcc.Interval(id="interval-update", interval=5000, n_intervals=0, disabled=UPDATE_MODE == "push"),
+        *([dcc.Store(id="push-url", data=app.get_relative_path("/stream")),
+           html.Div(id="push-status", style={"display": "none"})] if UPDATE_MODE == "push" else []),
+
+        # ผลลัพธ์ของแต่ละรอบที่ callback ย่อยใช้ร่วมกัน
+        # status/history/model-info จะถูกเขียนเฉพาะเมื่อค่าที่ client นี้เห็นอยู่เปลี่ยนไป
+        dcc.Store(id="tick-store"),
+        dcc.Store(id="status-store"),
+        dcc.Store(id="history-store"),
+        dcc.Store(id="model-info-store"),
         
         # เพิ่มข้อมูลแสดงสถานะของโมเดล
         html.Div([
@@ -489,230 +813,556 @@ app.layout = html.Div([
 ])
 
 #ใช้โมเดล Machine Learning จริงในการทำนาย
-def predict_with_ml_model(sensor_data):
-    # แปลงข้อมูลเซ็นเซอร์เป็น DataFrame
-    input_df = pd.DataFrame([sensor_data])
-    
-    # ทำนายด้วยโมเดล
-    prediction_idx = loaded_model.predict(input_df)[0]
-    
-    # แปลงกลับเป็นชื่อประเภทความผิดปกติ
-    prediction = loaded_le.inverse_transform([prediction_idx])[0]
-    
-    # คำนวณความน่าจะเป็นสำหรับแต่ละคลาส
-    probabilities = loaded_model.predict_proba(input_df)[0]
-    
-    # จัดลำดับความน่าจะเป็นจากมากไปน้อย
-    sorted_indices = np.argsort(probabilities)[::-1]  # เรียงจากมากไปน้อย
-    
-    # สร้างรายการความผิดปกติที่มีความน่าจะเป็นสูงกว่าเกณฑ์
-    threshold = 0.15  # ความน่าจะเป็นขั้นต่ำที่จะรายงาน
-    abnormalities = []
-    
-    for idx in sorted_indices:
-        prob = probabilities[idx]
-        if prob >= threshold:
-            abnormality = loaded_le.inverse_transform([idx])[0]
-            abnormalities.append(abnormality)
-    
-    # ถ้ามี Normal และความผิดปกติอื่นๆ ให้ตัด Normal ออก
-    if "Normal" in abnormalities and len(abnormalities) > 1:
-        abnormalities.remove("Normal")
-    
-    # ถ้าไม่มีความผิดปกติที่เกินเกณฑ์ ให้เป็น Normal
-    if not abnormalities:
-        abnormalities = ["Normal"]
-    
+@STAGE_SECONDS.timed("predict")
+def predict_with_ml_model(sensor_data, machine_id=MACHINE_ID):
+    # คุณลักษณะย้อนหลังเปลี่ยนทุกค่า จึงใช้ cache ไม่ได้ (แต่ยังตรวจว่าไฟล์โมเดลเปลี่ยนหรือไม่)
+    if rolling_engine is not None and prediction_cache is not None:
+        prediction_cache.check_model()
+    engine = rolling_engine
+    if engine is not None:
+        return predict_uncached(sensor_data, engine.update(machine_id, sensor_data))
+    if prediction_cache is not None:
+        return prediction_cache.get(sensor_data)
+    return predict_uncached(sensor_data)
+
+# features: คุณลักษณะย้อนหลังของค่านี้ (จาก rolling_engine) สำหรับโมเดลที่เทรนด้วย --rolling
+def predict_uncached(sensor_data, features=None):
+    if inference_batcher is not None:
+        return inference_batcher.predict(sensor_data, features)
+    # ทำนายแบบ batch ขนาด 1 แถว (predict_proba รอบเดียว)
+    abnormalities, probabilities = predict_readings(
+        [sensor_data], None if features is None else features[np.newaxis])
+    return abnormalities[0], probabilities[0]
+
+# ทำนายค่าเซ็นเซอร์หลายค่า (รายการ dict) ด้วย predict_proba ครั้งเดียว ใช้โมเดลที่โหลดอยู่ตอนเรียก
+def predict_readings(readings, features=None):
+    _, abnormalities, probabilities = predict_batch(
+        scoring_model, loaded_le, readings, class_names=loaded_class_names, features=features)
     return abnormalities, probabilities
 
+# thread เดียวต่อ process ทำนายคำขอที่ cache ไม่มีจากทุก session เป็น batch
+inference_batcher = MicroBatcher(
+    predict_readings, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT,
+    batch_sizes=metrics.histogram(
+        "dashboard_inference_batch_size", "จำนวนค่าที่ทำนายพร้อมกันในแต่ละ micro-batch",
+        buckets=BATCH_SIZE_BUCKETS),
+    queue_depths=metrics.histogram(
+        "dashboard_inference_queue_depth", "จำนวนคำขอทำนายที่รออยู่ตอนส่งคำขอใหม่",
+        buckets=QUEUE_DEPTH_BUCKETS),
+    wait_seconds=metrics.histogram(
+        "dashboard_inference_wait_seconds", "เวลาที่คำขอทำนายรอในคิวก่อนเริ่มทำนาย (วินาที)"),
+) if INFERENCE_MAX_BATCH > 1 else None
+
+# โปรไฟล์การกระจายของข้อมูลเทรนของโมเดลที่โหลดอยู่
+def load_training_profile():
+    profile = load_profile(PROFILE_PATH)
+    if profile is None:
+        profile = build_profile(create_synthetic_data(DRIFT_FALLBACK_ROWS, seed=0)[FEATURE_COLUMNS].to_numpy())
+    return profile
+
+# histogram ของค่าที่เข้ามาต่อเครื่อง (หน่วยความจำคงที่) เทียบกับโปรไฟล์ทุก DRIFT_CHECK_INTERVAL วินาที
+drift_monitor = DriftMonitor(load_training_profile(), DRIFT_CHECK_INTERVAL) if DRIFT_CHECK_INTERVAL else None
+
+# ผลตรวจ drift ของ MACHINE_ID สำหรับการ์ด Model Information (ข้อความที่จัดรูปแบบแล้ว เปลี่ยนเฉพาะเมื่อตรวจรอบใหม่
+# หรือค่าปัจจุบันอยู่นอกช่วงที่เทรน) แสดงเฉพาะคุณลักษณะที่สถานะไม่ปกติ เรียงจาก PSI มากไปน้อย
+def drift_info(reading):
+    if drift_monitor is None:
+        return None
+    result = drift_monitor.result(MACHINE_ID)
+    info = {"status": "insufficient", "checked": None, "readings": 0, "features": [],
+            "outside": drift_monitor.reading_flags([reading[col] for col in FEATURE_COLUMNS])}
+    if result is not None:
+        features = sorted(result["features"].items(), key=lambda item: -item[1]["psi"])
+        info.update({
+            "status": result["status"],
+            "checked": time.strftime("%H:%M:%S", time.localtime(result["checked_at"])),
+            "readings": result["readings"],
+            "features": [[col, f["status"], f"PSI {f['psi']:.2f} · KS {f['ks']:.2f}",
+                          f"นอกช่วง {f['out_of_range']:.1%} · หาย {f['missing']:.1%}"]
+                         for col, f in features if f["status"] not in ("ok", "insufficient")],
+        })
+    return info
+
+# ล้างตัวเองและโหลดโมเดลใหม่อัตโนมัติเมื่อไฟล์โมเดลเปลี่ยน
+prediction_cache = PredictionCache(
+    predict_uncached, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_RESOLUTIONS,
+    on_model_change=reload_model) if PREDICTION_CACHE_SIZE else None
+
+# จำนวน hit/miss ของ cache ผลทำนาย
+@server.route("/prediction-cache")
+def prediction_cache_stats():
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+# สถิติของ cache ผลทำนายใน /metrics (อ่านค่าตอนแสดงผล ไม่เพิ่มงานตอนทำนาย)
+@metrics.add_collector
+def prediction_cache_metrics():
+    if prediction_cache is None:
+        return []
+    stats = prediction_cache.stats()
+    return [(f"dashboard_prediction_cache_{name}_total", "counter", f"จำนวน {name} ของ cache ผลทำนาย", [({}, stats[name])])
+            for name in ["hits", "misses", "evictions", "invalidations"]] + [
+        ("dashboard_prediction_cache_entries", "gauge", "จำนวนผลทำนายที่อยู่ใน cache", [({}, stats["entries"])])]
+
+# ทำนายข้อมูลจากหลายเครื่องพร้อมกัน รับ NumPy array (N, 6) หรือ DataFrame
+# คืนค่า (labels, abnormalities, probabilities) ของทุกแถว
+# machine_ids: รหัสเครื่องของแต่ละแถวสำหรับคุณลักษณะย้อนหลัง (None = ทุกแถวเป็นค่าของ MACHINE_ID เรียงตามเวลา)
+def predict_batch_with_ml_model(readings, machine_ids=None):
+    features = None
+    if rolling_engine is not None:
+        if machine_ids is None:
+            machine_ids = [MACHINE_ID] * len(readings)
+        features = rolling_engine.transform(machine_ids, readings)
+    return predict_batch(scoring_model, loaded_le, readings, class_names=loaded_class_names, features=features)
+
+# ตรวจค่าผิดปกติของเซ็นเซอร์แต่ละตัวสำหรับระบายสีการ์ด (เกณฑ์อยู่ใน SENSOR_CARD_RULES ของ rules.py)
+def sensor_flags(new_data):
+    return SENSOR_CARD_RULES.flags(new_data)
+
+# นับค่าเซ็นเซอร์ลง drift_monitor (ค่าเดียวหรือทั้ง batch) ก่อนทำนาย ค่า NaN นับเป็นค่าที่หายไป
+def observe_drift(machine_ids, readings):
+    if drift_monitor is not None:
+        with STAGE_SECONDS.time("drift"):
+            drift_monitor.observe(machine_ids, readings)
+
+# ผลตรวจ drift ทุกเครื่อง
+@server.route("/drift")
+def drift_results():
+    if drift_monitor is None:
+        return {"enabled": False}
+    return {"enabled": True, "interval": drift_monitor.interval, "last_check": drift_monitor.last_check,
+            "machines": drift_monitor.results()}
+
+# PSI/KS และสัดส่วนค่านอกช่วง/ค่าที่หายของผลตรวจล่าสุดใน /metrics
+@metrics.add_collector
+def drift_metrics():
+    if drift_monitor is None:
+        return []
+    results = drift_monitor.results()
+    return [(f"dashboard_drift_{name}", "gauge", help_text,
+             [({"machine": machine_id, "feature": col}, f[name])
+              for machine_id, result in results.items() for col, f in result["features"].items()])
+            for name, help_text in [("psi", "PSI ของค่าเซ็นเซอร์เทียบกับข้อมูลเทรน"),
+                                    ("ks", "KS ของค่าเซ็นเซอร์เทียบกับข้อมูลเทรน (จาก histogram)"),
+                                    ("out_of_range", "สัดส่วนค่าที่อยู่นอกช่วงของข้อมูลเทรน"),
+                                    ("missing", "สัดส่วนค่าที่หายไป (NaN)")]]
+
+# ความน่าจะเป็นที่จะแสดงในการ์ด Model Information เป็นข้อความที่จัดรูปแบบแล้ว
+# ใช้เปรียบเทียบกับค่าที่ client แสดงอยู่ ถ้าเหมือนเดิมก็ไม่ต้องส่งใหม่
+def model_info_rows(probabilities):
+    return [[class_name, f"{prob*100:.1f}%"]
+            for class_name, prob in zip(loaded_class_names, probabilities)
+            if prob >= 0.05]  # แสดงเฉพาะคลาสที่มีความน่าจะเป็นมากกว่า 5%
+
 # ฟังก์ชันอัปเดตข้อมูลแบบเรียลไทม์ (ปรับปรุงให้ใช้โมเดล ML)
+# รับค่าเซ็นเซอร์และทำนายหนึ่งครั้งต่อรอบ แล้วส่งผลต่อให้ callback ย่อยผ่าน dcc.Store
 @app.callback(
-    [Output("sensor-graph", "figure"),
-     Output("prediction-output", "children"),
-     Output("prediction-output", "className"),
-     Output("sensor-readings", "children"),
-     Output("abnormality-history", "children"),
-     Output("model-info", "children")],
-    [Input("interval-update", "n_intervals")]
+    [Output("tick-store", "data"),
+     Output("status-store", "data"),
+     Output("history-store", "data"),
+     Output("model-info-store", "data"),
+     Output("sensor-graph", "figure"),
+     Output("sensor-graph", "extendData"),
+     Output("graph-cursor", "data")],
+    [Input("interval-update", "n_intervals")],
+    [State("graph-cursor", "data"),
+     State("status-store", "data"),
+     State("history-store", "data"),
+     State("model-info-store", "data")]
 )
-def update_dashboard(n):
-    global sensor_data_history, last_sensor_data, abnormality_history
-    
+@STAGE_SECONDS.timed("update_dashboard")
+def update_dashboard(n, graph_cursor=None, shown_status=None, shown_history=None, shown_model_info=None):
+    # รับค่าใหม่เฉพาะเมื่อรอบก่อนหน้าเก่ากว่า MIN_SAMPLE_INTERVAL ไม่เช่นนั้นใช้ผลของรอบล่าสุด
+    # (ในโหมด service/replay/external ค่ามาจาก IngestionService จึงอ่านผลล่าสุดอย่างเดียว)
+    now = time.time()
+    if INGESTION_MODE == "poll" and state.claim_sample(now, MIN_SAMPLE_INTERVAL):
+        tick = sample_tick(now)
+    else:
+        tick = state.latest_tick()
+        if tick is None:
+            return (dash.no_update,) * 7
+
+    # อัปเดตกราฟ: ส่งเฉพาะจุดที่ client นี้ยังไม่มี หรือสร้าง figure ใหม่ทั้งหมด
+    with STAGE_SECONDS.time("graph"):
+        figure, extend_data, graph_cursor = update_sensor_graph(graph_cursor)
+
+    # ส่งเฉพาะส่วนที่เปลี่ยนไปจากที่ client แสดงอยู่
+    abnormalities = tick["abnormalities"]
+    status = abnormalities if abnormalities != shown_status else dash.no_update
+    history_version, _ = state.abnormality_history()
+    history = history_version if history_version != shown_history else dash.no_update
+    model_info = tick["model_info"] if tick["model_info"] != shown_model_info else dash.no_update
+
+    # ค่าเซ็นเซอร์และผลตรวจค่าผิดปกติ (การ์ดถูกอัปเดตฝั่ง browser ด้วย clientside callback)
+    card_data = {"reading": tick["reading"], "flags": tick["flags"]}
+
+    return card_data, status, history, model_info, figure, extend_data, graph_cursor
+
+# อ่านค่าเซ็นเซอร์หนึ่งรอบ ทำนาย แล้วบันทึกผลลงที่เก็บสถานะที่ทุก worker ใช้ร่วมกัน
+def sample_tick(now):
+    global last_sensor_data
+
     # รับค่าจากเซ็นเซอร์ (จำลอง)
-    new_data = generate_sensor_data()
+    with STAGE_SECONDS.time("read"):
+        new_data = generate_sensor_data()
     last_sensor_data = new_data  # เก็บค่าล่าสุดไว้
-    timestamp = time.strftime("%H:%M:%S")  # เวลา
-    full_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # วันที่และเวลาเต็มรูปแบบ
+
+    # นับค่าดิบลง drift_monitor ก่อนทำนาย (ค่าที่หายไปทำให้ทำนายไม่ได้ แต่ต้องถูกนับ)
+    observe_drift(MACHINE_ID, [new_data.get(col, np.nan) for col in FEATURE_COLUMNS])
 
     # ทำนายด้วยโมเดล Machine Learning
     abnormalities, probabilities = predict_with_ml_model(new_data)
+    count_predictions([abnormalities])
 
-    # เพิ่มข้อมูลใหม่ลงใน DataFrame
-    new_entry = pd.DataFrame({"Time": [timestamp], 
-                              "Temperature": [new_data["Temperature"]],
-                              "Vibration": [new_data["Vibration"]],
-                              "RPM": [new_data["RPM"]]})
-    
-    # แก้ไขเพื่อหลีกเลี่ยง FutureWarning
-    if sensor_data_history.empty:
-        sensor_data_history = new_entry
-    else:
-        sensor_data_history = pd.concat([sensor_data_history, new_entry], ignore_index=True)
-        
-    # จำกัดขนาดให้เก็บแค่ 15 จุดล่าสุด
-    if len(sensor_data_history) > 15:
-        sensor_data_history = sensor_data_history.tail(15)
+    return record_scored_reading(now, new_data, abnormalities, probabilities)
+
+# นับผลทำนายสำหรับ /metrics (รายการความผิดปกติของแต่ละค่าเซ็นเซอร์)
+def count_predictions(abnormality_lists):
+    READINGS_SCORED.inc(amount=len(abnormality_lists))
+    for abnormalities in abnormality_lists:
+        if abnormalities[0] != "Normal":
+            for abnormality in abnormalities:
+                ABNORMALITIES.inc(abnormality)
+
+# บันทึกค่าที่ทำนายแล้วหนึ่งชุดลงกราฟ ประวัติความผิดปกติ และ (ถ้า persist) ฐานข้อมูลถาวร
+def record_scored_reading(now, new_data, abnormalities, probabilities, persist=True):
+    timestamp = time.strftime("%H:%M:%S", time.localtime(now))  # เวลา
+    full_timestamp = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")  # วันที่และเวลาเต็มรูปแบบ
+
+    # ข้อมูลใหม่สำหรับกราฟ (ข้อมูลเก่าเกิน SENSOR_HISTORY_WINDOW จุดจะถูกตัดทิ้งเอง)
+    sensor_row = {"Time": timestamp,
+                  "Temperature": new_data["Temperature"],
+                  "Vibration": new_data["Vibration"],
+                  "RPM": new_data["RPM"]}
 
-    # บันทึกประวัติเมื่อตรวจพบความผิดปกติ
+    # บันทึกประวัติเมื่อตรวจพบความผิดปกติ (แยกแถวตามประเภท)
+    abnormality_rows = []
     if abnormalities[0] != "Normal":
-        # บันทึกข้อมูลความผิดปกติแต่ละประเภท
         for abnormality in abnormalities:
-            abnormality_entry = pd.DataFrame({
-                "Timestamp": [full_timestamp],
-                "Abnormality_Type": [abnormality],
-                "Temperature": [new_data["Temperature"]],
-                "Vibration": [new_data["Vibration"]],
-                "RPM": [new_data["RPM"]],
-                "Humidity": [new_data["Humidity"]]
+            abnormality_rows.append({
+                "Timestamp": full_timestamp,
+                "Abnormality_Type": abnormality,
+                "Temperature": new_data["Temperature"],
+                "Vibration": new_data["Vibration"],
+                "RPM": new_data["RPM"],
+                "Humidity": new_data["Humidity"]
             })
-            
-            if abnormality_history.empty:
-                abnormality_history = abnormality_entry
-            else:
-                abnormality_history = pd.concat([abnormality_history, abnormality_entry], ignore_index=True)
-        
-        # จำกัดประวัติให้แสดงแค่ 20 รายการล่าสุด
-        if len(abnormality_history) > 10:
-            abnormality_history = abnormality_history.tail(10)
 
-    # สร้างกราฟ (เหมือนเดิม)
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=sensor_data_history["Time"], y=sensor_data_history["Temperature"], 
-                             mode="lines+markers", name="Temperature (°C)", line=dict(color="#ff5722", width=3)))
-    fig.add_trace(go.Scatter(x=sensor_data_history["Time"], y=sensor_data_history["Vibration"], 
-                             mode="lines+markers", name="Vibration (G-force)", line=dict(color="#00bcd4", width=3)))
-    fig.add_trace(go.Scatter(x=sensor_data_history["Time"], y=sensor_data_history["RPM"], 
-                             mode="lines+markers", name="RPM", line=dict(color="#76ff03", width=3)))
+    tick = {
+        "reading": new_data,
+        "flags": sensor_flags(new_data),
+        "abnormalities": abnormalities,
+        "model_info": {"probabilities": model_info_rows(probabilities), "drift": drift_info(new_data)},
+    }
+    with STAGE_SECONDS.time("record"):
+        state.record_tick(tick, sensor_row, abnormality_rows)
+    TICKS.inc()
 
-    fig.update_layout(
-        title=None,
-        xaxis_title="Time",
-        yaxis_title="Value",
-        plot_bgcolor="rgba(30, 30, 30, 0.8)",
-        paper_bgcolor="rgba(30, 30, 30, 0)",
-        font=dict(family="Roboto, sans-serif", color="#e0e0e0"),
-        legend=dict(orientation="h", y=1.1, font=dict(color="#e0e0e0"), bgcolor="rgba(30, 30, 30, 0.7)"),
-        margin=dict(l=40, r=40, t=20, b=40),
-        xaxis=dict(showgrid=True, gridcolor="rgba(255, 255, 255, 0.1)", tickfont=dict(color="#e0e0e0")),
-        yaxis=dict(showgrid=True, gridcolor="rgba(255, 255, 255, 0.1)", tickfont=dict(color="#e0e0e0")),
-        hovermode="x unified"
-    )
+    # บันทึกลงฐานข้อมูลถาวร (เขียนเป็น batch)
+    if persist and history_store is not None:
+        with STAGE_SECONDS.time("persist"):
+            history_store.append_reading(now, new_data, MACHINE_ID)
+            for row in abnormality_rows:
+                history_store.append_abnormality(now, row["Abnormality_Type"], new_data, MACHINE_ID)
 
-    # กำหนดสถานะและไอคอน
-    status_class = "status-indicator normal pulse" if abnormalities[0] == "Normal" else "status-indicator danger pulse"
-    status_icon = html.I(className="fas fa-check-circle status-icon") if abnormalities[0] == "Normal" else html.I(className="fas fa-exclamation-triangle status-icon")
-    
-    # แสดงผลการทำนาย
-    if abnormalities[0] == "Normal":
-        prediction_text = [status_icon, "ระบบทำงานปกติ"]
+    return tick
+
+# แปลงค่าเซ็นเซอร์หนึ่งแถวเป็น dict (ค่าที่เป็นจำนวนเต็มแสดงแบบไม่มีทศนิยม เหมือน generate_sensor_data)
+def reading_from_values(values):
+    return {col: int(value) if float(value).is_integer() else float(value)
+            for col, value in zip(FEATURE_COLUMNS, values)}
+
+# เวลาของค่าของ MACHINE_ID ที่เผยแพร่ล่าสุดจาก process นี้
+_last_published = None
+_publish_lock = threading.Lock()
+
+# ตัดสินว่าค่าที่เวลา ts ควรเผยแพร่ลงกราฟหรือไม่ (อย่างมากหนึ่งครั้งต่อ SERVICE_PUBLISH_INTERVAL ตามเวลาของค่า)
+# เวลาที่ย้อนกลับ (เริ่มเล่นไฟล์ใหม่หรือวนไฟล์) เริ่มนับใหม่ จึงไม่ค้างเพราะเวลาของการเล่นครั้งก่อน
+def claim_publish(ts):
+    global _last_published
+    with _publish_lock:
+        if _last_published is not None and 0 <= ts - _last_published < SERVICE_PUBLISH_INTERVAL:
+            return False
+        _last_published = ts
+        return True
+
+# รับผลทำนายทั้ง batch จาก IngestionService
+# ทุกค่าถูกบันทึกลงฐานข้อมูลถาวร ส่วนกราฟ/สถานะของ MACHINE_ID อัปเดตไม่เกินหนึ่งครั้งต่อ SERVICE_PUBLISH_INTERVAL
+def publish_scored_batch(machine_ids, timestamps, readings, abnormalities, probabilities):
+    count_predictions(abnormalities)
+    if history_store is not None:
+        with STAGE_SECONDS.time("persist_batch"):
+            history_store.append_readings(timestamps, machine_ids, readings)
+            for machine_id, ts, values, row_abnormalities in zip(machine_ids, timestamps, readings, abnormalities):
+                if row_abnormalities[0] != "Normal":
+                    reading = dict(zip(FEATURE_COLUMNS, values.tolist()))
+                    for abnormality in row_abnormalities:
+                        history_store.append_abnormality(ts, abnormality, reading, machine_id)
+
+    # ค่าล่าสุดของเครื่องที่แดชบอร์ดแสดง
+    for i in range(len(machine_ids) - 1, -1, -1):
+        if machine_ids[i] == MACHINE_ID:
+            if claim_publish(timestamps[i]):
+
+                record_scored_reading(timestamps[i], reading_from_values(readings[i]),
+                                      abnormalities[i], probabilities[i], persist=False)
+            break
+
+# โมเดลที่โหลดอยู่ตอนนี้สำหรับ IngestionService (ตรวจว่าไฟล์โมเดลเปลี่ยนหรือไม่ก่อน เหมือนเส้นทาง poll)
+def current_scoring_model():
+    if prediction_cache is not None:
+        prediction_cache.check_model()
+    return scoring_model, loaded_le, loaded_class_names, rolling_engine
+
+# สร้าง IngestionService ที่ใช้โมเดลของแดชบอร์ดและเผยแพร่ผลผ่าน publish_scored_batch
+# ทุก batch อ่านโมเดลผ่าน current_scoring_model จึงใช้โมเดลใหม่ทันทีหลังเทรนใหม่ (ทุกโหมด รวมถึง ingestion.py)
+def create_ingestion_service(**kwargs):
+    return IngestionService(scoring_model, loaded_le, publish_scored_batch, class_names=loaded_class_names,
+                            feature_engine=rolling_engine, observe=observe_drift,
+                            current_model=current_scoring_model, **kwargs)
+
+
+# service ที่รันอยู่ใน process นี้ (None ถ้าไม่ได้ใช้โหมด service/replay)
+ingestion_service = None
+replay_source = None
+
+# เริ่ม service ใน process นี้
+# service: รับ UDP และส่งค่าจากเครื่องจำลองของ MACHINE_ID, replay: เล่นค่าจาก REPLAY_PATH
+def start_ingestion_service():
+    global ingestion_service, replay_source
+    service = create_ingestion_service()
+    if INGESTION_MODE == "replay":
+        replay_source = service.add_source(ReplaySource(
+            service.queue, REPLAY_PATH, REPLAY_SPEED, REPLAY_RATE_HZ, MACHINE_ID, loop=REPLAY_LOOP))
     else:
-        # สร้าง tags สำหรับแต่ละความผิดปกติ
-        abnormality_tags = html.Div([
-            html.Span(abnormality, className="abnormality-tag") for abnormality in abnormalities
-        ], className="abnormality-container")
-        
-        prediction_text = [
-            status_icon,
-            html.Div([
-                html.Div("ตรวจพบความผิดปกติ:", style={"marginBottom": "8px"}),
-                abnormality_tags
-            ])
-        ]
-    
-    # กำหนดเงื่อนไขสำหรับตรวจสอบค่าผิดปกติของเซ็นเซอร์แต่ละตัว
-    is_temp_abnormal = new_data["Temperature"] > 100  # อุณหภูมิสูงเกินไป
-    is_vibration_abnormal = new_data["Vibration"] > 1.5  # ความสั่นสะเทือนสูงเกินไป
-    is_rpm_abnormal = new_data["RPM"] > 4500  # รอบต่อนาทีสูงเกินไป
-    is_humidity_abnormal = new_data["Humidity"] < 35  # ความชื้นต่ำเกินไป
-    is_machine_age_abnormal = new_data["Machine_Age"] > 8 and new_data["Operating_Hours"] > 7000  # อายุเครื่องและชั่วโมงทำงานสูง
-    is_operating_hours_abnormal = new_data["Operating_Hours"] > 7000  # ชั่วโมงทำงานสูงเกินไป
+        reader = service.add_source(UDPSensorReader(service.queue))
+        service.add_source(SensorSimulator([MACHINE_ID], SIMULATOR_RATE_HZ, *reader.address))
+    ingestion_service = service.start()
+    return ingestion_service
+
+# ตัวนับของ IngestionService ใน /metrics
+@metrics.add_collector
+def ingestion_metrics():
+    if ingestion_service is None:
+        return []
+    return [
+        ("ingestion_scored_total", "counter", "จำนวนค่าที่ service ทำนายแล้ว", [({}, ingestion_service.scored)]),
+        ("ingestion_batches_total", "counter", "จำนวน batch ที่ service ทำนาย", [({}, ingestion_service.batches)]),
+        ("ingestion_errors_total", "counter", "จำนวน batch ที่ทำนาย/เผยแพร่ไม่สำเร็จ", [({}, ingestion_service.errors)]),
+        ("ingestion_malformed_total", "counter", "จำนวนค่าที่มี NaN/inf และถูกข้ามโดยไม่ทำนาย",
+         [({}, ingestion_service.malformed)]),
+        ("ingestion_queue_depth", "gauge", "จำนวนค่าที่รออยู่ในคิว", [({}, ingestion_service.queue.qsize())]),
+    ] + ([
+        ("replay_readings_total", "counter", "จำนวนค่าที่เล่นซ้ำจากไฟล์แล้ว", [({}, replay_source.sent)]),
+        ("replay_readings_per_second", "gauge", "อัตราเล่นซ้ำเฉลี่ยตั้งแต่เริ่ม", [({}, replay_source.rate())]),
+        ("replay_max_lag_seconds", "gauge", "ช้ากว่ากำหนดมากที่สุด (วินาที)", [({}, replay_source.max_lag)]),
+    ] if replay_source is not None else [])
+
+# แสดงผลการทำนาย (ทำงานเฉพาะเมื่อรายการความผิดปกติเปลี่ยน)
+@app.callback(
+    Output("prediction-output", "children"),
+    [Input("status-store", "data")],
+    prevent_initial_call=True
+)
+def update_prediction_output(abnormalities):
+    # กำหนดไอคอน
+    if abnormalities[0] == "Normal":
+        status_icon = html.I(className="fas fa-check-circle status-icon")
+        return [status_icon, "ระบบทำงานปกติ"]
+
+    status_icon = html.I(className="fas fa-exclamation-triangle status-icon")
+    # สร้าง tags สำหรับแต่ละความผิดปกติ
+    abnormality_tags = html.Div([
+        html.Span(abnormality, className="abnormality-tag") for abnormality in abnormalities
+    ], className="abnormality-container")
     
-    # สร้าง UI สำหรับแสดงค่าเซ็นเซอร์พร้อมสีแดงสำหรับค่าผิดปกติ (เหมือนเดิม)
-    sensor_readings = [
-        html.Div([
-            html.Div([html.I(className="fas fa-thermometer-half sensor-icon"), "อุณหภูมิ"], className="sensor-label"),
-            html.Div(f"{new_data['Temperature']} °C", className="sensor-reading")
-        ], className="sensor-value danger" if is_temp_abnormal else "sensor-value"),
-        
-        html.Div([
-            html.Div([html.I(className="fas fa-vibration sensor-icon"), "แรงสั่นสะเทือน"], className="sensor-label"),
-            html.Div(f"{new_data['Vibration']} G", className="sensor-reading")
-        ], className="sensor-value danger" if is_vibration_abnormal else "sensor-value"),
-        
+    return [
+        status_icon,
         html.Div([
-            html.Div([html.I(className="fas fa-tachometer-alt sensor-icon"), "RPM"], className="sensor-label"),
-            html.Div(f"{new_data['RPM']}", className="sensor-reading")
-        ], className="sensor-value danger" if is_rpm_abnormal else "sensor-value"),
-        
-        html.Div([
-            html.Div([html.I(className="fas fa-tint sensor-icon"), "ความชื้น"], className="sensor-label"),
-            html.Div(f"{new_data['Humidity']}%", className="sensor-reading")
-        ], className="sensor-value danger" if is_humidity_abnormal else "sensor-value"),
-        
-        html.Div([
-            html.Div([html.I(className="fas fa-calendar-alt sensor-icon"), "อายุเครื่อง"], className="sensor-label"),
-            html.Div(f"{new_data['Machine_Age']} ปี", className="sensor-reading")
-        ], className="sensor-value danger" if is_machine_age_abnormal else "sensor-value"),
-        
-        html.Div([
-            html.Div([html.I(className="fas fa-clock sensor-icon"), "ชั่วโมงทำงาน"], className="sensor-label"),
-            html.Div(f"{new_data['Operating_Hours']} ชม.", className="sensor-reading")
-        ], className="sensor-value danger" if is_operating_hours_abnormal else "sensor-value"),
+            html.Div("ตรวจพบความผิดปกติ:", style={"marginBottom": "8px"}),
+            abnormality_tags
+        ])
     ]
-    
-    # สร้างตารางแสดงประวัติความผิดปกติ (เหมือนเดิม)
-    if abnormality_history.empty:
-        abnormality_table = html.Div("ยังไม่มีประวัติการตรวจพบความผิดปกติ", className="history-empty")
+
+# สีของแถบสถานะคำนวณฝั่ง browser
+app.clientside_callback(
+    """
+    function(abnormalities) {
+        if (!abnormalities) {
+            return window.dash_clientside.no_update;
+        }
+        return abnormalities[0] === "Normal"
+            ? "status-indicator normal pulse"
+            : "status-indicator danger pulse";
+    }
+    """,
+    Output("prediction-output", "className"),
+    [Input("status-store", "data")]
+)
+
+# ค่าในการ์ดเซ็นเซอร์และสีแดงสำหรับค่าผิดปกติคำนวณฝั่ง browser จากผลของแต่ละรอบ
+app.clientside_callback(
+    """
+    function(tick) {
+        var cards = %s;
+        if (!tick) {
+            return Array(cards.length * 2).fill(window.dash_clientside.no_update);
+        }
+        var readings = cards.map(function(card) {
+            return String(tick.reading[card[0]]) + card[1];
+        });
+        var classes = cards.map(function(card) {
+            return tick.flags[card[0]] ? "sensor-value danger" : "sensor-value";
+        });
+        return readings.concat(classes);
+    }
+    """ % json.dumps([[column, unit] for column, _, _, unit in SENSOR_CARDS]),
+    [Output(f"sensor-{column}-reading", "children") for column, _, _, _ in SENSOR_CARDS]
+    + [Output(f"sensor-{column}-card", "className") for column, _, _, _ in SENSOR_CARDS],
+    [Input("tick-store", "data")]
+)
+
+# อัปเดตกราฟแนวโน้มเมื่อเลือกช่วงเวลา ซูม/ดับเบิลคลิกเพื่อย้อนกลับ หรือถึงรอบรีเฟรช
+# (ช่วงที่ซูมไว้เป็นช่วงในอดีตที่ไม่เปลี่ยน จึงไม่ต้องรีเฟรช)
+@app.callback(
+    [Output("trend-graph", "figure"),
+     Output("trend-info", "children"),
+     Output("trend-view", "data")],
+    [Input("trend-range", "value"),
+     Input("trend-graph", "relayoutData"),
+     Input("trend-refresh", "n_intervals")],
+    [State("trend-view", "data")]
+)
+@STAGE_SECONDS.timed("trend")
+def update_trend(range_seconds, relayout, n_refresh, view):
+    trigger = dash.callback_context.triggered_id
+    if trigger == "trend-graph":
+        zoom = zoom_range(relayout)
+        if zoom is None and not (relayout or {}).get("xaxis.autorange"):
+            # relayout ที่ไม่เกี่ยวกับแกน x (เช่น autosize, ซ่อนเส้น)
+            return (dash.no_update,) * 3
+        view = zoom
+    elif trigger == "trend-range":
+        view = None
+    elif trigger == "trend-refresh" and view is not None:
+        return (dash.no_update,) * 3
+
+    if view is None:
+        end = time.time()
+        start = end - range_seconds
     else:
-        # เรียงข้อมูลจากใหม่ไปเก่า
-        sorted_history = abnormality_history.sort_values(by="Timestamp", ascending=False)
-        
-        # สร้างตาราง
-        abnormality_table = html.Table([
-            html.Thead(
-                html.Tr([
-                    html.Th("เวลา"),
-                    html.Th("ประเภทความผิดปกติ"),
-                    html.Th("อุณหภูมิ (°C)"),
-                    html.Th("แรงสั่นสะเทือน (G)"),
-                    html.Th("RPM"),
-                    html.Th("ความชื้น (%)")
-                ])
-            ),
-            html.Tbody([
-                html.Tr([
-                    html.Td(row["Timestamp"]),
-                    html.Td(html.Span(row["Abnormality_Type"], className="abnormality-tag")),
-                    html.Td(f"{row['Temperature']:.2f}"),
-                    html.Td(f"{row['Vibration']:.2f}"),
-                    html.Td(f"{row['RPM']}"),
-                    html.Td(f"{row['Humidity']}"),
-                ]) for _, row in sorted_history.iterrows()
-            ])
-        ], className="history-table")
+        start, end = view
+    figure, info = build_trend_figure(start, end)
+    return figure, info, view
+
+# สถิติของ cache กราฟแนวโน้มใน /metrics
+@metrics.add_collector
+def trend_cache_metrics():
+    info = trend_series.cache_info()
+    return [
+        ("dashboard_trend_cache_hits_total", "counter", "จำนวนครั้งที่ใช้ผลกราฟแนวโน้มจาก cache", [({}, info.hits)]),
+        ("dashboard_trend_cache_misses_total", "counter", "จำนวนครั้งที่อ่านและลดจำนวนจุดใหม่", [({}, info.misses)]),
+        ("dashboard_trend_cache_entries", "gauge", "จำนวนผลที่อยู่ใน cache", [({}, info.currsize)]),
+    ]
+
+# ช่วงค่าของเหตุการณ์ ("ต่ำสุด – สูงสุด" หรือค่าเดียวถ้าเท่ากัน)
+def format_range(low, high, spec):
+    return f"{low:{spec}}" if low == high else f"{low:{spec}} – {high:{spec}}"
+
+# ช่วงเวลาของเหตุการณ์ (แสดงเฉพาะเวลาของจุดสิ้นสุดถ้าเป็นวันเดียวกัน)
+def format_period(start, end):
+    if start == end:
+        return start
+    return f"{start} – {end[11:] if end[:10] == start[:10] else end}"
+
+# สร้างตารางแสดงประวัติเหตุการณ์ความผิดปกติ (ทำงานเฉพาะเมื่อประวัติเปลี่ยน)
+@app.callback(
+    Output("abnormality-history", "children"),
+    [Input("history-store", "data")]
+)
+@STAGE_SECONDS.timed("history_table")
+def update_abnormality_history(history_version):
+    _, events = state.abnormality_history()
+    if len(events["Event_ID"]) == 0:
+        return html.Div("ยังไม่มีประวัติการตรวจพบความผิดปกติ", className="history-empty")
+
+    # เรียงเหตุการณ์จากใหม่ไปเก่า (ประวัติเรียงตามลำดับที่เริ่มเกิดอยู่แล้ว จึงแค่กลับลำดับ)
+    rows = zip(*(events[name][::-1] for name in
+                 ["Start", "End", "Abnormality_Type", "Count", "Open",
+                  "Temperature_Min", "Temperature_Max", "Vibration_Min", "Vibration_Max",
+                  "RPM_Min", "RPM_Max", "Humidity_Min", "Humidity_Max"]))
     
-    # เพิ่มข้อมูลแสดงโมเดล
+    # สร้างตาราง
+    return html.Table([
+        html.Thead(
+            html.Tr([
+                html.Th("เวลา"),
+                html.Th("ประเภทความผิดปกติ"),
+                html.Th("จำนวนครั้ง"),
+                html.Th("อุณหภูมิ (°C)"),
+                html.Th("แรงสั่นสะเทือน (G)"),
+                html.Th("RPM"),
+                html.Th("ความชื้น (%)")
+            ])
+        ),
+        html.Tbody([
+            html.Tr([
+                html.Td(format_period(start, end)),
+                html.Td([html.Span(abnormality_type, className="abnormality-tag")]
+                        + ([html.Span("กำลังเกิด", className="event-open")] if is_open else [])),
+                html.Td(f"{count}"),
+                html.Td(format_range(temperature_min, temperature_max, ".2f")),
+                html.Td(format_range(vibration_min, vibration_max, ".2f")),
+                html.Td(format_range(rpm_min, rpm_max, "g")),
+                html.Td(format_range(humidity_min, humidity_max, "g")),
+            ]) for (start, end, abnormality_type, count, is_open, temperature_min, temperature_max,
+                    vibration_min, vibration_max, rpm_min, rpm_max, humidity_min, humidity_max) in rows
+        ])
+    ], className="history-table")
+
+# ข้อความของสถานะ drift_monitor
+DRIFT_STATUS_LABELS = {"insufficient": "รอข้อมูล", "ok": "ปกติ", "warn": "เฝ้าระวัง", "drift": "Drift"}
+
+# ส่วนแสดงผลตรวจ drift ในการ์ด Model Information
+def drift_section(drift):
+    muted = {"fontSize": "13px", "color": "#bbbbbb"}
+    checked = (f"ตรวจล่าสุด {drift['checked']} ({drift['readings']:,} ค่า)" if drift["checked"]
+               else "ยังไม่ได้ตรวจ")
+    children = [
+        html.Div("การกระจายของข้อมูลเทียบกับข้อมูลเทรน:", className="sensor-label", style={"marginBottom": "6px"}),
+        html.Div([html.Span(DRIFT_STATUS_LABELS[drift["status"]], className=f"drift-badge {drift['status']}"),
+                  html.Span(f" {checked}", style=muted)], style={"marginBottom": "6px"}),
+    ]
+    for col, status, scores, quality in drift["features"]:
+        children.append(html.Div([
+            html.Span(f"{col}: ", style={"fontWeight": "500", "color": "#bbbbbb"}),
+            html.Span(DRIFT_STATUS_LABELS[status], className=f"drift-badge {status}"),
+            html.Span(f" {scores} · {quality}", style=muted),
+        ], style={"marginBottom": "4px"}))
+    if drift["outside"]:
+        children.append(html.Div(f"ค่าปัจจุบันอยู่นอกช่วงที่เทรน: {', '.join(drift['outside'])}",
+                                 style={"color": "#ff9800", "fontSize": "13px"}))
+    return html.Div(children, style={"marginTop": "10px"})
+
+# เพิ่มข้อมูลแสดงโมเดล (ทำงานเฉพาะเมื่อความน่าจะเป็นหรือผลตรวจ drift ที่แสดงเปลี่ยน)
+@app.callback(
+    Output("model-info", "children"),
+    [Input("model-info-store", "data")],
+    prevent_initial_call=True
+)
+def update_model_info(info):
+    rows = info["probabilities"]
     # สร้างข้อมูลความน่าจะเป็นของแต่ละประเภทความผิดปกติเพื่อแสดงผล
-    class_probabilities = []
-    for i, prob in enumerate(probabilities):
-        class_name = loaded_le.inverse_transform([i])[0]
-        if prob >= 0.05:  # แสดงเฉพาะคลาสที่มีความน่าจะเป็นมากกว่า 5%
-            class_probabilities.append(html.Div([
-                html.Span(f"{class_name}: ", style={"fontWeight": "500", "color": "#bbbbbb"}),
-                html.Span(f"{prob*100:.1f}%", style={"fontWeight": "600", "color": "#ffffff"})
-            ], style={"marginBottom": "5px"}))
+    class_probabilities = [
+        html.Div([
+            html.Span(f"{class_name}: ", style={"fontWeight": "500", "color": "#bbbbbb"}),
+            html.Span(probability, style={"fontWeight": "600", "color": "#ffffff"})
+        ], style={"marginBottom": "5px"})
+        for class_name, probability in rows
+    ]
     
-    model_info = html.Div([
+    return html.Div([
         html.Div([
             html.Div("โมเดลที่ใช้:", className="sensor-label"),
             html.Div("RandomForest Classifier", className="glow-text", style={"fontWeight": "600", "color": "#ffffff", "marginBottom": "10px"})
@@ -721,10 +1371,118 @@ def update_dashboard(n):
             html.Div("ความน่าจะเป็นของแต่ละประเภท:", className="sensor-label", style={"marginBottom": "8px"}),
             html.Div(class_probabilities)
         ])
-    ])
+    ] + ([drift_section(info["drift"])] if info["drift"] is not None else []))
 
-    return fig, prediction_text, status_class, sensor_readings, abnormality_table, model_info
+# ค่าคงที่สำหรับ warm-up (ไม่สุ่ม เพื่อให้เวลาที่วัดได้เทียบกันได้)
+WARMUP_READING = {"Temperature": 75.0, "Vibration": 0.8, "Machine_Age": 5,
+                  "Humidity": 50, "RPM": 3000, "Operating_Hours": 4000}
+
+# ทำนายหนึ่งครั้งเพื่อให้ทุกอย่างที่โหลดแบบ lazy (เช่น page ของไฟล์ memory-map) พร้อมก่อนรับ request จริง
+def warm_up():
+    stage_started = time.perf_counter()
+    predict_with_ml_model(WARMUP_READING, machine_id="warm-up")
+    if rolling_engine is not None:
+        rolling_engine.discard("warm-up")
+    STARTUP_TIMINGS["warmup"] = time.perf_counter() - stage_started
+    STARTUP_TIMINGS["total"] = time.perf_counter() - _startup_started
+    print(f"พร้อมใช้งาน (เริ่มระบบ {STARTUP_TIMINGS['total']:.2f} วินาที, "
+          f"โหลดโมเดล {STARTUP_TIMINGS['model_load'] * 1000:.0f} ms, warm-up {STARTUP_TIMINGS['warmup'] * 1000:.1f} ms)")
+    startup_ready.set()
+
+threading.Thread(target=warm_up, name="model-warm-up", daemon=True).start()
+
+# เวลาเริ่มระบบแต่ละขั้นใน /metrics
+@metrics.add_collector
+def startup_metrics():
+    return [("dashboard_startup_seconds", "gauge", "เวลาที่ใช้ในแต่ละขั้นของการเริ่มระบบ (วินาที)",
+             [({"stage": stage}, seconds) for stage, seconds in STARTUP_TIMINGS.items()])]
+
+# ===== โหมด push (Server-Sent Events) =====
+
+broadcaster = Broadcaster()
+_push_thread = None
+_push_lock = threading.Lock()
+
+# ข้อความของค่าใหม่ที่ส่งให้ทุก client (แปลงเป็น JSON ครั้งเดียว)
+# status/history/model_info ใส่เฉพาะเมื่อต่างจากข้อความก่อนหน้า (sent) และกราฟส่งเฉพาะจุดหลัง since
+# client ที่ cursor ไม่ตรงกับ "from" (เพิ่งเชื่อมต่อหรือพลาดข้อความ) จะขอข้อมูลที่ขาดผ่าน update_dashboard
+def push_message(since, sent):
+    tick = state.latest_tick()
+    figure, extend_data, cursor = update_sensor_graph(since)
+    message = {"from": since, "cursor": cursor, "tick": {"reading": tick["reading"], "flags": tick["flags"]}}
+    if extend_data is not dash.no_update:
+        message["extend"] = extend_data
+    elif figure is not dash.no_update:
+        message["figure"] = figure
+
+    history_version, _ = state.abnormality_history()
+    for key, value in [("status", tick["abnormalities"]), ("history", history_version),
+                       ("model_info", tick["model_info"])]:
+        if sent.get(key) != value:
+            message[key] = sent[key] = value
+    return message
+
+# ตรวจหาค่าใหม่ใน process นี้แล้วส่งต่อให้ client ที่เชื่อมต่ออยู่
+# โหมด poll อ่านค่าเซ็นเซอร์เองเมื่อมีผู้ชม (claim_sample กันไม่ให้หลาย worker อ่านซ้ำ)
+# โหมด service/replay/external รอค่าที่ service บันทึกลงที่เก็บสถานะ
+def push_loop():
+    since, sent = state.sensor_history()[0], {}
+    while True:
+        time.sleep(PUSH_CHECK_INTERVAL)
+        if not len(broadcaster):
+            continue
+        try:
+            now = time.time()
+            if INGESTION_MODE == "poll" and state.claim_sample(now, MIN_SAMPLE_INTERVAL):
+                sample_tick(now)
+            total, _ = state.sensor_history()
+            if total == since or state.latest_tick() is None:
+                continue
+            broadcaster.publish("tick", push_message(since, sent), event_id=total)
+            since = total
+        except Exception as exc:
+            # ข้อผิดพลาดของรอบหนึ่งต้องไม่ทำให้การส่งหยุดทั้งหมด
+            print(f"push: ส่งค่าใหม่ไม่สำเร็จ: {exc!r}")
+
+# เริ่ม thread เมื่อมี client แรก (ไม่เริ่มตอน import เพื่อให้ทำงานใน worker หลัง fork ของ gunicorn --preload)
+def start_push_thread():
+    global _push_thread
+    with _push_lock:
+        if _push_thread is None:
+            _push_thread = threading.Thread(target=push_loop, name="push-publisher", daemon=True)
+            _push_thread.start()
+
+@server.route("/stream")
+def stream():
+    if UPDATE_MODE != "push":
+        return {"error": "UPDATE_MODE ไม่ใช่ push"}, 404
+    start_push_thread()
+    return flask.Response(broadcaster.stream(), mimetype="text/event-stream",
+                          headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# จำนวน client และข้อความของโหมด push ใน /metrics
+@metrics.add_collector
+def push_metrics():
+    if UPDATE_MODE != "push":
+        return []
+    return [
+        ("dashboard_push_clients", "gauge", "จำนวน browser ที่เชื่อมต่อ /stream อยู่", [({}, len(broadcaster))]),
+        ("dashboard_push_messages_total", "counter", "จำนวนข้อความที่ส่งผ่าน /stream", [({}, broadcaster.published)]),
+        ("dashboard_push_dropped_total", "counter", "จำนวน client ที่ถูกตัดเพราะรับข้อความไม่ทัน",
+         [({}, broadcaster.dropped)]),
+    ]
+
+# เปิด EventSource ฝั่ง browser (assets/push.js) เมื่อหน้าโหลดเสร็จ
+if UPDATE_MODE == "push":
+    app.clientside_callback(
+        ClientsideFunction(namespace="push", function_name="connect"),
+        Output("push-status", "children"),
+        [Input("push-url", "data")]
+    )
 
 # รันแอป
 if __name__ == "__main__":
-    app.run_server(debug=True)
\ No newline at end of file
+    # ตอน debug ตัว reloader จะรันไฟล์นี้สอง process ให้เริ่ม service เฉพาะ process ที่รันเซิร์ฟเวอร์จริง
+    if INGESTION_MODE in ("service", "replay") and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_ingestion_service()
+    app.run(debug=True)
\ No newline at end of file
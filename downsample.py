@@ -0,0 +1,82 @@
+import numpy as np
+
+# ลดจำนวนจุดของกราฟให้เหลือไม่เกินจำนวนที่แสดงได้จริงบนจอ โดยยังเห็นค่ากระโดด (spike) ครบ
+# - "lttb"   Largest-Triangle-Three-Buckets: เลือกหนึ่งจุดต่อช่วงที่ทำให้สามเหลี่ยมกับจุดที่เลือกก่อนหน้า
+#            และค่าเฉลี่ยของช่วงถัดไปมีพื้นที่มากที่สุด รูปทรงของเส้นใกล้เคียงข้อมูลเดิมที่สุด
+# - "minmax" เลือกจุดต่ำสุดและสูงสุดของแต่ละช่วง (vectorized ทั้งหมด เร็วที่สุด ไม่มีค่าสูง/ต่ำสุดหาย)
+# ทุกฟังก์ชันคืนค่าดัชนีของจุดที่เลือก เรียงจากน้อยไปมาก (รวมจุดแรกและจุดสุดท้ายเสมอ)
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+# LTTB: แบ่งจุดกลาง (ไม่รวมจุดแรก/สุดท้าย) เป็น n_out - 2 ช่วง
+# ค่าเฉลี่ยของทุกช่วงคำนวณครั้งเดียวด้วย reduceat ส่วนการเลือกจุดต้องทำทีละช่วงเพราะขึ้นกับจุดที่เลือกก่อนหน้า
+# (แต่ละช่วงคำนวณพื้นที่ของทุกจุดพร้อมกันด้วย NumPy)
+def lttb_indices(x, y, n_out):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # จุดอ้างอิงด้านขวาของแต่ละช่วง = ค่าเฉลี่ยของช่วงถัดไป (ช่วงสุดท้ายใช้จุดสุดท้าย)
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    ax, ay = x[0], y[0]
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        j = lo + int(area.argmax())
+        selected[i + 1] = j
+        ax, ay = x[j], y[j]
+    return selected
+
+
+# min/max ต่อช่วง: แบ่งจุดเป็นช่วงขนาดเท่ากัน (ช่วงสุดท้ายอาจสั้นกว่า) แล้วเลือกจุดต่ำสุดและสูงสุดของแต่ละช่วง
+# จำนวนช่วง = (n_out - 2) // 2 เพื่อให้รวมจุดแรกและจุดสุดท้ายแล้วไม่เกิน n_out จุด
+def minmax_indices(x, y, n_out):
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    size = -(-n // ((n_out - 2) // 2))
+    n_full = n // size
+    blocks = y[:n_full * size].reshape(n_full, size)
+    offsets = np.arange(n_full) * size
+    parts = [[0, n - 1], offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1)]
+    if n_full * size < n:
+        tail = y[n_full * size:]
+        parts.append([n_full * size + tail.argmin(), n_full * size + tail.argmax()])
+    return np.unique(np.concatenate(parts))
+
+
+def downsample_indices(x, y, n_out, method="lttb"):
+    if method == "lttb":
+        return lttb_indices(x, y, n_out)
+    if method == "minmax":
+        return minmax_indices(x, y, n_out)
+    raise ValueError(f"method ต้องเป็นหนึ่งใน {DOWNSAMPLE_METHODS}")
+
+
+# ลดจำนวนจุดของเส้นเดียว คืนค่า (x, y) ที่เหลือไม่เกิน n_out จุด
+def downsample(x, y, n_out, method="lttb"):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = downsample_indices(x, y, n_out, method)
+    return x[indices], y[indices]
+
+
+# เส้นจากข้อมูล rollup (ค่าต่ำสุดและสูงสุดของแต่ละช่วง): ใส่ทั้งสองค่าที่เวลาของช่วงนั้น
+# กราฟจึงเห็นช่วงที่ค่าแกว่งและค่า spike ภายในช่วง แม้จะไม่ได้อ่านข้อมูลดิบ
+def envelope(buckets, low, high):
+    x = np.repeat(np.asarray(buckets, dtype=np.float64), 2)
+    y = np.column_stack([low, high]).ravel()
+    return x, y
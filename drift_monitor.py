@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from inference import FEATURE_COLUMNS
+
+# ตรวจว่าค่าเซ็นเซอร์ที่เข้ามาจริงยังมีการกระจายเหมือนข้อมูลที่ใช้เทรนโมเดลหรือไม่ (data drift)
+# - โปรไฟล์ของข้อมูลเทรน: ช่วงต่ำสุด/สูงสุดของแต่ละคุณลักษณะ แบ่งเป็น bins ช่วงเท่ากัน พร้อมสัดส่วนในแต่ละช่วง
+#   (train_model.py บันทึกไว้คู่กับไฟล์โมเดล)
+# - ค่าที่เข้ามาถูกนับลง histogram ช่วงเดียวกัน (+ ช่วงต่ำกว่า/สูงกว่าที่เทรน) ต่อเครื่อง ต่อคุณลักษณะ
+#   หน่วยความจำคงที่ต่อเครื่อง ไม่ขึ้นกับจำนวนค่าที่รับ และทั้ง batch นับด้วย np.bincount ครั้งเดียว
+# - ทุกค่าที่เข้ามาลดน้ำหนักค่าเก่าของเครื่องนั้นลง (คูณ 1 - 1/window) ผลจึงสะท้อนราว window ค่าล่าสุด
+#   ไม่ว่าค่าจะเข้ามาเร็วแค่ไหน (โหมด poll ไม่กี่ค่าต่อนาที หรือโหมด service หลายพันค่าต่อวินาที)
+# - ทุก interval วินาทีคำนวณ PSI และ KS (จาก histogram) เทียบกับโปรไฟล์
+
+# จำนวนช่วงของ histogram ต่อคุณลักษณะ (ไม่รวมช่วงต่ำกว่า/สูงกว่าที่เทรน)
+PROFILE_BINS = 10
+
+# เกณฑ์ของแต่ละคุณลักษณะ: PSI >= PSI_DRIFT = drift, PSI >= PSI_WARN หรือ KS >= KS_WARN = เฝ้าระวัง
+# สัดส่วนค่านอกช่วงที่เทรนหรือค่าที่หายไปเกิน OUT_OF_RANGE_WARN / MISSING_WARN = เฝ้าระวัง
+PSI_WARN = 0.1
+PSI_DRIFT = 0.25
+KS_WARN = 0.1
+OUT_OF_RANGE_WARN = 0.01
+MISSING_WARN = 0.01
+
+# สถานะเรียงตามความรุนแรง (สถานะรวมของเครื่อง = สถานะที่รุนแรงที่สุดของคุณลักษณะ)
+DRIFT_STATUSES = ["insufficient", "ok", "warn", "drift"]
+
+# ป้องกัน log(0) ใน PSI เมื่อช่วงใดไม่มีค่าเลย
+_PSI_EPSILON = 1e-4
+
+
+# โปรไฟล์ของข้อมูลเทรนจากค่าเซ็นเซอร์ (N, len(columns)) แบบ JSON ได้
+# คุณลักษณะที่ไม่มีค่าเลยในข้อมูลเทรนมี low/high/expected เป็น None (ไม่ถูกตรวจ drift)
+def build_profile(values, columns=FEATURE_COLUMNS, bins=PROFILE_BINS):
+    values = np.asarray(values, dtype=np.float64)
+    features = {}
+    for i, col in enumerate(columns):
+        column = values[:, i]
+        column = column[~np.isnan(column)]
+        if len(column) == 0:
+            features[col] = {"low": None, "high": None, "expected": None}
+            continue
+        low, high = float(column.min()), float(column.max())
+        if low == high:
+            # ค่าคงที่: ขยายช่วงข้างละ 0.5 แบบเดียวกับ np.histogram ค่าที่เทรนจึงอยู่ช่วงกลางทั้งตอนสร้างและตอนนับ
+            low, high = low - 0.5, high + 0.5
+        counts = np.histogram(column, bins=bins, range=(low, high))[0]
+        # ช่วงแรกและช่วงสุดท้ายคือค่าที่ต่ำกว่า/สูงกว่าที่เทรน (ไม่มีในข้อมูลเทรน)
+        expected = np.concatenate([[0], counts / len(column), [0]])
+        features[col] = {"low": low, "high": high, "expected": expected.tolist()}
+    return {"rows": len(values), "bins": bins, "features": features}
+
+
+def save_profile(profile, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=1)
+
+
+# None ถ้ายังไม่มีไฟล์ (โมเดลที่เทรนก่อนมีโปรไฟล์)
+def load_profile(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# PSI และ KS ของทุกคุณลักษณะ: actual และ expected เป็นสัดส่วน (..., bins + 2) คืนค่า (psi, ks) รูปร่าง (...)
+# KS คำนวณจากผลสะสมของ histogram (ละเอียดเท่าความกว้างของช่วง)
+def psi_ks(actual, expected):
+    psi = ((actual - expected) * np.log((actual + _PSI_EPSILON) / (expected + _PSI_EPSILON))).sum(axis=-1)
+    ks = np.abs(np.cumsum(actual, axis=-1) - np.cumsum(expected, axis=-1)).max(axis=-1)
+    return psi, ks
+
+
+def feature_status(psi, ks, out_of_range, missing):
+    if psi >= PSI_DRIFT:
+        return "drift"
+    if psi >= PSI_WARN or ks >= KS_WARN or out_of_range > OUT_OF_RANGE_WARN or missing > MISSING_WARN:
+        return "warn"
+    return "ok"
+
+
+# histogram ของค่าที่เข้ามาต่อเครื่อง (น้ำหนักราว window ค่าล่าสุด) เทียบกับโปรไฟล์ทุก interval วินาที
+# ต้องมีค่าอย่างน้อย min_readings (หลังลดน้ำหนัก น้อยกว่า window) ก่อนตัดสิน ไม่เช่นนั้นสถานะเป็น "insufficient"
+class DriftMonitor:
+    def __init__(self, profile, interval=60.0, window=1000, min_readings=300, columns=FEATURE_COLUMNS):
+        self.columns = list(columns)
+        self.interval = interval
+        self.window = window
+        self.min_readings = min_readings
+        self._keep = 1.0 - 1.0 / window
+        self._feature_index = np.arange(len(self.columns))
+        self._lock = threading.Lock()
+        self.set_profile(profile)
+
+    # เปลี่ยนโปรไฟล์ (เช่นหลังโหลดโมเดลใหม่) และเริ่มนับใหม่ทั้งหมด
+    def set_profile(self, profile):
+        features = [profile["features"][col] for col in self.columns]
+        bins = profile["bins"]
+        # คุณลักษณะที่ไม่มีในข้อมูลเทรนใช้ช่วง 0-1 แทนเพื่อให้นับได้ แต่ไม่ถูกตัดสิน
+        profiled = np.array([f["expected"] is not None for f in features])
+        with self._lock:
+            self.bins = bins
+            self.profiled = profiled
+            self.low = np.array([f["low"] if ok else 0.0 for f, ok in zip(features, profiled)])
+            self.high = np.array([f["high"] if ok else 1.0 for f, ok in zip(features, profiled)])
+            # โปรไฟล์เก่าเก็บค่าคงที่เป็น low == high: ขยายแบบเดียวกับ build_profile
+            constant = self.high <= self.low
+            self.low[constant] -= 0.5
+            self.high[constant] += 0.5
+            self.scale = self.bins / (self.high - self.low)
+
+            self.expected = np.array([f["expected"] if ok else np.zeros(bins + 2) for f, ok in zip(features, profiled)])
+            self._machines = {}
+            self._counts = np.zeros((0, len(self.columns), self.bins + 2))
+            self._missing = np.zeros((0, len(self.columns)))
+            self._results = {}
+            self.evaluations = 0
+            self.last_check = None
+            self._next_check = time.monotonic() + self.interval
+
+    def _machine_index(self, machine_id):
+        index = self._machines.get(machine_id)
+        if index is None:
+            index = self._machines[machine_id] = len(self._machines)
+            self._counts = np.concatenate([self._counts, np.zeros((1,) + self._counts.shape[1:])])
+            self._missing = np.concatenate([self._missing, np.zeros((1, len(self.columns)))])
+        return index
+
+    # นับค่าเซ็นเซอร์ (N, len(columns)) ของเครื่อง machine_ids (รายการ หรือรหัสเดียวสำหรับทุกแถว)
+    # ค่า NaN นับเป็นค่าที่หายไป ถ้าถึงเวลาตรวจจะคำนวณผลใหม่ในการเรียกนี้
+    # ค่าเดิมของเครื่องลดน้ำหนักลงหนึ่งขั้นต่อค่าใหม่หนึ่งค่าก่อนนับ (ทั้ง batch ลดพร้อมกันครั้งเดียว)
+    def observe(self, machine_ids, values):
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(self.columns))
+        n_features, width = len(self.columns), self.bins + 2
+        with self._lock:
+            if isinstance(machine_ids, str):
+                machines = np.full(len(values), self._machine_index(machine_ids))
+            else:
+                machines = np.array([self._machine_index(machine_id) for machine_id in machine_ids])
+            missing = np.isnan(values)
+            # ช่วงที่ 0 = ต่ำกว่าที่เทรน, bins + 1 = สูงกว่าที่เทรน (ค่าสูงสุดที่เทรนอยู่ในช่วงสุดท้ายปกติ)
+            # (np.minimum/np.maximum เร็วกว่า np.clip หลายเท่าสำหรับ array เล็ก)
+            position = np.floor((values - self.low) * self.scale)
+            np.minimum(np.maximum(position, -1, out=position), self.bins - 1, out=position)
+            position[values > self.high] = self.bins
+            position[missing] = 0
+            if len(values) == 1:
+                # ค่าเดียว (โหมด poll): เพิ่มทีละช่องโดยตรง ไม่ต้องสร้าง array ขนาดเท่า histogram ทั้งหมด
+                self._counts[machines[0]] *= self._keep
+                self._missing[machines[0]] *= self._keep
+                self._counts[machines[0], self._feature_index, position[0].astype(np.intp) + 1] += ~missing[0]
+            else:
+                keep = self._keep ** np.bincount(machines, minlength=len(self._machines))
+                self._counts *= keep[:, None, None]
+                self._missing *= keep[:, None]
+                cells = (machines[:, None] * n_features + self._feature_index) * width + position + 1
+                self._counts += np.bincount(cells[~missing].astype(np.intp),
+                                            minlength=self._counts.size).reshape(self._counts.shape)
+            if missing.any():
+                np.add.at(self._missing, machines, missing)
+            if time.monotonic() >= self._next_check:
+                self._evaluate()
+
+    # คุณลักษณะของค่าเดียวที่อยู่นอกช่วงที่เทรนหรือหายไป
+    def reading_flags(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        outside = (self.profiled & ((values < self.low) | (values > self.high))) | np.isnan(values)
+        return [col for col, flag in zip(self.columns, outside) if flag]
+
+    # คำนวณผลทันทีโดยไม่รอ interval
+    def evaluate(self):
+        with self._lock:
+            self._evaluate()
+
+    def _evaluate(self):
+        totals = self._counts.sum(axis=2)
+        actual = self._counts / np.maximum(totals, 1)[..., None]
+        psi, ks = psi_ks(actual, self.expected)
+        out_of_range = actual[..., 0] + actual[..., -1]
+        missing = self._missing / np.maximum(totals + self._missing, 1)
+        checked_at = time.time()
+
+        self._results = {}
+        for machine_id, index in self._machines.items():
+            readings = int(round(totals[index].max()))
+            features = {}
+            for i, col in enumerate(self.columns):
+                enough = self.profiled[i] and totals[index, i] + self._missing[index, i] >= self.min_readings
+                features[col] = {
+                    "status": feature_status(psi[index, i], ks[index, i], out_of_range[index, i],
+                                             missing[index, i]) if enough else "insufficient",
+                    "psi": float(psi[index, i]), "ks": float(ks[index, i]),
+                    "out_of_range": float(out_of_range[index, i]), "missing": float(missing[index, i]),
+                }
+            status = max((f["status"] for f in features.values()), key=DRIFT_STATUSES.index)
+            self._results[machine_id] = {"status": status, "checked_at": checked_at,
+                                         "readings": readings, "features": features}
+
+        self.evaluations += 1
+
+        self.last_check = checked_at
+        self._next_check = time.monotonic() + self.interval
+
+    # ผลตรวจล่าสุดของเครื่อง (None ถ้ายังไม่เคยตรวจ)
+    def result(self, machine_id):
+        return self._results.get(machine_id)
+
+    def results(self):
+        return dict(self._results)
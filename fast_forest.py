@@ -0,0 +1,140 @@
+import numpy as np
+
+
+# ตัวประเมิน RandomForest แบบ flat array สำหรับลด latency ตอนทำนายทีละแถวหรือ batch เล็กๆ
+# รวมอาร์เรย์ tree_ (feature, threshold, children, value) ของทุกต้นไว้ใน buffer ต่อเนื่องชุดเดียว
+# แล้วเดินต้นไม้ด้วย NumPy โดยตรง ไม่ผ่าน validation และ joblib ของ sklearn
+# ให้ผล predict_proba ตรงกับ sklearn ทุกบิต (ข้อมูลถูกแปลงเป็น float32 เหมือนที่ sklearn ทำ)
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, leaf_values, roots, max_depth,
+                 classes, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_values = leaf_values
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_classes_ = len(classes)
+        self.n_features_in_ = int(feature.max()) + 1 if feature_names is None else len(feature_names)
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    # สร้างจาก RandomForestClassifier ที่เทรนแล้ว
+    @classmethod
+    def from_sklearn(cls, model):
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("FlatForest รองรับเฉพาะโมเดลแบบ output เดียว")
+
+        n_classes = int(model.n_classes_)
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # ใบไม้ชี้กลับหาตัวเอง จะได้เดินครบ max_depth รอบโดยไม่ต้องเช็คทีละแถว
+            left = np.where(is_leaf, node_ids, tree.children_left + offset)
+            right = np.where(is_leaf, node_ids, tree.children_right + offset)
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+
+            # sklearn >= 1.4 เก็บ value เป็นสัดส่วนอยู่แล้ว รุ่นก่อนหน้าเก็บเป็นจำนวนและหารตอนทำนาย
+            value = np.array(tree.value[:, 0, :n_classes], dtype=np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            if not np.allclose(normalizer, 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            leaf_values=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            feature_names=getattr(model, "feature_names_in_", None),
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    # หน่วยความจำของอาร์เรย์ทั้งหมด (ไบต์)
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in
+                   [self.feature, self.threshold, self.left, self.right, self.leaf_values, self.roots])
+
+    # สำเนาที่ใช้ชนิดข้อมูลเล็กลง: feature เป็น uint8/uint16 และ threshold/ค่าในใบเป็น float32
+    # threshold ถูกปัดลงเป็น float32 ตัวที่มากที่สุดที่ไม่เกินค่าเดิม ข้อมูลเข้า (float32) จึงเดินต้นไม้ทางเดิมทุกแถว
+    # ส่วนความน่าจะเป็นคลาดเคลื่อนจากการปัดค่าในใบเป็น float32 เล็กน้อย (ราว 1e-7)
+    # ลำดับโหนด (left/right) ยังเป็น intp เพราะ NumPy ต้องแปลง index ชนิดอื่นทุกครั้งที่เดินต้นไม้ ทำให้ช้าลง
+    def compact(self):
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        forest = FlatForest(
+            feature=self.feature.astype(np.min_scalar_type(max(int(self.feature.max()), 0))),
+            threshold=threshold,
+            left=self.left,
+            right=self.right,
+            leaf_values=self.leaf_values.astype(np.float32),
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            feature_names=getattr(self, "feature_names_in_", None),
+        )
+        forest.n_features_in_ = self.n_features_in_
+        return forest
+
+    # แปลงข้อมูลเข้าเป็น float32 ขนาด (N, n_features) เหมือน sklearn
+    def _as_array(self, X):
+        if hasattr(X, "columns") and hasattr(self, "feature_names_in_"):
+            X = X[list(self.feature_names_in_)].to_numpy()
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"ต้องการ {self.n_features_in_} features แต่ได้ {X.shape[1]}")
+        if np.isnan(X).any():
+            raise ValueError("FlatForest ไม่รองรับค่า NaN")
+        return X
+
+    # หา index ของใบไม้ที่แต่ละแถวตกลงไปในแต่ละต้น ได้อาร์เรย์ขนาด (N, n_trees)
+    def apply(self, X):
+        X = self._as_array(X)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = flat_X[row_offsets + self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # (n_trees, N, n_classes) แล้วบวกทีละต้นตามลำดับเดียวกับ sklearn
+        per_tree = self.leaf_values[leaves.T]
+        proba = np.add.reduce(per_tree, axis=0)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from fast_forest import FlatForest
+
+# ลำดับคอลัมน์ที่โมเดลใช้ตอนเทรน (ต้องตรงกับ feature_names_in_ ของโมเดล)
+FEATURE_COLUMNS = ["Temperature", "Vibration", "Machine_Age", "Humidity", "RPM", "Operating_Hours"]
+
+# ความน่าจะเป็นขั้นต่ำที่จะรายงานเป็นความผิดปกติ
+ABNORMALITY_THRESHOLD = 0.15
+
+NORMAL_LABEL = "Normal"
+
+
+# แปลงข้อมูลเซ็นเซอร์หลายชุดให้อยู่ในรูป DataFrame ที่เรียงคอลัมน์ตามโมเดล
+# รับได้ทั้ง dict เดียว, list ของ dict, NumPy array ขนาด (N, 6) หรือ DataFrame
+def to_feature_frame(readings):
+    if isinstance(readings, pd.DataFrame):
+        return readings[FEATURE_COLUMNS]
+    if isinstance(readings, dict):
+        readings = [readings]
+    if isinstance(readings, (list, tuple)) and readings and isinstance(readings[0], dict):
+        return pd.DataFrame.from_records(readings, columns=FEATURE_COLUMNS)
+    values = np.asarray(readings, dtype=np.float64)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+    if values.ndim != 2 or values.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(f"ต้องการข้อมูลขนาด (N, {len(FEATURE_COLUMNS)}) แต่ได้ {values.shape}")
+    return pd.DataFrame(values, columns=FEATURE_COLUMNS)
+
+
+# แปลงข้อมูลเซ็นเซอร์เป็น NumPy array ขนาด (N, 6) โดยไม่ผ่าน DataFrame (ใช้กับ FlatForest)
+def to_feature_array(readings, dtype=np.float32):
+    if isinstance(readings, pd.DataFrame):
+        return readings[FEATURE_COLUMNS].to_numpy(dtype=dtype)
+    if isinstance(readings, dict):
+        readings = [readings]
+    if isinstance(readings, (list, tuple)) and readings and isinstance(readings[0], dict):
+        return np.array([[row[col] for col in FEATURE_COLUMNS] for row in readings], dtype=dtype)
+    values = np.asarray(readings, dtype=dtype)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+    if values.ndim != 2 or values.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(f"ต้องการข้อมูลขนาด (N, {len(FEATURE_COLUMNS)}) แต่ได้ {values.shape}")
+    return values
+
+
+# ชื่อคลาสเรียงตามคอลัมน์ของ predict_proba
+def class_names_for(model, le):
+    return np.asarray(le.inverse_transform(model.classes_), dtype=object)
+
+
+# แปลงเมทริกซ์ความน่าจะเป็น (N, n_classes) เป็นป้ายกำกับและรายการความผิดปกติแบบ vectorized
+# ใช้กฎเดียวกับ predict_with_ml_model: เกณฑ์ 0.15, เรียงจากมากไปน้อย และตัด Normal ออกถ้ามีความผิดปกติอื่น
+def decode_probabilities(probabilities, class_names, threshold=ABNORMALITY_THRESHOLD):
+    probabilities = np.asarray(probabilities)
+    class_names = np.asarray(class_names, dtype=object)
+
+    # ป้ายกำกับหลักคือคลาสที่มีความน่าจะเป็นสูงสุด (เหมือน model.predict)
+    labels = class_names[np.argmax(probabilities, axis=1)]
+
+    # เรียงจากมากไปน้อยแบบเดียวกับโค้ดเดิม
+    order = np.argsort(probabilities, axis=1)[:, ::-1]
+    hits = probabilities >= threshold
+
+    # ถ้ามี Normal และความผิดปกติอื่นๆ ให้ตัด Normal ออก
+    normal_idx = np.flatnonzero(class_names == NORMAL_LABEL)
+    if normal_idx.size:
+        normal_col = normal_idx[0]
+        drop_normal = hits[:, normal_col] & (hits.sum(axis=1) > 1)
+        hits[drop_normal, normal_col] = False
+
+    sorted_hits = np.take_along_axis(hits, order, axis=1)
+    sorted_names = class_names[order]
+
+    abnormalities = []
+    for names, row_hits in zip(sorted_names, sorted_hits):
+        row = names[row_hits].tolist()
+        # ถ้าไม่มีความผิดปกติที่เกินเกณฑ์ ให้เป็น Normal
+        abnormalities.append(row if row else [NORMAL_LABEL])
+
+    return labels, abnormalities
+
+
+# ทำนายข้อมูลหลายชุดในครั้งเดียว (predict_proba รอบเดียวสำหรับทั้ง batch)
+# คืนค่า (labels, abnormalities, probabilities) โดย abnormalities เป็น list ของ list ต่อแถว
+# model เป็นได้ทั้ง RandomForestClassifier หรือ FlatForest
+# features คือคุณลักษณะเพิ่มเติม (N, k) ที่ต่อท้าย FEATURE_COLUMNS สำหรับโมเดลที่เทรนด้วย rolling_features
+def predict_batch(model, le, readings, threshold=ABNORMALITY_THRESHOLD, class_names=None, features=None):
+    if isinstance(model, FlatForest):
+        input_data = to_feature_array(readings)
+        if features is not None:
+            input_data = np.hstack([input_data, np.asarray(features, dtype=np.float32)])
+    else:
+        input_data = to_feature_frame(readings)
+        if features is not None:
+            extra = pd.DataFrame(features, columns=model.feature_names_in_[len(FEATURE_COLUMNS):])
+            input_data = pd.concat([input_data.reset_index(drop=True), extra], axis=1)
+    probabilities = model.predict_proba(input_data)
+    if class_names is None:
+        class_names = class_names_for(model, le)
+    labels, abnormalities = decode_probabilities(probabilities, class_names, threshold)
+    return labels, abnormalities, probabilities
@@ -0,0 +1,276 @@
+import argparse
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+
+from inference import FEATURE_COLUMNS, predict_batch
+
+# รูปแบบข้อความจากเซ็นเซอร์ (หนึ่งบรรทัดต่อหนึ่งค่า, หนึ่ง datagram มีได้หลายบรรทัด)
+#   <machine_id> Temperature=65.2,Vibration=1.1,Machine_Age=3,Humidity=50,RPM=3000,Operating_Hours=4000 [epoch_ts]
+# ถ้าไม่ระบุเวลา จะใช้เวลาที่ได้รับข้อความ
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8094
+
+# ช่วงค่าของเครื่องจำลอง (เหมือน generate_sensor_data ใน dashboard.py)
+SIMULATOR_LOW = np.array([50, 0.1, 1, 30, 1000, 1000], dtype=np.float64)
+SIMULATOR_HIGH = np.array([120, 2.0, 10, 70, 5000, 8000], dtype=np.float64)
+
+
+# แปลงข้อความหนึ่งบรรทัดเป็น (machine_id, ค่าเซ็นเซอร์เรียงตาม FEATURE_COLUMNS, เวลา)
+def parse_line(line, default_ts=None):
+    parts = line.strip().split()
+    if len(parts) not in (2, 3):
+        raise ValueError(f"รูปแบบข้อความไม่ถูกต้อง: {line!r}")
+    fields = dict(field.split("=", 1) for field in parts[1].split(","))
+    values = [float(fields[col]) for col in FEATURE_COLUMNS]
+    ts = float(parts[2]) if len(parts) == 3 else (default_ts if default_ts is not None else time.time())
+    return parts[0], values, ts
+
+
+def format_line(machine_id, values, ts=None):
+    fields = ",".join(f"{col}={value:g}" for col, value in zip(FEATURE_COLUMNS, values))
+    return f"{machine_id} {fields}" if ts is None else f"{machine_id} {fields} {ts:.6f}"
+
+
+# อ่านข้อความจาก UDP socket แล้วส่งเข้าคิว (thread แยก ไม่ผูกกับการ poll ของ browser)
+class UDPSensorReader(threading.Thread):
+    def __init__(self, out_queue, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        super().__init__(name="udp-sensor-reader", daemon=True)
+        self.out_queue = out_queue
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.address = self.sock.getsockname()
+        self.received = 0
+        self.malformed = 0
+        self.dropped = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                payload, _ = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            now = time.time()
+            for line in payload.decode("utf-8", errors="replace").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    item = parse_line(line, default_ts=now)
+                except (ValueError, KeyError):
+                    self.malformed += 1
+                    continue
+                try:
+                    self.out_queue.put_nowait(item)
+                    self.received += 1
+                except queue.Full:
+                    self.dropped += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.sock.close()
+
+
+# เครื่องจำลองที่ส่งค่าเซ็นเซอร์ของหลายเครื่องผ่าน UDP ด้วยอัตราที่กำหนด (ใช้แทนเซ็นเซอร์จริง)
+# ค่าของแต่ละรอบถูกสุ่มพร้อมกันทุกเครื่องด้วย Generator ที่กำหนด seed ได้
+class SensorSimulator(threading.Thread):
+    def __init__(self, machine_ids, rate_hz=100.0, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 seed=None, lines_per_datagram=32):
+        super().__init__(name="sensor-simulator", daemon=True)
+        self.machine_ids = list(machine_ids)
+        self.rate_hz = rate_hz
+        self.target = (host, port)
+        self.lines_per_datagram = lines_per_datagram
+        self.rng = np.random.default_rng(seed)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sent = 0
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        values = self.rng.uniform(SIMULATOR_LOW, SIMULATOR_HIGH,
+                                  size=(len(self.machine_ids), len(FEATURE_COLUMNS)))
+        # ทศนิยมสองตำแหน่งสำหรับ Temperature/Vibration ที่เหลือเป็นจำนวนเต็ม
+        values[:, :2] = values[:, :2].round(2)
+        values[:, 2:] = values[:, 2:].round()
+        return values
+
+    def run(self):
+        period = 1.0 / self.rate_hz
+        next_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            ts = time.time()
+            lines = [format_line(machine_id, row, ts)
+                     for machine_id, row in zip(self.machine_ids, self.sample())]
+            for start in range(0, len(lines), self.lines_per_datagram):
+                payload = "\n".join(lines[start:start + self.lines_per_datagram]).encode("utf-8")
+                self.sock.sendto(payload, self.target)
+            self.sent += len(lines)
+
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # ช้ากว่ากำหนด ไม่ต้องพยายามส่งย้อนหลัง
+                next_tick = time.perf_counter()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# รับค่าจากคิว รวมเป็น micro-batch แล้วทำนายครั้งเดียวต่อ batch ก่อนส่งผลให้ publish
+# publish(machine_ids, timestamps, readings, abnormalities, probabilities) ถูกเรียกจาก thread ของ service
+# feature_engine (rolling_features.RollingFeatureEngine) ใช้กับโมเดลที่เทรนด้วยคุณลักษณะย้อนหลังต่อเครื่อง
+# observe(machine_ids, readings) ได้รับค่าดิบทั้ง batch ก่อนทำนาย รวมแถวที่มี NaN/inf ที่จะถูกข้าม (เช่น drift_monitor)
+# current_model() คืนค่า (model, le, class_names, feature_engine) ที่ใช้กับ batch ถัดไป ถูกเรียกก่อนทำนายทุก batch
+# (เช่น dashboard.py ตรวจไฟล์โมเดลและโหลดใหม่) ถ้าไม่กำหนดจะใช้โมเดลที่ส่งมาตอนสร้างตลอด
+class IngestionService:
+    def __init__(self, model, le, publish, max_batch=512, max_wait=0.05,
+                 queue_size=100_000, class_names=None, feature_engine=None, observe=None, current_model=None):
+        self.model = model
+        self.le = le
+        self.publish = publish
+        self.observe = observe
+        self.current_model = current_model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.class_names = class_names
+        self.feature_engine = feature_engine
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.scored = 0
+        self.batches = 0
+        self.errors = 0
+        # จำนวนค่าใน batch ที่ทำนาย/เผยแพร่ไม่สำเร็จ
+        self.failed = 0
+        # จำนวนค่าที่มีค่าเซ็นเซอร์หายหรือไม่ใช่ตัวเลขจำกัด (NaN/inf) ถูกข้ามโดยไม่ทำนาย
+        self.malformed = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._score_loop, name="ingestion-scorer", daemon=True)
+        self._sources = []
+
+    # เพิ่มแหล่งข้อมูล (เช่น UDPSensorReader) ที่จะถูก start/stop พร้อม service
+    def add_source(self, source):
+        self._sources.append(source)
+        return source
+
+    def start(self):
+        self._thread.start()
+        for source in self._sources:
+            source.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        for source in self._sources:
+            source.stop()
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    # ส่งค่าเข้า service โดยตรง (ไม่ผ่าน socket)
+    def submit(self, machine_id, values, ts=None):
+        self.queue.put((machine_id, list(values), time.time() if ts is None else ts))
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _score_loop(self):
+        while not self._stop_event.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            machine_ids, values, timestamps = zip(*batch)
+            readings = np.asarray(values, dtype=np.float64)
+            if self.observe is not None:
+                try:
+                    self.observe(machine_ids, readings)
+                except Exception as exc:
+                    print(f"ingestion: observe ไม่สำเร็จ: {exc!r}")
+            # แถวที่มี NaN/inf ทำนายไม่ได้ ข้ามเฉพาะแถวนั้น ค่าอื่นใน batch ยังทำนายตามปกติ
+            valid = np.isfinite(readings).all(axis=1)
+            if not valid.all():
+                self.malformed += int((~valid).sum())
+                machine_ids = [machine_id for machine_id, ok in zip(machine_ids, valid) if ok]
+                timestamps = [ts for ts, ok in zip(timestamps, valid) if ok]
+                readings = readings[valid]
+                if not len(readings):
+                    continue
+            try:
+                if self.current_model is not None:
+                    self.model, self.le, self.class_names, self.feature_engine = self.current_model()
+                features = None
+                if self.feature_engine is not None:
+                    features = self.feature_engine.transform(machine_ids, readings)
+                _, abnormalities, probabilities = predict_batch(
+                    self.model, self.le, readings, class_names=self.class_names, features=features)
+
+                self.publish(list(machine_ids), list(timestamps), readings, abnormalities, probabilities)
+            except Exception as exc:
+                # ข้อผิดพลาดของ batch หนึ่งต้องไม่ทำให้ service หยุด
+                self.errors += 1
+                self.failed += len(readings)
+                print(f"ingestion: ทำนาย/เผยแพร่ batch ไม่สำเร็จ: {exc!r}")
+                continue
+            self.scored += len(readings)
+            self.batches += 1
+
+
+# รัน service แยกจากเว็บเซิร์ฟเวอร์ เผยแพร่ผลไปยังที่เก็บสถานะของ dashboard.py
+# (ควรตั้ง STATE_BACKEND = "sqlite" ใน dashboard.py เพื่อให้ worker ของเว็บเห็นข้อมูลชุดเดียวกัน)
+def main():
+    parser = argparse.ArgumentParser(description="บริการรับค่าเซ็นเซอร์และทำนายแบบ micro-batch")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--simulate", type=int, default=0, help="จำนวนเครื่องจำลอง (0 = ไม่จำลอง)")
+    parser.add_argument("--rate", type=float, default=100.0, help="อัตราส่งต่อเครื่อง (Hz)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--max-wait", type=float, default=0.05)
+    args = parser.parse_args()
+
+    import dashboard
+
+    if dashboard.STATE_BACKEND != "sqlite":
+        print("คำเตือน: STATE_BACKEND ไม่ใช่ sqlite เว็บเซิร์ฟเวอร์ที่รันแยก process จะไม่เห็นข้อมูลจาก service นี้")
+
+    service = dashboard.create_ingestion_service(max_batch=args.max_batch, max_wait=args.max_wait)
+    reader = service.add_source(UDPSensorReader(service.queue, args.host, args.port))
+    if args.simulate:
+        machine_ids = [dashboard.MACHINE_ID] + [f"SIM-{i:04d}" for i in range(1, args.simulate)]
+        service.add_source(SensorSimulator(machine_ids, args.rate, *reader.address, seed=args.seed))
+    service.start()
+    print(f"รับข้อมูลที่ udp://{reader.address[0]}:{reader.address[1]}")
+
+    try:
+        last_scored, last_time = 0, time.perf_counter()
+        while True:
+            time.sleep(5)
+            now = time.perf_counter()
+            rate = (service.scored - last_scored) / (now - last_time)
+            print(f"รับ {reader.received} ทำนาย {service.scored} ({rate:.0f} ค่า/วินาที) "
+                  f"batch {service.batches} คิว {service.queue.qsize()} ทิ้ง {reader.dropped} "
+                  f"ผิดรูปแบบ {reader.malformed + service.malformed}")
+            last_scored, last_time = service.scored, now
+    except KeyboardInterrupt:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import bisect
+import functools
+import threading
+import time
+
+# ตัวเก็บสถิติแบบเบาสำหรับเปิดใช้ใน production และแสดงผลในรูปแบบข้อความของ Prometheus
+# (ไม่ต้องติดตั้ง prometheus_client) ค่าทั้งหมดอยู่ในหน่วยความจำของ process นี้
+# ถ้ารันหลาย worker แต่ละ worker มีค่าของตัวเอง ให้ Prometheus scrape แยกต่อ worker
+
+# ขอบบนของแต่ละช่วงใน histogram (วินาที)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ตัวนับที่เพิ่มขึ้นอย่างเดียว (แยกตาม label ได้)
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in items]
+
+
+# จับเวลาด้วย with histogram.time("stage"): ...
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+# histogram แบบช่วงคงที่ เก็บจำนวนต่อช่วง ผลรวม และจำนวนครั้ง (แยกตาม label ได้)
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [จำนวนต่อช่วง (ช่วงสุดท้ายคือ +Inf), ผลรวม, จำนวนครั้ง]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    # decorator จับเวลาทั้งฟังก์ชัน
+    def timed(self, *label_values):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Timer(self, label_values):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series is not None else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((labels, (list(series[0]), series[1], series[2]))
+                           for labels, series in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+# รวม metric ทั้งหมดของ process และ collector ที่อ่านค่าจากที่อื่นตอนแสดงผล
+# collector() คืนค่า list ของ (name, kind, help, [(labels dict, value), ...])
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, label_names=()):
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    # ข้อความรูปแบบ Prometheus text exposition (version 0.0.4)
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,147 @@
+import concurrent.futures
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from inference import FEATURE_COLUMNS
+
+# รวมคำขอทำนายทีละค่าจากหลาย thread (callback ของหลาย browser, หลายเครื่อง) เป็น micro-batch
+# แล้วเรียกโมเดลครั้งเดียวต่อ batch บน thread ของตัวเอง ผู้เรียกแต่ละรายได้ผลผ่าน Future ของตัวเอง
+# รอคำขออื่นไม่เกิน max_wait วินาทีจนได้จำนวนเท่ากับ batch ก่อนหน้า (ประมาณจำนวนผู้เรียกพร้อมกัน)
+# ตอนที่มีผู้เรียกรายเดียว ค่าจึงถูกทำนายทันทีโดยไม่เสียเวลารอ
+# ระหว่างที่ thread ทำนาย batch หนึ่งอยู่ คำขอที่เข้ามาใหม่จะรวมเป็น batch ถัดไปเอง
+
+# ขอบบนของช่วงใน histogram ขนาด batch และจำนวนคำขอที่รออยู่
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# สัญญาณให้ thread หยุด
+_STOP = object()
+
+
+# predict(readings, features) รับรายการค่าเซ็นเซอร์ (dict) และคุณลักษณะเพิ่ม (N, k) หรือ None
+# คืนค่า (รายการความผิดปกติ, ความน่าจะเป็น) ของทุกค่าตามลำดับ
+# batch_sizes / queue_depths / wait_seconds เป็น metrics.Histogram (ไม่บังคับ)
+class MicroBatcher:
+    def __init__(self, predict, max_batch=64, max_wait=0.001,
+                 batch_sizes=None, queue_depths=None, wait_seconds=None, columns=FEATURE_COLUMNS):
+        self.predict_batch = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batch_sizes = batch_sizes
+        self.queue_depths = queue_depths
+        self.wait_seconds = wait_seconds
+        self.columns = list(columns)
+        self.requests = 0
+        self.batches = 0
+        # จำนวนคำขอที่ค่าเซ็นเซอร์ไม่ครบหรือไม่ใช่ตัวเลขจำกัด (NaN/inf) ถูกตอบเป็นข้อผิดพลาดโดยไม่ทำนาย
+        self.malformed = 0
+        self._last_batch = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    # เริ่ม thread เมื่อมีคำขอแรกของแต่ละ process (thread ที่เริ่มก่อน fork ไม่ตามไปยัง worker ของ gunicorn)
+    def _pending(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                    name="inference-batcher", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def submit(self, reading, features=None):
+        pending = self._pending()
+        future = concurrent.futures.Future()
+        if self.queue_depths is not None:
+            self.queue_depths.observe(pending.qsize())
+        pending.put((reading, features, future, time.perf_counter()))
+        return future
+
+    # ทำนายหนึ่งค่าและรอผล คืนค่า (รายการความผิดปกติ, ความน่าจะเป็น)
+    def predict(self, reading, features=None, timeout=None):
+        return self.submit(reading, features).result(timeout)
+
+    def close(self):
+        if self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._pid = None
+
+    def _next_batch(self, pending):
+        batch = [pending.get()]
+        if batch[0] is _STOP:
+            return None
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            # ครบจำนวนเท่า batch ก่อนหน้าแล้ว รับเฉพาะคำขอที่รออยู่ในคิวโดยไม่รอเพิ่ม
+            remaining = deadline - time.monotonic() if len(batch) < self._last_batch else 0
+            try:
+                item = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                pending.put(_STOP)
+                break
+            batch.append(item)
+        self._last_batch = len(batch)
+        return batch
+
+    def _run(self, pending):
+        while True:
+            batch = self._next_batch(pending)
+            if batch is None:
+                return
+            started = time.perf_counter()
+            if self.batch_sizes is not None:
+                self.batch_sizes.observe(len(batch))
+            if self.wait_seconds is not None:
+                for item in batch:
+                    self.wait_seconds.observe(started - item[3])
+            # ค่าที่มีและไม่มีคุณลักษณะเพิ่มทำนายแยกกัน (เกิดได้เฉพาะช่วงที่เปลี่ยนโมเดล)
+            with_features = [item for item in batch if item[1] is not None]
+            without_features = [item for item in batch if item[1] is None]
+            for group in (without_features, with_features):
+                if group:
+                    self._score(group)
+            self.requests += len(batch)
+            self.batches += 1
+
+    def _score(self, items):
+        # ข้ามคำขอที่ผู้เรียกยกเลิกไปแล้ว
+        items = [item for item in items if item[2].set_running_or_notify_cancel()]
+        # ค่าที่ทำนายไม่ได้ให้ผิดพลาดเฉพาะคำขอนั้น คำขออื่นใน batch ยังทำนายตามปกติ
+        items = [item for item in items if self._check(item)]
+        if not items:
+            return
+        readings = [item[0] for item in items]
+        features = np.stack([item[1] for item in items]) if items[0][1] is not None else None
+        try:
+            abnormalities, probabilities = self.predict_batch(readings, features)
+        except Exception as exc:
+            for item in items:
+                item[2].set_exception(exc)
+            return
+        for item, row_abnormalities, row_probabilities in zip(items, abnormalities, probabilities):
+            item[2].set_result((row_abnormalities, row_probabilities))
+
+    # True ถ้าค่าเซ็นเซอร์ครบทุกคอลัมน์และเป็นตัวเลขจำกัด ไม่เช่นนั้นตอบคำขอเป็น ValueError
+    def _check(self, item):
+        reading, features, future = item[:3]
+        try:
+            values = np.array([reading[col] for col in self.columns], dtype=np.float64)
+        except (KeyError, TypeError, ValueError):
+            values = None
+        if values is not None and np.isfinite(values).all() and (features is None or np.isfinite(features).all()):
+            return True
+        self.malformed += 1
+        future.set_exception(ValueError(f"ค่าเซ็นเซอร์ไม่ครบหรือไม่ใช่ตัวเลขจำกัด: {reading!r}"))
+        return False
+
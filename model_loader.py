@@ -0,0 +1,66 @@
+import os
+
+import joblib
+
+# ไฟล์โมเดลที่ได้จากการเทรน (python train_model.py หรือ gendata.ipynb)
+MODEL_PATH = "machine_failure_model.pkl"
+ENCODER_PATH = "label_encoder.pkl"
+
+# ไฟล์ FlatForest ที่แปลงไว้แล้ว สร้างใหม่อัตโนมัติเมื่อไฟล์โมเดลเปลี่ยน
+COMPILED_MODEL_PATH = "machine_failure_model.flat.pkl"
+
+# โปรไฟล์การกระจายของข้อมูลเทรน (drift_monitor.build_profile) ที่ train_model.py บันทึกคู่กับโมเดล
+PROFILE_PATH = "machine_failure_model.profile.json"
+
+
+# ลายเซ็นของไฟล์ (เวลาแก้ไขล่าสุด, ขนาด) ใช้ตรวจว่าไฟล์โมเดลถูกแทนที่หรือยัง
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _require_files(*paths):
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(
+            f"ไม่พบไฟล์โมเดล {', '.join(missing)} ให้เทรนโมเดลก่อนด้วยคำสั่ง: python train_model.py")
+
+
+# โหลด RandomForestClassifier และ LabelEncoder
+# mmap_mode="r" ให้ joblib อ่านอาร์เรย์ NumPy แบบ memory-map แทนการคัดลอกเข้าหน่วยความจำ
+def load_sklearn_model(model_path=MODEL_PATH, encoder_path=ENCODER_PATH, mmap_mode="r"):
+    _require_files(model_path, encoder_path)
+    return joblib.load(model_path, mmap_mode=mmap_mode), joblib.load(encoder_path, mmap_mode=mmap_mode)
+
+
+# โหลด FlatForest พร้อมชื่อคลาส คืนค่า (forest, class_names)
+# ถ้าไฟล์ที่แปลงไว้ยังตรงกับไฟล์โมเดล จะโหลดแบบ memory-map โดยไม่ต้อง import sklearn เลย
+# worker ที่ fork มาจาก process เดียวกัน (gunicorn --preload) หรือเปิดไฟล์เดียวกันจะใช้ page ร่วมกัน
+# compact=True ใช้ FlatForest.compact() (ชนิดข้อมูลเล็กลง ดูผลกระทบได้จาก python compact_model.py)
+def load_compiled_model(model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+                        compiled_path=COMPILED_MODEL_PATH, mmap_mode="r", compact=False):
+    _require_files(model_path, encoder_path)
+    sources = [file_signature(model_path), file_signature(encoder_path)]
+
+    if compiled_path and os.path.exists(compiled_path):
+        bundle = joblib.load(compiled_path, mmap_mode=mmap_mode)
+        if bundle.get("sources") == sources and bundle.get("compact", False) == compact:
+            return bundle["forest"], bundle["class_names"]
+
+    # ยังไม่มีไฟล์หรือไฟล์เก่ากว่าโมเดล: แปลงใหม่จากโมเดล sklearn แล้วบันทึกไว้ใช้ครั้งหน้า
+    from fast_forest import FlatForest
+    from inference import class_names_for
+
+    model, le = load_sklearn_model(model_path, encoder_path, mmap_mode=None)
+    forest = FlatForest.from_sklearn(model)
+    if compact:
+        forest = forest.compact()
+    class_names = class_names_for(model, le)
+    if compiled_path:
+        try:
+            joblib.dump({"forest": forest, "class_names": class_names, "sources": sources, "compact": compact},
+                        compiled_path)
+        except OSError as exc:
+            # โฟลเดอร์อ่านอย่างเดียว: ใช้งานต่อได้ แค่ต้องแปลงใหม่ทุกครั้งที่เริ่ม
+            print(f"บันทึก {compiled_path} ไม่สำเร็จ: {exc}")
+    return forest, class_names
@@ -0,0 +1,271 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+
+from chunked_dataset import DEFAULT_CHUNK_SIZE, ClassBalancedReservoir, iter_chunks
+from fast_forest import FlatForest
+from inference import FEATURE_COLUMNS
+from model_loader import file_signature
+from synthetic_data import create_synthetic_data
+from train_model import chunk_codes, dataset_classes
+
+# ค้นหาขนาด/ความลึก/ขนาดใบของ RandomForest ด้วย cross-validation แบบขนานหลาย process
+# - ข้อมูลที่เตรียมแล้ว (X float32, y, หมายเลข fold ของแต่ละแถว) ถูก cache เป็นไฟล์ .npy
+#   worker ทุกตัวเปิดแบบ memory-map จึงไม่ต้องส่งข้อมูลข้าม process และรันซ้ำได้โดยไม่ต้องเตรียมใหม่
+# - รายงานความแม่นยำคู่กับขนาดโมเดลและ latency ต่อแถวของ FlatForest (เส้นทางที่แดชบอร์ดใช้ทำนาย)
+# ใช้งาน: python model_selection.py --data history.parquet --min-accuracy 0.85
+#         python model_selection.py --samples 20000 --search random --n-iter 20
+
+CACHE_DIR = ".model_selection_cache"
+
+# ค่าเริ่มต้นของช่วงที่ค้นหา
+PARAM_GRID = {
+    "n_estimators": [25, 50, 100, 200],
+    "max_depth": [None, 8, 12, 16],
+    "min_samples_leaf": [1, 5, 20],
+}
+
+
+# ===== เตรียมข้อมูลและ fold =====
+
+# กุญแจของ cache: ข้อมูลต้นทาง (ไฟล์ + เวลาแก้ไข/ขนาด หรือพารามิเตอร์ข้อมูลจำลอง) และวิธีแบ่ง fold
+def cache_key(source, n_folds, seed):
+    return hashlib.sha1(json.dumps([source, n_folds, seed], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+# โหลดกลุ่มตัวอย่างที่สมดุลตามคลาส (ไม่เกิน per_class แถวต่อคลาส) จากไฟล์ .csv/.parquet แบบทีละ chunk
+def load_file_sample(data_path, per_class, label_column=None, chunk_size=DEFAULT_CHUNK_SIZE, seed=42):
+    label_column, _, _, le = dataset_classes(data_path, label_column, chunk_size)
+    reservoir = ClassBalancedReservoir(per_class, len(le.classes_), seed=seed)
+    for chunk in iter_chunks(data_path, [label_column], chunk_size):
+        reservoir.add(*chunk_codes(chunk, label_column, le))
+    X, y = reservoir.sample()
+    return X, y, list(le.classes_)
+
+
+def load_synthetic_sample(n_samples, seed=42):
+    data = create_synthetic_data(n_samples, seed=seed)
+    labels = data["Failure_Type"].astype(str)
+    class_names = sorted(labels.unique())
+    y = pd.Categorical(labels, categories=class_names).codes.astype(np.int64)
+    return data[FEATURE_COLUMNS].to_numpy(dtype=np.float32), y, class_names
+
+
+# เตรียมข้อมูลครั้งเดียวแล้วเก็บใน cache_dir/<key>/ คืนค่าโฟลเดอร์ของ cache
+def prepare_folds(args):
+    if args.data:
+        source = {"data": os.path.abspath(args.data), "signature": file_signature(args.data),
+                  "label_column": args.label_column, "per_class": args.per_class}
+    else:
+        source = {"samples": args.samples}
+    folder = os.path.join(args.cache_dir, cache_key(source, args.folds, args.seed))
+    if os.path.exists(os.path.join(folder, "meta.json")):
+        print(f"ใช้ข้อมูลและ fold จาก cache: {folder}")
+        return folder
+
+    started = time.perf_counter()
+    if args.data:
+        X, y, class_names = load_file_sample(args.data, args.per_class, args.label_column, seed=args.seed)
+    else:
+        X, y, class_names = load_synthetic_sample(args.samples, seed=args.seed)
+
+    folds = np.empty(len(y), dtype=np.int8)
+    splitter = StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=args.seed)
+    for fold, (_, test_rows) in enumerate(splitter.split(X, y)):
+        folds[test_rows] = fold
+
+    os.makedirs(folder, exist_ok=True)
+    np.save(os.path.join(folder, "X.npy"), X)
+    np.save(os.path.join(folder, "y.npy"), y)
+    np.save(os.path.join(folder, "folds.npy"), folds)
+    # เขียน meta.json เป็นไฟล์สุดท้าย ถ้าเตรียมไม่เสร็จจะไม่ถูกนับเป็น cache
+    with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"source": source, "n_folds": args.folds, "seed": args.seed,
+                   "class_names": class_names, "rows": len(y)}, f, ensure_ascii=False, indent=1)
+    print(f"เตรียมข้อมูล {len(y):,} แถว {args.folds} fold ใน {time.perf_counter() - started:.1f} วินาที -> {folder}")
+    return folder
+
+
+def load_folds(folder):
+    return (np.load(os.path.join(folder, "X.npy"), mmap_mode="r"),
+            np.load(os.path.join(folder, "y.npy"), mmap_mode="r"),
+            np.load(os.path.join(folder, "folds.npy"), mmap_mode="r"))
+
+
+# ===== ชุดพารามิเตอร์ =====
+
+def grid_candidates(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_candidates(grid, n_iter, seed):
+    candidates = grid_candidates(grid)
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(candidates), size=min(n_iter, len(candidates)), replace=False)
+    return [candidates[i] for i in sorted(picked)]
+
+
+# "None,8,12" -> [None, 8, 12]
+def parse_values(text):
+    return [None if value.strip().lower() == "none" else int(value) for value in text.split(",")]
+
+
+# ===== งานของ worker =====
+
+# median latency (วินาที) ของการทำนายด้วย FlatForest ทีละแถว และต่อแถวเมื่อทำนายเป็น batch
+def measure_latency(forest, X, repeat=200, batch_size=512):
+    row = np.ascontiguousarray(X[:1])
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        forest.predict_proba(row)
+        samples.append(time.perf_counter() - started)
+    batch = np.ascontiguousarray(X[:batch_size])
+    batch_samples = []
+    for _ in range(max(1, repeat // 20)):
+        started = time.perf_counter()
+        forest.predict_proba(batch)
+        batch_samples.append(time.perf_counter() - started)
+    return float(np.median(samples)), float(np.median(batch_samples)) / len(batch)
+
+
+# เทรนและประเมิน 1 fold ของพารามิเตอร์ชุดหนึ่ง (รันใน process ของ pool)
+# ถ้า keep_forest จะคืน FlatForest กลับไปด้วย เพื่อวัด latency ใน process หลักหลังจาก pool ทำงานเสร็จ
+# (วัดระหว่างที่ worker อื่นยังแย่ง CPU อยู่จะได้ตัวเลขที่ไม่นิ่ง)
+def evaluate_fold(folder, params, fold, seed, keep_forest):
+    X, y, folds = load_folds(folder)
+    train_rows = folds != fold
+    test_X = np.asarray(X[~train_rows])
+
+    started = time.perf_counter()
+    model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+    model.fit(pd.DataFrame(np.asarray(X[train_rows]), columns=FEATURE_COLUMNS), np.asarray(y[train_rows]))
+    fit_time = time.perf_counter() - started
+
+    forest = FlatForest.from_sklearn(model)
+    accuracy = float(np.mean(forest.predict(test_X) == np.asarray(y[~train_rows])))
+    result = {"fold": fold, "accuracy": accuracy, "fit_time": fit_time, "nodes": int(forest.feature.size)}
+    if keep_forest:
+        result["model_bytes"] = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        result["forest"] = forest
+    return params, result
+
+
+# ===== รายงาน =====
+
+def summarize(results):
+    rows = []
+    for key, folds in results.items():
+        params = dict(key)
+        accuracies = [fold["accuracy"] for fold in folds]
+        measured = [fold for fold in folds if "latency_row" in fold]
+        rows.append({
+            **params,
+            "accuracy_mean": float(np.mean(accuracies)),
+            "accuracy_std": float(np.std(accuracies)),
+            "fit_time": float(np.mean([fold["fit_time"] for fold in folds])),
+            "nodes": int(np.mean([fold["nodes"] for fold in folds])),
+            "model_mb": measured[0]["model_bytes"] / 1e6 if measured else None,
+            "latency_row_us": measured[0]["latency_row"] * 1e6 if measured else None,
+            "latency_batch_row_us": measured[0]["latency_batch_row"] * 1e6 if measured else None,
+        })
+    report = pd.DataFrame(rows).sort_values("accuracy_mean", ascending=False, ignore_index=True)
+    report["max_depth"] = report["max_depth"].astype("Int64")
+    return report
+
+
+# โมเดลที่ latency ต่อแถวต่ำที่สุดในบรรดาโมเดลที่ความแม่นยำถึงเกณฑ์ (None ถ้าไม่มี)
+def fastest_meeting(report, min_accuracy):
+    passing = report[report["accuracy_mean"] >= min_accuracy]
+    if passing.empty:
+        return None
+    return passing.sort_values(["latency_row_us", "model_mb"]).iloc[0]
+
+
+def print_report(report):
+    print(f"{'n_estimators':>12} {'max_depth':>9} {'min_leaf':>8} {'accuracy':>15} {'nodes':>9} "
+          f"{'ขนาด MB':>8} {'µs/แถว':>8} {'µs/แถว(batch)':>13} {'fit s':>7}")
+    for row in report.itertuples():
+        depth = "None" if pd.isna(row.max_depth) else int(row.max_depth)
+        print(f"{row.n_estimators:>12} {depth:>9} {row.min_samples_leaf:>8} "
+              f"{row.accuracy_mean:>8.4f}±{row.accuracy_std:.4f} {row.nodes:>9,} {row.model_mb:>8.2f} "
+              f"{row.latency_row_us:>8.0f} {row.latency_batch_row_us:>13.2f} {row.fit_time:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ค้นหาพารามิเตอร์ RandomForest ด้วย cross-validation แบบขนาน")
+    parser.add_argument("--data", help="ไฟล์ .csv/.parquet (ไม่ระบุ = ใช้ข้อมูลจำลอง)")
+    parser.add_argument("--label-column")
+    parser.add_argument("--per-class", type=int, default=20_000, help="จำนวนแถวสูงสุดต่อคลาสที่โหลดจากไฟล์")
+    parser.add_argument("--samples", type=int, default=20_000, help="จำนวนแถวของข้อมูลจำลอง")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--n-iter", type=int, default=12, help="จำนวนชุดพารามิเตอร์ของ random search")
+    parser.add_argument("--n-estimators", default=",".join(map(str, PARAM_GRID["n_estimators"])))
+    parser.add_argument("--max-depth", default=",".join(map(str, PARAM_GRID["max_depth"])))
+    parser.add_argument("--min-samples-leaf", default=",".join(map(str, PARAM_GRID["min_samples_leaf"])))
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--min-accuracy", type=float, default=None, help="เกณฑ์ความแม่นยำสำหรับเลือกโมเดลที่เร็วที่สุด")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--report", default="model_selection.csv", help="ไฟล์รายงาน (.csv หรือ .json)")
+    args = parser.parse_args()
+
+    folder = prepare_folds(args)
+    grid = {"n_estimators": parse_values(args.n_estimators), "max_depth": parse_values(args.max_depth),
+            "min_samples_leaf": parse_values(args.min_samples_leaf)}
+    candidates = (grid_candidates(grid) if args.search == "grid"
+                  else random_candidates(grid, args.n_iter, args.seed))
+    print(f"ค้นหา {len(candidates)} ชุดพารามิเตอร์ x {args.folds} fold ด้วย {args.jobs} process")
+
+    started = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        # วัดขนาดและ latency เฉพาะโมเดลของ fold แรกในแต่ละชุด (โมเดลของทุก fold มีขนาดใกล้เคียงกัน)
+        futures = [pool.submit(evaluate_fold, folder, params, fold, args.seed, fold == 0)
+                   for params in candidates for fold in range(args.folds)]
+        for future in futures:
+            params, result = future.result()
+            results.setdefault(tuple(params.items()), []).append(result)
+    print(f"ใช้เวลาค้นหา {time.perf_counter() - started:.1f} วินาที")
+
+    X, _, _ = load_folds(folder)
+    for folds in results.values():
+        for fold in folds:
+            forest = fold.pop("forest", None)
+            if forest is not None:
+                fold["latency_row"], fold["latency_batch_row"] = measure_latency(forest, X)
+
+    report = summarize(results)
+    print_report(report)
+    if args.report.endswith(".json"):
+        report.to_json(args.report, orient="records", indent=1)
+    else:
+        report.to_csv(args.report, index=False)
+    print(f"บันทึกรายงานที่ {args.report}")
+
+    if args.min_accuracy is not None:
+        best = fastest_meeting(report, args.min_accuracy)
+        if best is None:
+            print(f"ไม่มีชุดพารามิเตอร์ที่ความแม่นยำถึง {args.min_accuracy}")
+        else:
+            depth = None if pd.isna(best["max_depth"]) else int(best["max_depth"])
+            print(f"เร็วที่สุดที่ความแม่นยำ >= {args.min_accuracy}: n_estimators={int(best['n_estimators'])}, "
+                  f"max_depth={depth}, min_samples_leaf={int(best['min_samples_leaf'])} "
+                  f"(accuracy {best['accuracy_mean']:.4f}, {best['latency_row_us']:.0f} µs/แถว, "
+                  f"{best['model_mb']:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
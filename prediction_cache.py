@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from inference import FEATURE_COLUMNS
+from model_loader import MODEL_PATH, ENCODER_PATH, file_signature
+
+# ความละเอียดเริ่มต้นของแต่ละค่าเซ็นเซอร์ (ตรงกับทศนิยมที่ generate_sensor_data ปัดไว้ จึงไม่เปลี่ยนผลทำนาย)
+# ค่าที่ห่างกันน้อยกว่าความละเอียดนี้ถือเป็นค่าเดียวกัน; 0 หรือ None = ใช้ค่าจริงเป็นกุญแจ
+DEFAULT_RESOLUTIONS = {
+    "Temperature": 0.01,
+    "Vibration": 0.01,
+    "Machine_Age": 1,
+    "Humidity": 1,
+    "RPM": 1,
+    "Operating_Hours": 1,
+}
+
+
+# cache ผลทำนายแบบ LRU ที่ใช้ค่าเซ็นเซอร์ซึ่งปัดตามความละเอียดของแต่ละคอลัมน์เป็นกุญแจ
+# - ตอน miss จะทำนายจากค่าที่ปัดแล้ว ผลของกุญแจเดียวกันจึงเหมือนกันเสมอไม่ว่าค่าไหนมาถึงก่อน
+# - ตรวจลายเซ็นของไฟล์โมเดลไม่เกินหนึ่งครั้งต่อ check_interval วินาที ถ้าไฟล์เปลี่ยนจะล้าง cache
+#   และเรียก on_model_change() (เช่นโหลดโมเดลใหม่) ก่อนทำนายครั้งถัดไป
+# predict(reading) ต้องคืนค่า (abnormalities, probabilities) ของค่าเซ็นเซอร์หนึ่งชุด
+class PredictionCache:
+    def __init__(self, predict, max_entries=4096, resolutions=None,
+                 watch_paths=(MODEL_PATH, ENCODER_PATH), on_model_change=None, check_interval=1.0):
+        self.predict = predict
+        self.max_entries = max_entries
+        self.resolutions = dict(DEFAULT_RESOLUTIONS if resolutions is None else resolutions)
+        self.watch_paths = [path for path in watch_paths if path]
+        self.on_model_change = on_model_change
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._steps = [self.resolutions.get(col) or 0 for col in FEATURE_COLUMNS]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._signature = self._read_signature()
+
+        self._next_check = time.monotonic() + check_interval
+
+    def _read_signature(self):
+        return [file_signature(path) if os.path.exists(path) else None for path in self.watch_paths]
+
+    # กุญแจ (จำนวนเต็มของช่วงที่ค่าตกอยู่ต่อคอลัมน์) และค่าเซ็นเซอร์ตัวแทนของช่วงนั้น
+    def quantize(self, reading):
+        key, representative = [], {}
+        for col, step in zip(FEATURE_COLUMNS, self._steps):
+            value = float(reading[col])
+            if step:
+                bucket = round(value / step)
+                key.append(bucket)
+                representative[col] = round(bucket * step, 10)
+            else:
+                key.append(value)
+                representative[col] = value
+        return tuple(key), representative
+
+    # ตรวจว่าไฟล์โมเดลเปลี่ยนหรือยัง (get เรียกเองทุกครั้ง ผู้ที่ทำนายโดยไม่ผ่าน cache เรียกเองได้)
+    # เรียกได้จากหลาย thread (callback ของเว็บและ IngestionService) โหลดโมเดลใหม่เพียงครั้งเดียวต่อการเปลี่ยน
+    def check_model(self):
+        if time.monotonic() < self._next_check:
+            return
+        with self._check_lock:
+            now = time.monotonic()
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            signature = self._read_signature()
+            if signature == self._signature:
+                return
+            self._signature = signature
+            with self._lock:
+                self._entries.clear()
+                self.invalidations += 1
+            if self.on_model_change is not None:
+                self.on_model_change()
+
+    # คืนค่า (abnormalities, probabilities) จาก cache หรือทำนายใหม่ถ้ายังไม่มี
+    def get(self, reading):
+        self.check_model()
+        key, representative = self.quantize(reading)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(result[0]), result[1]
+            self.misses += 1
+
+        abnormalities, probabilities = self.predict(representative)
+        with self._lock:
+            self._entries[key] = (tuple(abnormalities), probabilities)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return list(abnormalities), probabilities
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,85 @@
+import json
+import queue
+import threading
+
+import plotly
+
+# ส่งข้อความไปยัง browser ทุกตัวที่เชื่อมต่ออยู่ผ่าน Server-Sent Events (text/event-stream)
+# แต่ละข้อความถูกแปลงเป็น JSON และ encode เพียงครั้งเดียว แล้ว bytes ชุดเดียวกันถูกใส่คิวของทุก client
+# client ที่รับไม่ทัน (คิวเต็ม) จะถูกตัดการเชื่อมต่อ แล้ว EventSource ของ browser จะเชื่อมต่อใหม่เอง
+
+
+# ข้อความ SSE หนึ่งชุด (bytes) จาก event, data ที่แปลงเป็น JSON ได้ และ id (ไม่บังคับ)
+def format_event(event, data, event_id=None):
+    payload = json.dumps(data, cls=plotly.utils.PlotlyJSONEncoder, separators=(",", ":"))
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+# สัญญาณว่าต้องปิด stream ของ client นี้
+_CLOSE = object()
+
+
+class Broadcaster:
+    def __init__(self, max_pending=32, keepalive=15.0, retry_ms=3000):
+        self.max_pending = max_pending
+        self.keepalive = keepalive
+        self.retry_ms = retry_ms
+        self.published = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    # ส่งข้อความเดียวกันให้ทุก client คืนค่าจำนวน client ที่ได้รับ
+    def publish(self, event, data, event_id=None):
+        message = format_event(event, data, event_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        delivered = 0
+        for pending in subscribers:
+            try:
+                pending.put_nowait(message)
+                delivered += 1
+            except queue.Full:
+                self._drop(pending)
+        return delivered
+
+    def _drop(self, pending):
+        with self._lock:
+            if pending not in self._subscribers:
+                return
+            self._subscribers.discard(pending)
+            self.dropped += 1
+        # ทิ้งข้อความที่ค้างแล้วใส่สัญญาณปิด (คิวว่างแล้วจึงใส่ได้เสมอ)
+        while True:
+            try:
+                pending.get_nowait()
+            except queue.Empty:
+                break
+        pending.put_nowait(_CLOSE)
+
+    # generator ของ bytes สำหรับ Flask Response (mimetype="text/event-stream")
+    # ส่ง comment เป็น keepalive เมื่อไม่มีข้อความนานเกิน keepalive วินาที เพื่อไม่ให้ proxy ตัดการเชื่อมต่อ
+    def stream(self):
+        pending = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.add(pending)
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode("utf-8")
+            while True:
+                try:
+                    message = pending.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is _CLOSE:
+                    return
+                yield message
+        finally:
+            # browser ปิดหน้า (เขียนไม่สำเร็จ) หรือถูกตัดเพราะรับไม่ทัน
+            with self._lock:
+                self._subscribers.discard(pending)
@@ -0,0 +1,212 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from chunked_dataset import dataset_columns, find_machine_column, iter_chunks
+from inference import FEATURE_COLUMNS
+
+# เล่นค่าเซ็นเซอร์ที่บันทึกไว้ (.csv หรือ .parquet เช่นไฟล์จาก creatdata.py) ซ้ำผ่าน IngestionService
+# ค่าถูกส่งเข้าคิวของ service ตามลำดับในไฟล์ทุกแถว จึงได้ผลทำนายและประวัติชุดเดิมทุกครั้งที่เล่น
+# อ่านไฟล์ทีละ chunk (chunked_dataset.iter_chunks) ไฟล์หลาย GB จึงเริ่มส่งค่าแรกได้ทันที
+# ใช้งาน: python replay.py data/sensor_data_1000.csv --speed 10
+#         python replay.py data/sensor_data.parquet --speed max
+
+# ขนาด chunk ที่อ่านต่อครั้ง (เล็กกว่าตอนเทรน เพื่อให้ค่าแรกออกเร็ว)
+REPLAY_CHUNK_SIZE = 65_536
+
+# คอลัมน์เวลาที่ค้นหาอัตโนมัติ (readings ใน sensor_history.db ใช้ ts เป็น epoch วินาที)
+TIME_COLUMNS = ["ts", "Timestamp", "timestamp"]
+
+
+# คอลัมน์เวลาตัวแรกใน TIME_COLUMNS ที่มีในไฟล์ (None ถ้าไม่มี)
+def find_time_column(path):
+    columns = dataset_columns(path)
+    return next((col for col in TIME_COLUMNS if col in columns), None)
+
+
+# แปลงความเร็วจาก command line: "max" (หรือ 0) = เร็วที่สุด, "10" หรือ "10x" = เร็วกว่าเวลาจริง 10 เท่า
+def parse_speed(text):
+    text = str(text).strip().lower()
+    if text in ("max", "0"):
+        return 0.0
+    speed = float(text.removesuffix("x"))
+    if speed < 0:
+        raise ValueError(f"ความเร็วต้องไม่ติดลบ: {text!r}")
+    return speed
+
+
+# เวลาในไฟล์เป็นวินาที (epoch หรือข้อความวันที่) ใช้เฉพาะระยะห่างระหว่างแถว
+def _seconds(column):
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(np.float64)
+    return pd.to_datetime(column).to_numpy("datetime64[ns]").astype(np.int64) / 1e9
+
+
+# แหล่งข้อมูลของ IngestionService ที่ส่งค่าจากไฟล์เข้าคิว (start/stop เหมือน SensorSimulator)
+# speed: 1 = ตามเวลาที่บันทึก, N = เร็วขึ้น N เท่า, 0 = เร็วที่สุดเท่าที่ service ทำนายทัน
+# เวลาของแต่ละค่า = start_ts + เวลาของแถวนั้นนับจากแถวแรก (จากคอลัมน์เวลา หรือแถวละ 1/rate_hz วินาที)
+# ถ้าไม่มีคอลัมน์รหัสเครื่อง ทุกแถวเป็นของ machine_id
+class ReplaySource(threading.Thread):
+    def __init__(self, out_queue, path, speed=1.0, rate_hz=1.0, machine_id=None, start_ts=None,
+                 loop=False, chunk_size=REPLAY_CHUNK_SIZE, time_column=None, machine_column=None):
+        super().__init__(name="replay-source", daemon=True)
+        self.out_queue = out_queue
+        self.path = path
+        self.speed = speed
+        self.rate_hz = rate_hz
+        self.machine_id = machine_id
+        self.start_ts = start_ts
+        self.loop = loop
+        self.chunk_size = chunk_size
+        self.time_column = time_column or find_time_column(path)
+        self.machine_column = machine_column or find_machine_column(path)
+        if self.machine_column is None and machine_id is None:
+            raise ValueError(f"ไฟล์ {path} ไม่มีคอลัมน์รหัสเครื่อง ต้องระบุ machine_id")
+        self.sent = 0
+        self.passes = 0
+        # ช้ากว่ากำหนดมากที่สุดกี่วินาที (service ทำนายไม่ทันความเร็วที่ขอ)
+        self.max_lag = 0.0
+        self.started = None
+        self.first_sent = None
+        self.finished = None
+        self.done = threading.Event()
+        self._stop_event = threading.Event()
+
+    # ค่าต่อวินาทีตั้งแต่เริ่มจนจบ (หรือจนถึงตอนนี้)
+    def rate(self):
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def run(self):
+        self.started = time.perf_counter()
+        start_ts = time.time() if self.start_ts is None else self.start_ts
+        offset = 0.0
+        try:
+            while not self._stop_event.is_set():
+                offset = self._replay_file(start_ts, offset)
+                self.passes += 1
+                if not self.loop:
+                    break
+        finally:
+            self.finished = time.perf_counter()
+            self.done.set()
+
+    # ส่งทั้งไฟล์หนึ่งรอบ เวลาเริ่มที่ offset วินาทีหลัง start_ts คืนค่า offset ของรอบถัดไป
+    def _replay_file(self, start_ts, offset):
+        first_time = None
+        row = 0
+        next_offset = offset
+        for chunk in iter_chunks(self.path, [self.machine_column], self.chunk_size, [self.time_column],
+                                 feature_dtype=np.float64):
+            if self._stop_event.is_set():
+                break
+            if self.time_column is not None:
+                seconds = _seconds(chunk[self.time_column])
+                if first_time is None:
+                    first_time = seconds[0]
+                offsets = offset + seconds - first_time
+            else:
+                offsets = offset + (row + np.arange(len(chunk))) / self.rate_hz
+            if self.machine_column is not None:
+                machine_ids = chunk[self.machine_column].astype(str).tolist()
+            else:
+                machine_ids = [self.machine_id] * len(chunk)
+            self._send(machine_ids, chunk[FEATURE_COLUMNS].to_numpy(np.float64), offsets, start_ts)
+            row += len(chunk)
+            next_offset = offsets[-1] + 1.0 / self.rate_hz
+        return next_offset
+
+    def _send(self, machine_ids, values, offsets, start_ts):
+        timestamps = (start_ts + offsets).tolist()
+        rows = values.tolist()
+        if self.speed <= 0:
+            self._put(machine_ids, rows, timestamps, 0, len(rows))
+            return
+
+        # ส่งทุกแถวที่ถึงกำหนดแล้วพร้อมกัน แล้วรอจนถึงกำหนดของแถวถัดไป
+        due = self.started + offsets / self.speed
+        i = 0
+        while i < len(rows) and not self._stop_event.is_set():
+            now = time.perf_counter()
+            j = int(np.searchsorted(due, now, side="right"))
+            if j <= i:
+                self._stop_event.wait(min(due[i] - now, 0.5))
+                continue
+            self.max_lag = max(self.max_lag, now - due[i])
+            self._put(machine_ids, rows, timestamps, i, j)
+            i = j
+
+    # คิวเต็มจะรอ (ไม่ทิ้งค่า) เพื่อให้ทุกแถวถูกทำนายตามลำดับเดิม
+    def _put(self, machine_ids, rows, timestamps, start, end):
+        if self.first_sent is None and end > start:
+            self.out_queue.put((machine_ids[start], rows[start], timestamps[start]))
+            self.first_sent = time.perf_counter()
+            self.sent += 1
+            start += 1
+        for i in range(start, end):
+            self.out_queue.put((machine_ids[i], rows[i], timestamps[i]))
+        self.sent += end - start
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# เล่นไฟล์ผ่านโมเดล ที่เก็บสถานะ และประวัติของ dashboard.py แล้วรายงานอัตราที่ทำได้ต่อเนื่อง
+# (ถ้าเปิดแดชบอร์ดแยก process อยู่ ควรตั้ง STATE_BACKEND = "sqlite" ใน dashboard.py เพื่อดูผลระหว่างเล่น)
+def main():
+    parser = argparse.ArgumentParser(description="เล่นค่าเซ็นเซอร์ที่บันทึกไว้ซ้ำผ่าน IngestionService")
+    parser.add_argument("path", help="ไฟล์ .csv หรือ .parquet")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10 (10x) หรือ max")
+    parser.add_argument("--rate-hz", type=float, default=1.0,
+                        help="อัตราที่บันทึกไว้ (ค่าต่อวินาที) เมื่อไฟล์ไม่มีคอลัมน์เวลา")
+    parser.add_argument("--machine-id", default=None, help="รหัสเครื่องเมื่อไฟล์ไม่มีคอลัมน์รหัสเครื่อง")
+    parser.add_argument("--start", type=float, default=None, help="เวลาเริ่ม (epoch วินาที) ค่าเริ่มต้นคือเวลาปัจจุบัน")
+    parser.add_argument("--loop", action="store_true", help="เล่นซ้ำวนไปเรื่อยๆ")
+    parser.add_argument("--chunk-size", type=int, default=REPLAY_CHUNK_SIZE)
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--max-wait", type=float, default=0.05)
+    args = parser.parse_args()
+
+    import dashboard
+
+    service = dashboard.create_ingestion_service(max_batch=args.max_batch, max_wait=args.max_wait)
+    source = service.add_source(ReplaySource(
+        service.queue, args.path, args.speed, args.rate_hz, args.machine_id or dashboard.MACHINE_ID,
+        args.start, args.loop, args.chunk_size))
+    service.start()
+    speed = "max" if args.speed <= 0 else f"{args.speed:g}x"
+    print(f"เล่น {args.path} ที่ความเร็ว {speed} (เวลา: {source.time_column or f'{args.rate_hz:g} Hz'}, "
+          f"เครื่อง: {source.machine_column or source.machine_id})")
+
+    try:
+        last_scored, last_time = 0, time.perf_counter()
+        # รอจนส่งครบและทุกค่าที่ส่งถูกทำนายแล้ว
+        while not (source.done.is_set() and service.scored + service.failed + service.malformed >= source.sent):
+            time.sleep(0.05)
+            now = time.perf_counter()
+            if now - last_time >= 5:
+                rate = (service.scored - last_scored) / (now - last_time)
+                print(f"ส่ง {source.sent} ทำนาย {service.scored} ({rate:.0f} ค่า/วินาที) "
+                      f"คิว {service.queue.qsize()} ช้ากว่ากำหนดสูงสุด {source.max_lag:.2f} วินาที")
+                last_scored, last_time = service.scored, now
+    except KeyboardInterrupt:
+        pass
+    drained = time.perf_counter()
+    service.stop()
+    if dashboard.history_store is not None:
+        dashboard.history_store.flush()
+
+    elapsed = drained - source.started
+    first = (source.first_sent - source.started) * 1000 if source.first_sent is not None else float("nan")
+    print(f"ทำนาย {service.scored} ค่า ใน {elapsed:.2f} วินาที = {service.scored / elapsed:.0f} ค่า/วินาที "
+          f"(batch {service.batches}, ผิดพลาด {service.failed} ค่า, ค่าไม่ครบ {service.malformed} ค่า)")
+    print(f"ส่งค่าแรกหลังเริ่ม {first:.1f} ms, ช้ากว่ากำหนดสูงสุด {source.max_lag:.3f} วินาที")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+# บัฟเฟอร์วงกลมขนาดคงที่ที่เก็บข้อมูลแบบคอลัมน์ด้วย NumPy
+# append เป็น O(1) และไม่จองหน่วยความจำใหม่ (ต่างจาก pd.concat + tail ที่คัดลอกทั้งตารางทุกครั้ง)
+# แต่ละค่าถูกเขียนสองตำแหน่ง (i และ i + capacity) ทำให้ข้อมูลที่เรียงจากเก่าไปใหม่
+# เป็น slice ต่อเนื่องเสมอ จึงคืน view ได้โดยไม่ต้องคัดลอก
+class RingBuffer:
+    def __init__(self, capacity, columns):
+        if capacity < 1:
+            raise ValueError("capacity ต้องมากกว่า 0")
+        self.capacity = int(capacity)
+        self.columns = list(columns)
+        self._data = {
+            name: np.zeros(2 * self.capacity, dtype=dtype) if np.dtype(dtype) != object
+            else np.empty(2 * self.capacity, dtype=object)
+            for name, dtype in columns.items()
+        }
+        self._total = 0
+
+    def __len__(self):
+        return min(self._total, self.capacity)
+
+    @property
+    def empty(self):
+        return self._total == 0
+
+    # จำนวนแถวทั้งหมดที่เคยเพิ่มเข้ามา (รวมที่ถูกเขียนทับไปแล้ว)
+    @property
+    def total_appended(self):
+        return self._total
+
+    # เพิ่มข้อมูลหนึ่งแถว (dict ที่มีครบทุกคอลัมน์)
+    def append(self, row):
+        i = self._total % self.capacity
+        for name, storage in self._data.items():
+            value = row[name]
+            storage[i] = value
+            storage[i + self.capacity] = value
+        self._total += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def _window(self):
+        if self._total < self.capacity:
+            return 0, self._total
+        start = self._total % self.capacity
+        return start, start + self.capacity
+
+    # view แบบอ่านอย่างเดียวของคอลัมน์ เรียงจากเก่าไปใหม่ (ไม่คัดลอกข้อมูล)
+    # view จะเปลี่ยนตามเมื่อมีการ append ครั้งถัดไป ถ้าต้องเก็บไว้ให้ .copy()
+    def view(self, name):
+        start, stop = self._window()
+        values = self._data[name][start:stop]
+        values.flags.writeable = False
+        return values
+
+    def views(self):
+        return {name: self.view(name) for name in self.columns}
+
+    # แถวล่าสุด (dict) หรือ None ถ้ายังว่าง
+    def last(self):
+        if self._total == 0:
+            return None
+        i = (self._total - 1) % self.capacity
+        return {name: storage[i] for name, storage in self._data.items()}
+
+    # คัดลอกออกมาเป็น DataFrame (ใช้เมื่อจำเป็นเท่านั้น)
+    def to_frame(self):
+        return pd.DataFrame({name: self.view(name).copy() for name in self.columns}, columns=self.columns)
+
+    def clear(self):
+        self._total = 0
@@ -0,0 +1,236 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from inference import FEATURE_COLUMNS
+
+# คุณลักษณะย้อนหลังต่อเครื่อง (rolling features) ที่คำนวณแบบเพิ่มทีละค่า O(1) ต่อค่าใหม่
+# ความผิดปกติอย่างลูกปืนสึกหรือแกนเยื้องจะเห็นเป็นแนวโน้ม (ความแปรปรวนของการสั่นที่เพิ่มขึ้น อุณหภูมิที่ค่อยๆ สูงขึ้น)
+# มากกว่าค่าขณะใดขณะหนึ่ง จึงเก็บค่าเฉลี่ย ส่วนเบี่ยงเบนมาตรฐาน (Welford) ความชัน และ EWMA ของแต่ละหน้าต่าง
+# ใช้ร่วมกันทั้งตอนเทรน (transform ทีละ chunk) และตอนทำนาย (update ทีละค่า) ด้วยสถานะชุดเดียวกัน
+
+# ค่าเซ็นเซอร์ที่คำนวณคุณลักษณะย้อนหลัง และขนาดหน้าต่าง (จำนวนค่าล่าสุดของเครื่องเดียวกัน)
+ROLLING_COLUMNS = ["Temperature", "Vibration", "RPM"]
+ROLLING_WINDOWS = (10, 60)
+# ค่า alpha ของ EWMA (ค่าใหม่มีน้ำหนัก alpha ค่าเดิม 1 - alpha)
+EWMA_ALPHAS = (0.1,)
+
+WINDOW_STATS = ["mean", "std", "slope"]
+
+
+# ชื่อคุณลักษณะเรียงตามลำดับที่ engine คืนค่า เช่น Temperature_mean_10, Vibration_slope_60, RPM_ewma_0.1
+def rolling_feature_names(columns=ROLLING_COLUMNS, windows=ROLLING_WINDOWS, ewma_alphas=EWMA_ALPHAS):
+    names = [f"{col}_{stat}_{window}" for window in windows for stat in WINDOW_STATS for col in columns]
+    return names + [f"{col}_ewma_{alpha:g}" for alpha in ewma_alphas for col in columns]
+
+
+# หน้าต่างเลื่อนขนาดคงที่ของหนึ่งเครื่อง (ทุกคอลัมน์พร้อมกัน)
+# mean/m2 ใช้สูตร Welford แบบเพิ่มและแทนที่ค่าเก่า, sxy คือ Σ i·y_i โดย i เป็นลำดับในหน้าต่าง (0 = เก่าที่สุด)
+class _SlidingWindow:
+    __slots__ = ("size", "values", "count", "pos", "mean", "m2", "sxy")
+
+    def __init__(self, size, n_columns):
+        self.size = size
+        self.values = np.zeros((size, n_columns))
+        self.count = 0
+        # ตำแหน่งที่จะเขียนค่าถัดไป (เมื่อบัฟเฟอร์เต็มคือค่าที่เก่าที่สุด)
+        self.pos = 0
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.sxy = np.zeros(n_columns)
+
+    def push(self, x):
+        if self.count < self.size:
+            delta = x - self.mean
+            self.mean += delta / (self.count + 1)
+            self.m2 += delta * (x - self.mean)
+            self.sxy += self.count * x
+            self.count += 1
+        else:
+            old = self.values[self.pos].copy()
+            n = self.size
+            delta = x - old
+            new_mean = self.mean + delta / n
+            self.m2 += delta * (x - new_mean + old - self.mean)
+            # ค่าที่เหลือเลื่อนลำดับลงหนึ่ง ค่าใหม่อยู่ลำดับ n - 1
+            self.sxy += (n - 1) * x - (self.mean * n - old)
+            self.mean = new_mean
+        self.values[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+
+    # (mean, std, slope) ของค่าในหน้าต่าง (std แบบ population, slope ต่อหนึ่งค่า; 0 ถ้ามีค่าเดียว)
+    def stats(self):
+        n = self.count
+        std = np.sqrt(np.maximum(self.m2, 0.0) / n)
+        if n < 2:
+            return self.mean.copy(), std, np.zeros_like(self.mean)
+        slope = (self.sxy - (n - 1) / 2 * n * self.mean) / (n * (n * n - 1) / 12)
+        return self.mean.copy(), std, slope
+
+    # ค่าในหน้าต่างเรียงจากเก่าไปใหม่
+    def ordered(self):
+        if self.count < self.size:
+            return self.values[:self.count]
+        return np.concatenate([self.values[self.pos:], self.values[:self.pos]])
+
+    # ตั้งสถานะใหม่จากค่าล่าสุดไม่เกิน size ค่า (ใช้หลัง transform ทั้ง chunk)
+    def reset_to(self, recent):
+        recent = recent[-self.size:]
+        self.count = len(recent)
+        self.values[:self.count] = recent
+        self.pos = self.count % self.size
+        self.mean = recent.mean(axis=0)
+        self.m2 = ((recent - self.mean) ** 2).sum(axis=0)
+        self.sxy = (np.arange(self.count)[:, np.newaxis] * recent).sum(axis=0)
+
+
+class _MachineState:
+    __slots__ = ("windows", "ewma")
+
+    def __init__(self, windows, n_columns):
+        self.windows = [_SlidingWindow(size, n_columns) for size in windows]
+        self.ewma = None
+
+
+# คำนวณ (mean, std, slope) ของทุกตำแหน่งใน x แบบ vectorized ด้วยผลรวมสะสม
+# tail คือค่าก่อนหน้าในหน้าต่างของเครื่องเดียวกัน (เรียงจากเก่าไปใหม่) ผลตรงกับ _SlidingWindow.push ทีละค่า
+def _window_stats(tail, x, size):
+    series = np.concatenate([tail, x])
+    # ลบค่าอ้างอิงก่อนหาผลรวมสะสม ลดการสูญเสียความแม่นยำของ Σy² (mean/std/slope ไม่ขึ้นกับการเลื่อนค่า)
+    ref = series[0]
+    z = series - ref
+    positions = np.arange(len(series), dtype=np.float64)[:, np.newaxis]
+    zero = np.zeros((1, z.shape[1]))
+    cs1 = np.concatenate([zero, np.cumsum(z, axis=0)])
+    cs2 = np.concatenate([zero, np.cumsum(z * z, axis=0)])
+    csk = np.concatenate([zero, np.cumsum(positions * z, axis=0)])
+
+    ends = np.arange(len(tail), len(series)) + 1
+    n = np.minimum(ends, size)
+    starts = ends - n
+    n_col = n[:, np.newaxis].astype(np.float64)
+    s1 = cs1[ends] - cs1[starts]
+    s2 = cs2[ends] - cs2[starts]
+    # Σ i·z_i โดย i นับจากต้นหน้าต่าง
+    sxy = csk[ends] - csk[starts] - starts[:, np.newaxis] * s1
+
+    mean = s1 / n_col
+    std = np.sqrt(np.maximum(s2 / n_col - mean * mean, 0.0))
+    denominator = n_col * (n_col * n_col - 1) / 12
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(n_col > 1, (sxy - (n_col - 1) / 2 * s1) / denominator, 0.0)
+    return mean + ref, std, slope
+
+
+# ตัวคำนวณคุณลักษณะย้อนหลังแยกตามเครื่อง หน่วยความจำต่อเครื่องคงที่ (บัฟเฟอร์ขนาดเท่าหน้าต่าง)
+# - update(machine_id, reading): ค่าใหม่หนึ่งชุดตอนทำนาย คืนค่าคุณลักษณะของค่านั้น
+# - transform(machine_ids, readings): ทั้ง chunk (เรียงตามเวลา) แบบ vectorized ใช้ตอนเทรนหรือ micro-batch
+# ทั้งสองแบบต่อสถานะเดียวกัน ค่าแรกของแต่ละเครื่องจึงต่อจาก chunk/ค่าก่อนหน้าเสมอ
+class RollingFeatureEngine:
+    def __init__(self, columns=ROLLING_COLUMNS, windows=ROLLING_WINDOWS, ewma_alphas=EWMA_ALPHAS):
+        self.columns = list(columns)
+        self.windows = tuple(int(window) for window in windows)
+        self.ewma_alphas = np.array(ewma_alphas, dtype=np.float64)
+        self.feature_names = rolling_feature_names(self.columns, self.windows, self.ewma_alphas)
+        self._column_index = [FEATURE_COLUMNS.index(col) for col in self.columns]
+        self._machines = {}
+        self._lock = threading.Lock()
+
+    # สร้างจากชื่อคุณลักษณะที่โมเดลเทรนไว้ (ส่วนที่ต่อจาก FEATURE_COLUMNS) ต้องเรียงตาม rolling_feature_names
+    @classmethod
+    def from_feature_names(cls, names):
+        names = list(names)
+        columns, windows, alphas = [], [], []
+        for name in names:
+            col, stat, param = name.rsplit("_", 2)
+            if col not in FEATURE_COLUMNS or stat not in WINDOW_STATS + ["ewma"]:
+                raise ValueError(f"ไม่รู้จักคุณลักษณะ {name}")
+            if col not in columns:
+                columns.append(col)
+            if stat == "ewma":
+                if float(param) not in alphas:
+                    alphas.append(float(param))
+            elif int(param) not in windows:
+                windows.append(int(param))
+        engine = cls(columns, windows, alphas)
+        if engine.feature_names != names:
+            raise ValueError("ลำดับคุณลักษณะย้อนหลังของโมเดลไม่ตรงกับ rolling_feature_names")
+        return engine
+
+    def __len__(self):
+        return len(self._machines)
+
+    def _state(self, machine_id):
+        state = self._machines.get(machine_id)
+        if state is None:
+            state = self._machines[machine_id] = _MachineState(self.windows, len(self.columns))
+        return state
+
+    # ลืมสถานะของเครื่อง (เช่นค่าที่ใช้ warm-up)
+    def discard(self, machine_id):
+        with self._lock:
+            self._machines.pop(machine_id, None)
+
+    # เพิ่มค่าใหม่หนึ่งชุด (dict ของค่าเซ็นเซอร์) คืนค่าคุณลักษณะเรียงตาม feature_names
+    def update(self, machine_id, reading):
+        x = np.array([reading[col] for col in self.columns], dtype=np.float64)
+        with self._lock:
+            state = self._state(machine_id)
+            parts = []
+            for window in state.windows:
+                window.push(x)
+                parts.extend(window.stats())
+            if state.ewma is None:
+                state.ewma = np.tile(x, (len(self.ewma_alphas), 1))
+            else:
+                state.ewma += self.ewma_alphas[:, np.newaxis] * (x - state.ewma)
+            parts.append(state.ewma.ravel())
+        return np.concatenate(parts)
+
+    # คุณลักษณะของทุกแถว (N, len(feature_names)) ข้อมูลต้องเรียงตามเวลาภายในแต่ละเครื่อง
+    # readings เป็น DataFrame หรือ array (N, 6) ตามลำดับ FEATURE_COLUMNS; machine_ids = None คือเครื่องเดียว
+    def transform(self, machine_ids, readings):
+        if isinstance(readings, pd.DataFrame):
+            values = readings[self.columns].to_numpy(dtype=np.float64)
+        else:
+            values = np.asarray(readings, dtype=np.float64)[:, self._column_index]
+        out = np.empty((len(values), len(self.feature_names)))
+        if len(values) == 0:
+            return out
+        if machine_ids is None:
+            groups = [(None, np.arange(len(values)))]
+        else:
+            codes, uniques = pd.factorize(np.asarray(machine_ids))
+            order = np.argsort(codes, kind="stable")
+            bounds = np.flatnonzero(np.diff(codes[order])) + 1
+            groups = zip(uniques, np.split(order, bounds))
+        with self._lock:
+            for machine_id, rows in groups:
+                out[rows] = self._transform_machine(self._state(machine_id), values[rows])
+        return out
+
+    def _transform_machine(self, state, x):
+        parts = []
+        for window in state.windows:
+            parts.extend(_window_stats(window.ordered(), x, window.size))
+            window.reset_to(np.concatenate([window.ordered(), x]))
+
+        # EWMA แบบ recursive ด้วย lfilter: e_t = (1 - alpha)·e_(t-1) + alpha·x_t (ค่าแรกของเครื่องคือ x_0)
+        previous = np.tile(x[0], (len(self.ewma_alphas), 1)) if state.ewma is None else state.ewma
+        ewma = np.empty((len(self.ewma_alphas), len(x), x.shape[1]))
+        for i, alpha in enumerate(self.ewma_alphas):
+            ewma[i], _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=0,
+                                 zi=((1.0 - alpha) * previous[i])[np.newaxis])
+        state.ewma = ewma[:, -1].copy()
+        parts.append(ewma.transpose(1, 0, 2).reshape(len(x), -1))
+        return np.hstack(parts)
+
+
+# engine สำหรับโมเดลที่เทรนด้วยคุณลักษณะย้อนหลัง (None ถ้าโมเดลใช้เฉพาะ FEATURE_COLUMNS)
+def engine_for_model(model):
+    names = getattr(model, "feature_names_in_", None)
+    if names is None or len(names) <= len(FEATURE_COLUMNS):
+        return None
+    return RollingFeatureEngine.from_feature_names(list(names)[len(FEATURE_COLUMNS):])
@@ -0,0 +1,181 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+from inference import FEATURE_COLUMNS, NORMAL_LABEL
+
+# กฎเกณฑ์ค่าเซ็นเซอร์แบบประกาศ (declarative) ที่คอมไพล์เป็น boolean mask ของ NumPy
+# ใช้ร่วมกันทั้งการ์ดเซ็นเซอร์ของแดชบอร์ด, การสร้างป้ายกำกับข้อมูลเทรน และรายละเอียดใน testmodel.ipynb
+# เงื่อนไขหนึ่งข้อเขียนเป็น ("Temperature", ">", 100) และรวมกันได้ด้วย all_of(...) / any_of(...)
+# ประเมินค่าเซ็นเซอร์ชุดเดียว (dict) หรือหลายล้านแถว (DataFrame / array ขนาด (N, 6)) ได้ในครั้งเดียว
+
+COMPARISONS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt,
+    "<=": operator.le, "==": operator.eq, "!=": operator.ne,
+}
+
+MULTIPLE_LABEL = "Multiple Abnormalities"
+
+
+def all_of(*conditions):
+    return ("all", conditions)
+
+
+def any_of(*conditions):
+    return ("any", conditions)
+
+
+# กฎหนึ่งข้อ: name คือชื่อที่รายงานเมื่อเงื่อนไขเป็นจริง, message เป็นข้อความ (format ด้วยค่าเซ็นเซอร์) สำหรับแสดงรายละเอียด
+class Rule:
+    def __init__(self, name, when, message=None):
+        self.name = name
+        self.when = when
+        self.message = message
+        self.columns = []
+        self._mask = self._compile(when)
+
+    # แปลงเงื่อนไขเป็นฟังก์ชันที่รับ dict ของคอลัมน์ (NumPy array) แล้วคืน boolean mask
+    def _compile(self, condition):
+        kind, conditions = condition[0], condition[1]
+        if kind in ("all", "any"):
+            parts = [self._compile(part) for part in conditions]
+            if not parts:
+                raise ValueError(f"กฎ {self.name!r}: {kind}_of ต้องมีอย่างน้อยหนึ่งเงื่อนไข")
+            combine = np.logical_and if kind == "all" else np.logical_or
+
+            def mask(columns):
+                result = parts[0](columns)
+                for part in parts[1:]:
+                    result = combine(result, part(columns))
+                return result
+            return mask
+
+        column, op, threshold = condition
+        if column not in FEATURE_COLUMNS:
+            raise ValueError(f"กฎ {self.name!r}: ไม่รู้จักคอลัมน์ {column!r}")
+        if op not in COMPARISONS:
+            raise ValueError(f"กฎ {self.name!r}: ไม่รู้จักตัวเปรียบเทียบ {op!r}")
+        if column not in self.columns:
+            self.columns.append(column)
+        compare = COMPARISONS[op]
+        return lambda columns: compare(columns[column], threshold)
+
+    def mask(self, columns):
+        return self._mask(columns)
+
+
+# ชุดกฎที่ประเมินพร้อมกัน (แต่ละคอลัมน์ถูกแปลงเป็น array เพียงครั้งเดียวต่อการเรียก)
+class RuleSet:
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.names = [rule.name for rule in self.rules]
+        self.columns = list(dict.fromkeys(col for rule in self.rules for col in rule.columns))
+
+    def __len__(self):
+        return len(self.rules)
+
+    # ดึงคอลัมน์ที่กฎใช้ออกมาเป็น NumPy array หนึ่งมิติ
+    def _columns(self, data):
+        if isinstance(data, pd.DataFrame):
+            return {col: data[col].to_numpy() for col in self.columns}
+        if isinstance(data, dict):
+            return {col: np.atleast_1d(np.asarray(data[col], dtype=np.float64)) for col in self.columns}
+        values = np.asarray(data, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(1, -1)
+        if values.ndim != 2 or values.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f"ต้องการข้อมูลขนาด (N, {len(FEATURE_COLUMNS)}) แต่ได้ {values.shape}")
+        return {col: values[:, FEATURE_COLUMNS.index(col)] for col in self.columns}
+
+    # boolean mask ของแต่ละกฎ เรียงตาม self.names
+    def masks(self, data):
+        columns = self._columns(data)
+        return [rule.mask(columns) for rule in self.rules]
+
+    # ผลของทุกกฎเป็นเมทริกซ์ boolean ขนาด (N, จำนวนกฎ) เรียงคอลัมน์ตาม self.names
+    def hits(self, data):
+        masks = self.masks(data)
+        hits = np.empty((len(masks[0]) if masks else 0, len(masks)), dtype=bool)
+        for i, mask in enumerate(masks):
+            hits[:, i] = mask
+        return hits
+
+    # ผลของแต่ละกฎสำหรับค่าเซ็นเซอร์ชุดเดียว {ชื่อกฎ: True/False}
+    def flags(self, reading):
+        return dict(zip(self.names, self.hits(reading)[0].tolist()))
+
+    # ข้อความของกฎที่เป็นจริงสำหรับค่าเซ็นเซอร์ชุดเดียว
+    def messages(self, reading):
+        return [(rule.message or rule.name).format(**reading)
+                for rule, hit in zip(self.rules, self.hits(reading)[0]) if hit]
+
+    # ลำดับของกฎข้อแรกที่เป็นจริงในแต่ละแถว (-1 ถ้าไม่มี) ใช้กับกฎที่เรียงตามความสำคัญแบบ if/elif
+    def first_match(self, data):
+        hits = self.hits(data)
+        return np.where(hits.any(axis=1), hits.argmax(axis=1), -1)
+
+    # ป้ายกำกับตามจำนวนกฎที่เป็นจริง: ไม่มี -> normal, หนึ่งข้อ -> ชื่อกฎ, หลายข้อ -> multiple
+    # รวมผลของทุกกฎเป็นเลขฐานสองหนึ่งตัวต่อแถว แล้วเปิดตารางป้ายกำกับที่คำนวณไว้ครั้งเดียว
+    def label(self, data, normal=NORMAL_LABEL, multiple=MULTIPLE_LABEL):
+        if len(self.rules) > 16:
+            raise ValueError("label รองรับชุดกฎไม่เกิน 16 ข้อ")
+        packed = None
+        for bit, mask in enumerate(self.masks(data)):
+            mask = np.asarray(mask, dtype=np.uint16) << bit
+            packed = mask if packed is None else packed | mask
+        table = np.array([
+            normal if code == 0 else self.names[code.bit_length() - 1] if code & (code - 1) == 0 else multiple
+            for code in range(1 << len(self.rules))], dtype=object)
+        return table[packed]
+
+
+# ===== ชุดกฎที่ใช้ในโปรเจกต์ =====
+# แต่ละชุดมีเกณฑ์ของตัวเองตามที่ใช้มาเดิม (การ์ดเตือนของแดชบอร์ดไม่ได้ใช้เกณฑ์เดียวกับป้ายกำกับข้อมูลเทรน)
+# รวมไว้ที่เดียวเพื่อให้เห็นและปรับเกณฑ์ได้จากไฟล์นี้ไฟล์เดียว
+
+# การ์ดเซ็นเซอร์ในแดชบอร์ด (ชื่อกฎ = คอลัมน์ของการ์ดที่จะแสดงเป็นสีแดง)
+SENSOR_CARD_RULES = RuleSet([
+    Rule("Temperature", ("Temperature", ">", 100)),  # อุณหภูมิสูงเกินไป
+    Rule("Vibration", ("Vibration", ">", 1.5)),  # ความสั่นสะเทือนสูงเกินไป
+    Rule("RPM", ("RPM", ">", 4500)),  # รอบต่อนาทีสูงเกินไป
+    Rule("Humidity", ("Humidity", "<", 35)),  # ความชื้นต่ำเกินไป
+    Rule("Machine_Age", all_of(("Machine_Age", ">", 8), ("Operating_Hours", ">", 7000))),  # อายุเครื่องและชั่วโมงทำงานสูง
+    Rule("Operating_Hours", ("Operating_Hours", ">", 7000)),  # ชั่วโมงทำงานสูงเกินไป
+])
+
+# ป้ายกำกับ Abnormality_Type ของข้อมูลเทรน (gendata.ipynb) ใช้กับ RuleSet.label
+ABNORMALITY_LABEL_RULES = RuleSet([
+    Rule("High Temperature", ("Temperature", ">", 100)),
+    Rule("High Vibration", ("Vibration", ">", 1.0)),
+    Rule("Aging/High Usage", any_of(("Machine_Age", ">", 7), ("Operating_Hours", ">", 5000))),
+])
+
+# รายละเอียดความผิดปกติพร้อมค่าที่ทำให้เกิด (testmodel.ipynb)
+ABNORMAL_DETAIL_RULES = RuleSet([
+    Rule("High Temperature", ("Temperature", ">", 100), "🔥 High Temperature ({Temperature}°C)"),
+    Rule("High Vibration", ("Vibration", ">", 1.0), "🔧 High Vibration ({Vibration})"),
+    Rule("Aging", ("Machine_Age", ">", 7), "⚙ Aging (Machine Age: {Machine_Age} years)"),
+    Rule("High Operating Hours", ("Operating_Hours", ">", 5000), "⏳ High Operating Hours ({Operating_Hours} hrs)"),
+    Rule("Abnormal Humidity", any_of(("Humidity", "<", 20), ("Humidity", ">", 80)), "💧 Abnormal Humidity ({Humidity}%)"),
+    Rule("Abnormal RPM", any_of(("RPM", "<", 500), ("RPM", ">", 5000)), "⚡ Abnormal RPM ({RPM} RPM)"),
+])
+
+# Failure_Type ของข้อมูลจำลอง (synthetic_data.py) เรียงตามความสำคัญ ใช้กับ RuleSet.first_match
+FAILURE_TYPE_RULES = RuleSet([
+    Rule("Motor Overheating", all_of(("Temperature", ">", 105), ("Vibration", ">", 1.2))),
+    Rule("Misalignment", all_of(("Vibration", ">", 1.8), ("RPM", ">", 4000))),
+    Rule("Bearing Failure", all_of(("Humidity", "<", 30), ("Vibration", ">", 1.0))),
+    Rule("Loose Components", all_of(("Machine_Age", ">", 8), ("Operating_Hours", ">", 7000))),
+    Rule("Excessive Load", any_of(("RPM", ">", 4800), all_of(("RPM", ">", 4200), ("Temperature", ">", 95)))),
+])
+
+
+# ป้ายกำกับ Abnormality_Type แบบ vectorized (แทน df.apply(label_abnormality, axis=1))
+def label_abnormality(data):
+    return ABNORMALITY_LABEL_RULES.label(data)
+
+
+# รายการความผิดปกติพร้อมค่าที่ trigger ของค่าเซ็นเซอร์ชุดเดียว
+def get_abnormal_details(reading):
+    return ABNORMAL_DETAIL_RULES.messages(reading)
@@ -0,0 +1,217 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from abnormality_events import (ABNORMALITY_EVENT_COLUMNS, DEFAULT_CLEAR_AFTER, AbnormalityEventLog,
+                                apply_detections)
+from ring_buffer import RingBuffer
+
+# คอลัมน์ของประวัติค่าเซ็นเซอร์ (กราฟ) ส่วนประวัติความผิดปกติ (ตาราง) เก็บเป็นเหตุการณ์
+# ตาม ABNORMALITY_EVENT_COLUMNS ใน abnormality_events.py
+SENSOR_HISTORY_COLUMNS = {
+    "Time": object, "Temperature": np.float64, "Vibration": np.float64, "RPM": np.float64}
+
+
+# สถานะของแดชบอร์ดที่ทุก callback ใช้ร่วมกัน
+# - claim_sample: ตัดสินว่าผู้เรียกรายนี้เป็นคนอ่านค่าเซ็นเซอร์รอบใหม่หรือไม่ (อย่างมากหนึ่งครั้งต่อ min_interval)
+# - record_tick: บันทึกผลของรอบใหม่ (ค่าล่าสุด + ประวัติกราฟ + ประวัติความผิดปกติ) ในครั้งเดียว
+#   abnormality_rows (หนึ่งแถวต่อประเภทที่ตรวจพบ, ว่าง = ปกติ) ถูกรวมเป็นเหตุการณ์ตาม abnormality_events.py
+# - latest_tick / sensor_history / abnormality_history: อ่านสถานะล่าสุด
+# ประวัติคืนค่าเป็น (เลขรุ่นที่เพิ่มขึ้นเมื่อประวัติเปลี่ยน, dict ของคอลัมน์เรียงจากเก่าไปใหม่)
+# (ประวัติค่าเซ็นเซอร์ใช้จำนวนแถวที่เคยเพิ่มทั้งหมดเป็นเลขรุ่น)
+class StateBackend(abc.ABC):
+    @abc.abstractmethod
+    def claim_sample(self, now, min_interval):
+        pass
+
+    @abc.abstractmethod
+    def record_tick(self, tick, sensor_row, abnormality_rows):
+        pass
+
+    @abc.abstractmethod
+    def latest_tick(self):
+        pass
+
+    @abc.abstractmethod
+    def sensor_history(self):
+        pass
+
+    @abc.abstractmethod
+    def abnormality_history(self):
+        pass
+
+
+
+# เก็บสถานะในหน่วยความจำของ process เดียว (เหมาะกับการรันด้วย app.run)
+class InMemoryStateBackend(StateBackend):
+    def __init__(self, sensor_window, abnormality_window, clear_after=DEFAULT_CLEAR_AFTER):
+        self._lock = threading.Lock()
+        self._sensor = RingBuffer(sensor_window, SENSOR_HISTORY_COLUMNS)
+        self._abnormalities = AbnormalityEventLog(abnormality_window, clear_after)
+        self._latest = None
+        self._last_sample = None
+
+    def claim_sample(self, now, min_interval):
+        with self._lock:
+            if self._last_sample is not None and now - self._last_sample < min_interval:
+                return False
+            self._last_sample = now
+            return True
+
+    def record_tick(self, tick, sensor_row, abnormality_rows):
+        with self._lock:
+            self._sensor.append(sensor_row)
+            self._abnormalities.record(abnormality_rows)
+            self._latest = tick
+
+    def latest_tick(self):
+        return self._latest
+
+    # คัดลอกออกมาภายใต้ lock เพราะ view ของบัฟเฟอร์จะเปลี่ยนเมื่อ thread อื่น append
+    def sensor_history(self):
+        with self._lock:
+            return self._sensor.total_appended, {
+                name: values.copy() for name, values in self._sensor.views().items()}
+
+    def abnormality_history(self):
+        with self._lock:
+            return self._abnormalities.version, self._abnormalities.columns()
+
+
+# คอลัมน์ช่วงค่าเซ็นเซอร์และคอลัมน์ทั้งหมดที่บันทึกในตาราง abnormality_events
+EVENT_RANGE_COLUMNS = [name for name in ABNORMALITY_EVENT_COLUMNS if name.endswith(("_Min", "_Max"))]
+EVENT_STORED_COLUMNS = list(ABNORMALITY_EVENT_COLUMNS) + ["Misses"]
+
+
+# เก็บสถานะในไฟล์ SQLite ที่หลาย worker process ใช้ร่วมกัน (เช่นรันด้วย gunicorn -w N)
+# ทุก worker เห็นประวัติชุดเดียวกัน และการอ่านค่าเซ็นเซอร์รอบใหม่เกิดขึ้นเพียงครั้งเดียวต่อ min_interval
+# ไม่ว่า request จะถูกส่งไปที่ worker ใด
+class SQLiteStateBackend(StateBackend):
+    def __init__(self, path, sensor_window, abnormality_window, timeout=30.0, clear_after=DEFAULT_CLEAR_AFTER):
+        self.path = path
+        self.sensor_window = sensor_window
+        self.abnormality_window = abnormality_window
+        self.clear_after = clear_after
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._connection() as conn:
+            self._create_schema(conn)
+
+    # เปิด connection แยกต่อ process (connection ที่สร้างก่อน fork ใช้ต่อใน process ลูกไม่ได้)
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout,
+                                         check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+        return _Transaction(self._conn, self._lock)
+
+    def _create_schema(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sensor_history (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "Time TEXT, Temperature REAL, Vibration REAL, RPM REAL)")
+        # เหตุการณ์ความผิดปกติ (Misses = จำนวนค่าปกติติดต่อกันของเหตุการณ์ที่ยังเปิดอยู่)
+        value_columns = ", ".join(f"{name} REAL" for name in EVENT_RANGE_COLUMNS)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS abnormality_events (Event_ID INTEGER PRIMARY KEY AUTOINCREMENT, "
+            f"Abnormality_Type TEXT, Start TEXT, End TEXT, Count INTEGER, {value_columns}, "
+            "Open INTEGER, Misses INTEGER)")
+        conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT)")
+
+    def claim_sample(self, now, min_interval):
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = 'last_sample'").fetchone()
+            if row is not None and now - float(row[0]) < min_interval:
+                return False
+            conn.execute("INSERT OR REPLACE INTO kv VALUES ('last_sample', ?)", (repr(float(now)),))
+            return True
+
+    def record_tick(self, tick, sensor_row, abnormality_rows):
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO sensor_history (Time, Temperature, Vibration, RPM) VALUES (?, ?, ?, ?)",
+                [sensor_row[name] for name in SENSOR_HISTORY_COLUMNS])
+            conn.execute("DELETE FROM sensor_history WHERE seq <= ?",
+                         (cursor.lastrowid - self.sensor_window,))
+            self._record_events(conn, abnormality_rows)
+            conn.execute("INSERT OR REPLACE INTO kv VALUES ('latest_tick', ?)", (json.dumps(tick),))
+
+    # อ่านเหตุการณ์ที่เปิดอยู่ (มีไม่เกินจำนวนประเภท) ใช้ apply_detections แล้วเขียนกลับใน transaction เดียวกัน
+    def _record_events(self, conn, abnormality_rows):
+        rows = conn.execute(f"SELECT {', '.join(EVENT_STORED_COLUMNS)} FROM abnormality_events WHERE Open = 1")
+        open_events = {}
+        for row in rows.fetchall():
+            event = dict(zip(EVENT_STORED_COLUMNS, row))
+            open_events[event["Abnormality_Type"]] = event
+        if not open_events and not abnormality_rows:
+            return
+
+        touched, visible = apply_detections(open_events, abnormality_rows, self.clear_after)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO abnormality_events ({', '.join(EVENT_STORED_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(EVENT_STORED_COLUMNS))})",
+            [[event[name] for name in EVENT_STORED_COLUMNS] for event in touched])
+        if visible:
+            conn.execute(
+                "DELETE FROM abnormality_events WHERE Open = 0 AND Event_ID NOT IN "
+                "(SELECT Event_ID FROM abnormality_events ORDER BY Event_ID DESC LIMIT ?)",
+                (self.abnormality_window,))
+            conn.execute("INSERT INTO kv VALUES ('abnormality_version', 1) "
+                         "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+
+    def latest_tick(self):
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM kv WHERE key = 'latest_tick'").fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _history(self, table, columns):
+        with self._connection() as conn:
+            rows = conn.execute(f"SELECT seq, {', '.join(columns)} FROM {table} ORDER BY seq").fetchall()
+            total = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        total = total[0] if total is not None else 0
+        values = list(zip(*rows)) if rows else [()] * (len(columns) + 1)
+        return total, {
+            name: np.array(values[i + 1], dtype=dtype) for i, (name, dtype) in enumerate(columns.items())}
+
+    def sensor_history(self):
+        return self._history("sensor_history", SENSOR_HISTORY_COLUMNS)
+
+    def abnormality_history(self):
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(ABNORMALITY_EVENT_COLUMNS)} FROM abnormality_events ORDER BY Event_ID").fetchall()
+            version = conn.execute("SELECT value FROM kv WHERE key = 'abnormality_version'").fetchone()
+        values = list(zip(*rows)) if rows else [()] * len(ABNORMALITY_EVENT_COLUMNS)
+        return int(version[0]) if version is not None else 0, {
+            name: np.array(values[i], dtype=dtype) for i, (name, dtype) in enumerate(ABNORMALITY_EVENT_COLUMNS.items())}
+
+
+# transaction แบบ BEGIN IMMEDIATE เพื่อให้ claim/record ของหลาย process ไม่ทับกัน
+class _Transaction:
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
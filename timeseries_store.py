@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from inference import FEATURE_COLUMNS
+
+# คอลัมน์ของเซ็นเซอร์ที่บันทึกในประวัติความผิดปกติ (เหมือนตารางในแดชบอร์ด)
+ABNORMALITY_COLUMNS = ["Temperature", "Vibration", "RPM", "Humidity"]
+
+# ความละเอียดของ rollup (ชื่อ -> จำนวนวินาทีต่อช่วง)
+ROLLUP_RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+
+# ที่เก็บข้อมูลเซ็นเซอร์และความผิดปกติแบบถาวรบน SQLite
+# - เขียนแบบ batch (สะสมในหน่วยความจำแล้ว flush ครั้งเดียว)
+# - ทุกครั้งที่ flush จะอัปเดต rollup รายนาที/รายชั่วโมง (min/mean/max ต่อเซ็นเซอร์ และจำนวนครั้งต่อ Abnormality_Type)
+#   ทำให้ query ช่วงเวลายาวๆ อ่านจาก rollup ได้เลยโดยไม่ต้องสแกนข้อมูลดิบ
+# - แต่ละ process มี connection ของตัวเอง (สร้างได้ตอน import ก่อน fork เช่น gunicorn --preload)
+class SensorHistoryStore:
+    def __init__(self, path="sensor_history.db", batch_size=500, flush_interval=5.0, timeout=30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._last_flush = time.monotonic()
+        self._conn = None
+        self._pid = None
+        self._attach()
+        self._create_schema()
+
+    # เปิด connection ใหม่เมื่อถูกใช้ครั้งแรกในแต่ละ process (connection ที่สร้างก่อน fork ใช้ต่อใน process ลูกไม่ได้)
+    # lock และค่าที่ค้างอยู่สร้างใหม่ด้วย ค่าที่ค้างของ process แม่เป็นหน้าที่ของ process แม่
+    def _attach(self):
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pending_readings = []
+            self._pending_abnormalities = []
+            self._conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._pid = os.getpid()
+
+    def _create_schema(self):
+        sensor_columns = ", ".join(f"{col} REAL" for col in FEATURE_COLUMNS)
+        rollup_columns = ", ".join(
+            f"{col}_min REAL, {col}_max REAL, {col}_sum REAL" for col in FEATURE_COLUMNS)
+        abnormality_columns = ", ".join(f"{col} REAL" for col in ABNORMALITY_COLUMNS)
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS readings (ts REAL NOT NULL, machine_id TEXT NOT NULL, {sensor_columns})")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_readings_machine_ts ON readings (machine_id, ts)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS abnormalities (ts REAL NOT NULL, machine_id TEXT NOT NULL, "
+                f"abnormality_type TEXT NOT NULL, {abnormality_columns})")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_abnormalities_machine_ts ON abnormalities (machine_id, ts)")
+            for resolution in ROLLUP_RESOLUTIONS:
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS readings_{resolution} (bucket INTEGER NOT NULL, "
+                    f"machine_id TEXT NOT NULL, n INTEGER NOT NULL, {rollup_columns}, "
+                    "PRIMARY KEY (machine_id, bucket))")
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS abnormalities_{resolution} (bucket INTEGER NOT NULL, "
+                    "machine_id TEXT NOT NULL, abnormality_type TEXT NOT NULL, n INTEGER NOT NULL, "
+                    "PRIMARY KEY (machine_id, bucket, abnormality_type))")
+
+    # ===== การเขียน =====
+
+    # เพิ่มค่าที่อ่านได้หนึ่งชุด (ts เป็น epoch seconds)
+    def append_reading(self, ts, reading, machine_id):
+        row = (float(ts), machine_id) + tuple(float(reading[col]) for col in FEATURE_COLUMNS)
+        self._attach()
+        with self._lock:
+            self._pending_readings.append(row)
+        self._maybe_flush()
+
+    # เพิ่มค่าที่อ่านได้หลายชุดพร้อมกัน (values ขนาด (N, 6) เรียงตาม FEATURE_COLUMNS)
+    def append_readings(self, timestamps, machine_ids, values):
+        rows = [(float(ts), machine_id) + tuple(row)
+                for ts, machine_id, row in zip(timestamps, machine_ids, np.asarray(values, dtype=np.float64).tolist())]
+        self._attach()
+        with self._lock:
+            self._pending_readings.extend(rows)
+        self._maybe_flush()
+
+    # บันทึกความผิดปกติหนึ่งรายการ
+    def append_abnormality(self, ts, abnormality_type, reading, machine_id):
+        row = (float(ts), machine_id, abnormality_type) + tuple(
+            float(reading[col]) for col in ABNORMALITY_COLUMNS)
+        self._attach()
+        with self._lock:
+            self._pending_abnormalities.append(row)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        pending = len(self._pending_readings) + len(self._pending_abnormalities)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    # เขียนข้อมูลที่ค้างอยู่ทั้งหมดลงดิสก์ใน transaction เดียว พร้อมอัปเดต rollup
+    def flush(self):
+        self._attach()
+        with self._lock:
+            readings, self._pending_readings = self._pending_readings, []
+            abnormalities, self._pending_abnormalities = self._pending_abnormalities, []
+            self._last_flush = time.monotonic()
+            if not readings and not abnormalities:
+                return
+            with self._conn:
+                if readings:
+                    placeholders = ", ".join("?" * (2 + len(FEATURE_COLUMNS)))
+                    self._conn.executemany(f"INSERT INTO readings VALUES ({placeholders})", readings)
+                    self._update_reading_rollups(readings)
+                if abnormalities:
+                    placeholders = ", ".join("?" * (3 + len(ABNORMALITY_COLUMNS)))
+                    self._conn.executemany(f"INSERT INTO abnormalities VALUES ({placeholders})", abnormalities)
+                    self._update_abnormality_rollups(abnormalities)
+
+    # รวมข้อมูลใน batch ตาม (machine_id, bucket) ก่อน แล้ว upsert ครั้งเดียวต่อ bucket
+    def _update_reading_rollups(self, readings):
+        frame = pd.DataFrame(readings, columns=["ts", "machine_id"] + FEATURE_COLUMNS)
+        aggregations = {col: ["min", "max", "sum"] for col in FEATURE_COLUMNS}
+        for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+            frame["bucket"] = (frame["ts"] // seconds * seconds).astype(np.int64)
+            grouped = frame.groupby(["machine_id", "bucket"])
+            stats = grouped.agg(aggregations)
+            stats.columns = [f"{col}_{stat}" for col, stat in stats.columns]
+            stats["n"] = grouped.size()
+            stats = stats.reset_index()
+
+            value_columns = ["n"] + [f"{col}_{stat}" for col in FEATURE_COLUMNS for stat in ("min", "max", "sum")]
+            updates = ["n = n + excluded.n"]
+            for col in FEATURE_COLUMNS:
+                updates.append(f"{col}_min = min({col}_min, excluded.{col}_min)")
+                updates.append(f"{col}_max = max({col}_max, excluded.{col}_max)")
+                updates.append(f"{col}_sum = {col}_sum + excluded.{col}_sum")
+            columns = ["bucket", "machine_id"] + value_columns
+            self._conn.executemany(
+                f"INSERT INTO readings_{resolution} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (machine_id, bucket) DO UPDATE SET {', '.join(updates)}",
+                stats[columns].itertuples(index=False, name=None))
+
+    def _update_abnormality_rollups(self, abnormalities):
+        for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+            counts = {}
+            for ts, machine_id, abnormality_type, *_ in abnormalities:
+                key = (int(ts // seconds * seconds), machine_id, abnormality_type)
+                counts[key] = counts.get(key, 0) + 1
+            self._conn.executemany(
+                f"INSERT INTO abnormalities_{resolution} (bucket, machine_id, abnormality_type, n) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (machine_id, bucket, abnormality_type) DO UPDATE SET n = n + excluded.n",
+                [key + (n,) for key, n in counts.items()])
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    # ===== การอ่าน =====
+
+    def _query(self, sql, params):
+        self._attach()
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    # ข้อมูลดิบในช่วงเวลา [start, end)
+    def query_readings(self, start, end, machine_id):
+        return self._query(
+            f"SELECT ts, {', '.join(FEATURE_COLUMNS)} FROM readings "
+            "WHERE machine_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (machine_id, start, end))
+
+    # จำนวนแถวดิบในช่วงเวลา [start, end)
+    # count(*) ไล่ทุกรายการของ index (machine_id, ts) ในช่วงนั้น ไม่อ่านแถวในตาราง แต่ยังใช้เวลาตามจำนวนแถวที่นับ
+
+    def count_readings(self, start, end, machine_id):
+        self._attach()
+        with self._lock:
+
+            return self._conn.execute(
+                "SELECT count(*) FROM readings WHERE machine_id = ? AND ts >= ? AND ts < ?",
+                (machine_id, start, end)).fetchone()[0]
+
+    def query_abnormalities(self, start, end, machine_id):
+        return self._query(
+            f"SELECT ts, abnormality_type AS Abnormality_Type, {', '.join(ABNORMALITY_COLUMNS)} "
+            "FROM abnormalities WHERE machine_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (machine_id, start, end))
+
+    # min/mean/max ต่อเซ็นเซอร์ในแต่ละช่วง ("minute" หรือ "hour")
+    def query_rollups(self, start, end, machine_id, resolution="minute"):
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"resolution ต้องเป็นหนึ่งใน {list(ROLLUP_RESOLUTIONS)}")
+        stats = ", ".join(
+            f"{col}_min, {col}_sum / n AS {col}_mean, {col}_max" for col in FEATURE_COLUMNS)
+        return self._query(
+            f"SELECT bucket, n, {stats} FROM readings_{resolution} "
+            "WHERE machine_id = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (machine_id, int(start // ROLLUP_RESOLUTIONS[resolution] * ROLLUP_RESOLUTIONS[resolution]), end))
+
+    # จำนวนครั้งที่ตรวจพบแต่ละ Abnormality_Type ในแต่ละช่วง
+    def query_abnormality_counts(self, start, end, machine_id, resolution="hour"):
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"resolution ต้องเป็นหนึ่งใน {list(ROLLUP_RESOLUTIONS)}")
+        return self._query(
+            f"SELECT bucket, abnormality_type AS Abnormality_Type, n FROM abnormalities_{resolution} "
+            "WHERE machine_id = ? AND bucket >= ? AND bucket < ? ORDER BY bucket, abnormality_type",
+            (machine_id, int(start // ROLLUP_RESOLUTIONS[resolution] * ROLLUP_RESOLUTIONS[resolution]), end))
+
+    # เลือกความละเอียดที่ละเอียดที่สุดที่ยังได้จำนวนจุดไม่เกิน max_points
+    # ช่วงสั้นอ่านข้อมูลดิบ ช่วงยาวอ่านจาก rollup
+    def query_trend(self, start, end, machine_id, max_points=2000, raw_rate_hz=1.0):
+        span = max(end - start, 0)
+        if span * raw_rate_hz <= max_points:
+            return "raw", self.query_readings(start, end, machine_id)
+        for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+            if span / seconds <= max_points:
+                return resolution, self.query_rollups(start, end, machine_id, resolution)
+        return "hour", self.query_rollups(start, end, machine_id, "hour")
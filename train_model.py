@@ -0,0 +1,249 @@
+import argparse
+import math
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.preprocessing import LabelEncoder
+
+from chunked_dataset import (DEFAULT_CHUNK_SIZE, LABEL_COLUMNS, MACHINE_COLUMNS, ClassBalancedReservoir,
+                             balanced_indices, find_label_column, find_machine_column, iter_chunks, scan_dataset)
+from drift_monitor import build_profile, save_profile
+from inference import FEATURE_COLUMNS, NORMAL_LABEL
+from model_loader import MODEL_PATH, ENCODER_PATH, PROFILE_PATH
+from rolling_features import RollingFeatureEngine
+from rules import ABNORMALITY_LABEL_RULES, MULTIPLE_LABEL, label_abnormality
+from synthetic_data import create_synthetic_data
+
+# เทรนโมเดลแล้วบันทึกเป็น machine_failure_model.pkl / label_encoder.pkl
+# (แยกออกมาจาก dashboard.py เพื่อไม่ให้เว็บเซิร์ฟเวอร์เทรนโมเดลเองตอนเริ่มทำงาน)
+# ใช้งาน: python train_model.py --samples 2000 --seed 42          (ข้อมูลจำลองในหน่วยความจำ)
+#         python train_model.py --data history.parquet --trees 100  (ไฟล์ขนาดใหญ่กว่าหน่วยความจำ อ่านทีละ chunk)
+# --rolling เพิ่มคุณลักษณะย้อนหลังต่อเครื่องจาก rolling_features.py (แดชบอร์ดและ ingestion ใช้ตามโมเดลอัตโนมัติ)
+# ทุกครั้งที่เทรนจะบันทึกโปรไฟล์การกระจายของค่าเซ็นเซอร์ (PROFILE_PATH) ให้ drift_monitor.py ใช้เทียบกับค่าจริง
+
+# จำนวนแถวสูงสุดที่สุ่มเก็บไว้สร้างโปรไฟล์เมื่อเทรนจากไฟล์
+PROFILE_SAMPLE_ROWS = 200_000
+
+
+# rolling=True: ต่อคุณลักษณะย้อนหลังท้าย FEATURE_COLUMNS (ข้อมูลจำลองไม่มีลำดับเวลาจริง ใช้ทดสอบ pipeline ได้เท่านั้น)
+def train(n_samples=2000, model_path=MODEL_PATH, encoder_path=ENCODER_PATH, seed=None, rolling=False,
+          profile_path=PROFILE_PATH):
+    # สร้างข้อมูลสำหรับเทรนโมเดล
+    train_data = create_synthetic_data(n_samples, seed=seed)
+    
+    # แปลงคลาสให้เป็นตัวเลขด้วย LabelEncoder
+    le = LabelEncoder()
+    y = le.fit_transform(train_data["Failure_Type"])
+    X = train_data.drop("Failure_Type", axis=1)
+    if rolling:
+        engine = RollingFeatureEngine()
+        X = X.join(pd.DataFrame(engine.transform(None, X), columns=engine.feature_names, index=X.index))
+    
+    # สร้างและเทรนโมเดล RandomForest
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X, y)
+    
+    # บันทึกโมเดลและ LabelEncoder
+    joblib.dump(model, model_path)
+    joblib.dump(le, encoder_path)
+    if profile_path:
+        save_profile(build_profile(train_data[FEATURE_COLUMNS].to_numpy()), profile_path)
+    return model, le
+
+
+# หน่วยความจำสูงสุดที่ process นี้ใช้ (MB) หรือ None ถ้าระบบไม่รองรับ (Windows ไม่มีโมดูล resource)
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+# หาคอลัมน์ป้ายกำกับและคลาสทั้งหมดของไฟล์ (อ่านรอบแรกเฉพาะคอลัมน์เดียว)
+# คืนค่า (label_column, จำนวนแถว, จำนวนแถวต่อคลาสหรือ None, LabelEncoder)
+# ถ้าไฟล์ไม่มีคอลัมน์ป้ายกำกับ คลาสคือป้ายกำกับที่ rules.label_abnormality สร้างได้
+def dataset_classes(data_path, label_column=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    label_column = label_column or find_label_column(data_path)
+    n_rows, class_counts = scan_dataset(data_path, label_column, chunk_size)
+    if label_column is not None:
+        class_names = list(class_counts.index)
+    else:
+        class_names = ABNORMALITY_LABEL_RULES.names + [NORMAL_LABEL, MULTIPLE_LABEL]
+    return label_column, n_rows, class_counts, LabelEncoder().fit(class_names)
+
+
+# แปลง chunk เป็น (ค่าเซ็นเซอร์ float32, รหัสคลาส) เฉพาะแถวที่ค่าเซ็นเซอร์ครบและมีป้ายกำกับ
+# ถ้าระบุ engine จะต่อคุณลักษณะย้อนหลัง (คำนวณจากแถวที่ใช้ได้ตามลำดับในไฟล์ แยกตาม machine_column) ท้ายค่าเซ็นเซอร์
+def chunk_codes(chunk, label_column, le, engine=None, machine_column=None):
+    values = chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    labels = chunk[label_column] if label_column is not None else label_abnormality(chunk)
+    codes = pd.Categorical(labels, categories=le.classes_).codes.astype(np.int64)
+    valid = (codes >= 0) & ~np.isnan(values).any(axis=1)
+    values, codes = values[valid], codes[valid]
+    if engine is not None:
+        machine_ids = chunk[machine_column].to_numpy()[valid] if machine_column is not None else None
+        values = np.hstack([values, engine.transform(machine_ids, values).astype(np.float32)])
+    return values, codes
+
+
+# เทรนจากไฟล์ .csv/.parquet ที่ใหญ่เกินหน่วยความจำ
+# - อ่านทีละ chunk (ค่าเซ็นเซอร์เป็น float32) ใช้หน่วยความจำเท่ากับ chunk เดียว + กลุ่มตัวอย่างที่จำกัดขนาด
+# - แต่ละ chunk ถูกสุ่มแบบสมดุลตามคลาส (ไม่เกิน per_class แถวต่อคลาส) แล้วเพิ่มต้นไม้ใหม่ด้วย warm_start
+#   จำนวนต้นไม้ถูกกระจายให้ทุก chunk รวมได้ n_estimators พอดี ถ้า chunk มากกว่าต้นไม้ chunk ที่ไม่ได้ต้นไม้
+#   จะสะสมกลุ่มตัวอย่าง (ไม่เกิน per_class แถวต่อคลาส สุ่มเท่ากันทุก chunk) ไว้ใช้กับต้นไม้ถัดไป
+# - กันข้อมูลส่วนหนึ่ง (holdout) ไว้เป็นกลุ่มตัวอย่างแบบแบ่งชั้นสำหรับวัดความแม่นยำตอนจบ
+# ถ้าไฟล์ไม่มีคอลัมน์ป้ายกำกับ จะสร้าง Abnormality_Type ด้วย rules.label_abnormality เหมือน gendata.ipynb
+# ขนาดของโมเดลเองโตตามจำนวนแถวที่ใช้เทรน ใช้ max_depth / min_samples_leaf จำกัดได้
+# rolling=True: คำนวณคุณลักษณะย้อนหลังจากทุกแถวก่อนสุ่ม (ไฟล์ต้องเรียงตามเวลาภายในแต่ละเครื่อง)
+# แยกตามคอลัมน์รหัสเครื่อง (machine_column หรือหาจาก MACHINE_COLUMNS; ไม่มี = ทั้งไฟล์เป็นเครื่องเดียว)
+def train_from_file(data_path, model_path=MODEL_PATH, encoder_path=ENCODER_PATH, n_estimators=100,
+                    chunk_size=DEFAULT_CHUNK_SIZE, per_class=20_000, holdout=0.02, label_column=None,
+                    seed=42, n_jobs=-1, max_depth=None, min_samples_leaf=1, rolling=False, machine_column=None,
+                    profile_path=PROFILE_PATH):
+    started = time.perf_counter()
+    # รอบแรก: นับจำนวนแถวและคลาส เพื่อให้ทุกต้นไม้รู้จักคลาสครบตั้งแต่ chunk แรก
+    label_column, n_rows, class_counts, le = dataset_classes(data_path, label_column, chunk_size)
+    n_chunks = max(1, math.ceil(n_rows / chunk_size))
+
+    engine = RollingFeatureEngine() if rolling else None
+    machine_column = (machine_column or find_machine_column(data_path)) if rolling else None
+    feature_columns = FEATURE_COLUMNS + (engine.feature_names if engine is not None else [])
+
+    model = RandomForestClassifier(n_estimators=0, warm_start=True, random_state=seed, n_jobs=n_jobs,
+                                   max_depth=max_depth, min_samples_leaf=min_samples_leaf)
+    rng = np.random.default_rng(seed)
+    held_out = ClassBalancedReservoir(per_class, len(le.classes_), len(feature_columns), seed=seed)
+    # กลุ่มตัวอย่างแบบสุ่มเท่ากันทุกแถว (คลาสเดียว) ของค่าเซ็นเซอร์เดิม (float64) สำหรับโปรไฟล์
+    profile_sample = ClassBalancedReservoir(PROFILE_SAMPLE_ROWS, 1, seed=seed)
+    rows_read = rows_used = 0
+
+    def new_pending():
+        return ClassBalancedReservoir(per_class, len(le.classes_), len(feature_columns),
+                                      seed=int(rng.integers(2**32)))
+
+    # เพิ่มต้นไม้จนครบ n_trees ต้นจากกลุ่มตัวอย่างที่สะสมไว้
+    def add_trees(n_trees, pending):
+        X, y = pending.sample()
+        weights = np.ones(len(y))
+        # คลาสที่ไม่มีในกลุ่มตัวอย่างนี้: เพิ่มแถวน้ำหนักศูนย์คลาสละหนึ่งแถว ให้ต้นไม้ใหม่มีคอลัมน์ความน่าจะเป็นครบทุกคลาส
+        missing = np.setdiff1d(np.arange(len(le.classes_)), y)
+        if len(missing):
+            X = np.vstack([X, np.repeat(X.mean(axis=0, keepdims=True), len(missing), axis=0)])
+            y = np.concatenate([y, missing])
+            weights = np.concatenate([weights, np.zeros(len(missing))])
+        model.n_estimators += n_trees
+        model.fit(pd.DataFrame(X, columns=feature_columns), y, sample_weight=weights)
+        return len(y) - len(missing)
+
+    pending = new_pending()
+    for chunk_index, chunk in enumerate(iter_chunks(data_path, [label_column, machine_column], chunk_size)):
+        # ข้ามแถวที่ค่าเซ็นเซอร์หายหรือป้ายกำกับว่าง
+        values, codes = chunk_codes(chunk, label_column, le, engine, machine_column)
+        rows_read += len(chunk)
+        profile_sample.add(chunk[FEATURE_COLUMNS].to_numpy(np.float64), np.zeros(len(chunk), dtype=np.int64))
+
+        is_holdout = rng.random(len(codes)) < holdout
+        held_out.add(values[is_holdout], codes[is_holdout])
+        train_rows = np.flatnonzero(~is_holdout)
+        if len(train_rows) == 0:
+            continue
+
+        picked = train_rows[balanced_indices(codes[train_rows], per_class, rng)]
+        pending.add(values[picked], codes[picked])
+
+        # จำนวนต้นไม้ที่ควรมีหลัง chunk นี้ (ต้นไม้ของ chunk ก่อนหน้าที่ไม่มีข้อมูลถูกเพิ่มที่นี่แทน)
+        target = min(n_estimators, (chunk_index + 1) * n_estimators // n_chunks)
+        if target > model.n_estimators:
+            rows_used += add_trees(target - model.n_estimators, pending)
+            pending = new_pending()
+
+    # จำนวน chunk จริงน้อยกว่าที่ประมาณไว้ หรือ chunk ท้ายๆ ไม่มีข้อมูล: เพิ่มต้นไม้ที่เหลือจากกลุ่มตัวอย่างที่ค้างอยู่
+    if model.n_estimators < n_estimators and len(pending):
+        rows_used += add_trees(n_estimators - model.n_estimators, pending)
+
+    if model.n_estimators == 0:
+        raise ValueError(f"ไม่มีข้อมูลที่ใช้เทรนได้ใน {data_path}")
+
+    joblib.dump(model, model_path)
+    joblib.dump(le, encoder_path)
+    if profile_path:
+        save_profile(build_profile(profile_sample.sample()[0]), profile_path)
+
+    report = {
+        "rows_read": rows_read,
+        "rows_used": rows_used,
+        "chunks": n_chunks,
+        "trees": model.n_estimators,
+        "features": len(feature_columns),
+        "class_counts": class_counts.to_dict() if class_counts is not None else None,
+        "wall_time": time.perf_counter() - started,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if len(held_out):
+        X_test, y_test = held_out.sample()
+        y_pred = model.predict(pd.DataFrame(X_test, columns=feature_columns))
+        report["holdout_rows"] = len(y_test)
+        report["holdout_per_class"] = per_class
+        report["holdout_accuracy"] = accuracy_score(y_test, y_pred)
+        report["classification_report"] = classification_report(
+            y_test, y_pred, labels=np.arange(len(le.classes_)), target_names=list(le.classes_), zero_division=0)
+    return model, le, report
+
+
+def print_report(report):
+    print(f"อ่าน {report['rows_read']:,} แถว ({report['chunks']} chunk) ใช้เทรน {report['rows_used']:,} แถว, "
+          f"{report['trees']} ต้น, {report['features']} คุณลักษณะ")
+    if "holdout_accuracy" in report:
+        # holdout จำกัดจำนวนต่อคลาสเท่านั้น คลาสที่มีน้อยกว่าขีดจำกัดยังมีสัดส่วนตามข้อมูล (ไม่สมดุล)
+        print(f"ความแม่นยำบน holdout ({report['holdout_rows']:,} แถว, ไม่เกิน {report['holdout_per_class']:,} แถวต่อคลาส "
+              f"สัดส่วนคลาสตามข้อมูล): {report['holdout_accuracy']:.3f}")
+
+        print(report["classification_report"])
+    peak = report["peak_rss_mb"]
+    print(f"เวลาทั้งหมด {report['wall_time']:.1f} วินาที, หน่วยความจำสูงสุด "
+          f"{f'{peak:.0f} MB' if peak is not None else 'ไม่ทราบ'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="เทรนโมเดล RandomForest จากข้อมูลจำลองหรือไฟล์ข้อมูล")
+    parser.add_argument("--samples", type=int, default=2000, help="จำนวนแถวของข้อมูลจำลอง (เมื่อไม่ระบุ --data)")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--encoder", default=ENCODER_PATH)
+    parser.add_argument("--profile", default=PROFILE_PATH, help="ไฟล์โปรไฟล์การกระจายของข้อมูลเทรนสำหรับ drift_monitor.py")
+    parser.add_argument("--seed", type=int, default=None, help="seed ของข้อมูลจำลอง (ไม่ระบุ = สุ่มทุกครั้ง)")
+    parser.add_argument("--data", help="ไฟล์ .csv หรือ .parquet สำหรับเทรนแบบอ่านทีละ chunk")
+    parser.add_argument("--label-column", help=f"คอลัมน์ป้ายกำกับ (ค่าเริ่มต้น: หาจาก {', '.join(LABEL_COLUMNS)} "
+                                               "ถ้าไม่มีจะสร้างด้วย rules.label_abnormality)")
+    parser.add_argument("--trees", type=int, default=100, help="จำนวนต้นไม้โดยประมาณ (แบ่งเท่าๆ กันทุก chunk)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--per-class", type=int, default=20_000, help="จำนวนแถวสูงสุดต่อคลาสที่ใช้เทรนในแต่ละ chunk")
+    parser.add_argument("--holdout", type=float, default=0.02, help="สัดส่วนข้อมูลที่กันไว้วัดความแม่นยำ")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--min-samples-leaf", type=int, default=1)
+    parser.add_argument("--rolling", action="store_true", help="เพิ่มคุณลักษณะย้อนหลังต่อเครื่อง (rolling_features.py)")
+    parser.add_argument("--machine-column", help=f"คอลัมน์รหัสเครื่องสำหรับ --rolling (ค่าเริ่มต้น: หาจาก "
+                                                 f"{', '.join(MACHINE_COLUMNS)})")
+    args = parser.parse_args()
+
+    if args.data:
+        _, _, report = train_from_file(
+            args.data, args.model, args.encoder, n_estimators=args.trees, chunk_size=args.chunk_size,
+            per_class=args.per_class, holdout=args.holdout, label_column=args.label_column,
+            seed=args.seed if args.seed is not None else 42, max_depth=args.max_depth,
+            min_samples_leaf=args.min_samples_leaf, rolling=args.rolling, machine_column=args.machine_column,
+            profile_path=args.profile)
+        print_report(report)
+    else:
+        train(args.samples, args.model, args.encoder, args.seed, rolling=args.rolling, profile_path=args.profile)
+    print(f"สร้างและบันทึกโมเดลใหม่เรียบร้อย: {args.model}, {args.encoder}, {args.profile}")
+
+
+if __name__ == "__main__":
+    main()